@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import argparse
+import importlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shape_cache import load_step_shape
+from pit_tools import get_pit_tool_factory, cut_with_tools, cut_with_tools_local, prune_pit_info
+from surface_sampler import build_face_samplers
+from face_index import get_face_index
+from pit_manifest import write_pit_manifest, pit_manifest_path
+
+# 与 test777.py / test888.py 中 main() 的默认参数一致
+PRESETS = {
+    "test777": dict(step_path="./SpurGear1.STEP", target_face_ids={22, 23, 26}, num_centers=2, level=2, gear=1),
+    "test888": dict(step_path="./SpurGear2.STEP", target_face_ids={37, 38}, num_centers=1, level=1, gear=2),
+}
+
+# 每个工作进程只加载一次的基准齿轮、面采样器和刀具工厂
+_worker = {}
+
+
+def _init_worker(generator, step_path, ellipsoid_template_path, target_face_ids, gear):
+    shape = load_step_shape(step_path)
+    _worker["generator"] = importlib.import_module(generator)
+    _worker["shape"] = shape
+    _worker["step_path"] = step_path
+    _worker["gear"] = gear
+    _worker["samplers"] = build_face_samplers(shape, target_face_ids, face_index=get_face_index(step_path))
+    _worker["factory"] = get_pit_tool_factory(ellipsoid_template_path)
+
+
+def _make_variant(seed, num_centers, level, output_path, fuzzy_value, local):
+    """按 seed 生成一个损伤齿轮；相同 seed 得到相同的坑布局"""
+    np.random.seed(seed)
+    gen = _worker["generator"]
+    start = time.perf_counter()
+    pit_uv_list, scale_xyz_list = gen.generate_all_pits_from_pitch(num_centers=num_centers, level=level)
+    grouped_info = gen.extract_pit_info_from_faces(_worker["shape"], None, pit_uv_list, scale_xyz_list,
+                                                   samplers=_worker["samplers"])
+    factory = _worker["factory"]
+    all_pits = [pit for pit_info_list in grouped_info.values() for pit in pit_info_list]
+    all_pits = prune_pit_info(all_pits, factory.semi_axes)
+    tools = factory.make_tools(all_pits)
+    # 进程池已经占满所有核，单个布尔不再开 OCC 并行
+    cut = cut_with_tools_local if local else cut_with_tools
+    result = cut(_worker["shape"], tools, fuzzy_value=fuzzy_value, parallel=False)
+    gen.write_step_shape(result, output_path)
+    write_pit_manifest(pit_manifest_path(output_path), all_pits, factory.semi_axes, source_step=_worker["step_path"],
+                       gear=_worker["gear"])
+    return seed, output_path, len(tools), time.perf_counter() - start
+
+
+def run_batch(generator="test777", count=10, seed_start=0, num_centers=None, level=None,
+              step_path=None, target_face_ids=None, ellipsoid_template_path="./tuoqiu.STEP",
+              output_dir="./damaged_library", workers=None, fuzzy_value=0.0, local=False):
+    """
+    批量生成损伤齿轮 STEP，seed 取 seed_start ~ seed_start + count - 1
+
+    参数:
+        generator (str): 坑布局生成脚本（test777 或 test888），决定坑的分布参数
+        count (int): 生成数量
+        seed_start (int): 起始随机种子
+        num_centers, level: 与 generate_all_pits_from_pitch 相同，None 时使用预设值
+        workers (int): 进程数，None 表示 CPU 核数
+        local (bool): 只在坑所在局部区域做布尔（见 cut_with_tools_local）
+    """
+    preset = PRESETS[generator]
+    step_path = step_path or preset["step_path"]
+    target_face_ids = target_face_ids or preset["target_face_ids"]
+    num_centers = num_centers or preset["num_centers"]
+    level = level or preset["level"]
+
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(step_path))[0]
+    seeds = range(seed_start, seed_start + count)
+
+    print(f"🚀 批量生成 {count} 个损伤齿轮: seed {seed_start} ~ {seed_start + count - 1}, "
+          f"level={level}, num_centers={num_centers}")
+    start = time.perf_counter()
+    # 主进程先建立 BREP 缓存和面索引，工作进程初始化时只读缓存，不会同时写同一个文件
+    get_face_index(step_path)
+    initargs = (generator, step_path, ellipsoid_template_path, target_face_ids, preset["gear"])
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        futures = [pool.submit(_make_variant, seed, num_centers, level,
+                               os.path.join(output_dir, f"{stem}_cut_{seed:06d}.step"), fuzzy_value, local)
+                   for seed in seeds]
+        for future in as_completed(futures):
+            seed, path, n_tools, elapsed = future.result()
+            print(f"  seed={seed}: 刀具 {n_tools} 个, 用时 {elapsed:.1f}s -> {path}")
+    print(f"✅ 批量生成完成，总用时 {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量生成点蚀损伤齿轮 STEP")
+    parser.add_argument("--generator", choices=sorted(PRESETS), default="test777")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--seed-start", type=int, default=0)
+    parser.add_argument("--num-centers", type=int, default=None)
+    parser.add_argument("--level", type=int, choices=[1, 2, 3], default=None)
+    parser.add_argument("--step", default=None, help="基准齿轮 STEP，默认取预设")
+    parser.add_argument("--faces", type=int, nargs="+", default=None, help="目标面 ID，默认取预设")
+    parser.add_argument("--template", default="./tuoqiu.STEP")
+    parser.add_argument("--output-dir", default="./damaged_library")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--fuzzy", type=float, default=0.0)
+    parser.add_argument("--local", action="store_true", help="只在坑所在局部区域做布尔")
+    args = parser.parse_args()
+
+    run_batch(generator=args.generator, count=args.count, seed_start=args.seed_start,
+              num_centers=args.num_centers, level=args.level, step_path=args.step,
+              target_face_ids=set(args.faces) if args.faces else None,
+              ellipsoid_template_path=args.template, output_dir=args.output_dir,
+              workers=args.workers, fuzzy_value=args.fuzzy, local=args.local)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,16 @@
 import os
+import sys
 import numpy as np
-from OCC.Core.STEPControl import STEPControl_Reader, STEPControl_Writer, STEPControl_AsIs
-from OCC.Core.TopoDS import topods, TopoDS_Compound
-from OCC.Core.TopAbs import TopAbs_FACE
-from OCC.Core.TopExp import TopExp_Explorer
-from OCC.Core.BRep import BRep_Tool, BRep_Builder
-from OCC.Core.GeomAdaptor import GeomAdaptor_Surface
-from OCC.Core.GeomLProp import GeomLProp_SLProps
+from OCC.Core.STEPControl import STEPControl_Writer, STEPControl_AsIs
 from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Cut
-from OCC.Core.gp import gp_Pnt, gp_Dir, gp_Vec, gp_Mat, gp_Trsf, gp_GTrsf, gp_Quaternion
-from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_Transform, BRepBuilderAPI_GTransform
 
-def read_step_shape(filepath):
-    reader = STEPControl_Reader()
-    status = reader.ReadFile(filepath)
-    if status != 1:
-        raise RuntimeError(f"STEP文件读取失败: {filepath}")
-    reader.TransferRoot()
-    return reader.Shape()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shape_cache import load_step_shape
+from pit_tools import get_pit_tool_factory, cut_with_tools, cut_with_tools_local, prune_pit_info
+from surface_sampler import build_face_samplers, to_gp
+from face_index import get_face_index
+from poisson_disk import poisson_disk_uv
+from pit_manifest import write_pit_manifest, pit_manifest_path
 
 def write_step_shape(shape, filepath):
     writer = STEPControl_Writer()
@@ -25,47 +18,17 @@ def write_step_shape(shape, filepath):
     writer.Write(filepath)
     print(f"✅ 已导出 STEP: {filepath}")
 
-def scale_shape(shape, sx, sy, sz):
-    mat = gp_Mat(sx, 0, 0, 0, sy, 0, 0, 0, sz)
-    gtrsf = gp_GTrsf()
-    gtrsf.SetVectorialPart(mat)
-    return BRepBuilderAPI_GTransform(shape, gtrsf, True).Shape()
-
-def rotate_shape_to_dir(shape, target_dir):
-    from_dir = gp_Dir(0, 1, 0)
-    q = gp_Quaternion(gp_Vec(from_dir), gp_Vec(target_dir))
-    trsf = gp_Trsf()
-    trsf.SetRotation(q)
-    return BRepBuilderAPI_Transform(shape, trsf, True).Shape()
-
-def translate_shape(shape, target_center):
-    trsf = gp_Trsf()
-    trsf.SetTranslation(gp_Vec(gp_Pnt(0, 0, 0), target_center))
-    return BRepBuilderAPI_Transform(shape, trsf).Shape()
-
 def generate_pit_centers(num_centers=3, u_pitch=0.2775, u_eps=0.0125):
-    centers = []
     min_v_dist = 0.20  # 控制 v 方向最小间距（范围 0.232 到 0.768 大约有 0.5 可用）
-
     v_min, v_max = 0.232, 0.768
-    max_attempts = 1000
 
     print("中心点分布：")
 
-    for i in range(num_centers):
-        attempt = 0
-        while attempt < max_attempts:
-            u = np.random.uniform(u_pitch - u_eps, u_pitch + u_eps)
-            v = np.random.uniform(v_min, v_max)
-
-            # 与已有中心点保持 v 方向分散
-            if all(abs(v - prev_v) > min_v_dist for _, prev_v in centers):
-                centers.append((u, v))
-                print(f"第{i+1}个中心点的v坐标是{v:.4f}")
-                break
-            attempt += 1
-        else:
-            print(f"第{i+1}个中心点生成失败（尝试超过{max_attempts}次），放弃该点")
+    # u 方向只在节线附近小范围随机，不约束间距；v 方向用泊松圆盘采样保证分散
+    centers = poisson_disk_uv(num_centers, u_range=(u_pitch - u_eps, u_pitch + u_eps), v_range=(v_min, v_max),
+                              u_spacing=None, v_spacing=min_v_dist)
+    for i, (_, v) in enumerate(centers):
+        print(f"第{i+1}个中心点的v坐标是{v:.4f}")
 
     return centers
 
@@ -108,63 +71,39 @@ def generate_all_pits_from_pitch(num_centers=3, level=3):
             scale_xyz_list.append((np.random.uniform(1, (1+level*0.15)) * r, 0.6 * r, np.random.uniform(1, 1 + (level * 0.6)) * r)) # (宽, 深, 长)
     return pit_uv_list, scale_xyz_list
 
-def extract_pit_info_from_faces(shape, target_face_ids, pit_uv_list, scale_xyz_list):
-    exp = TopExp_Explorer(shape, TopAbs_FACE)
-    face_map = {}
-    face_idx = -1
-    while exp.More():
-        face_idx += 1
-        face = topods.Face(exp.Current())
-        if face_idx in target_face_ids:
-            face_map[face_idx] = face
-        exp.Next()
-
-    grouped_info = {fid: [] for fid in face_map}
-
-    for face_id, face in face_map.items():
-        surf = BRep_Tool.Surface(face)
-        adaptor = GeomAdaptor_Surface(surf)
-        umin, umax = adaptor.FirstUParameter(), adaptor.LastUParameter()
-        vmin, vmax = adaptor.FirstVParameter(), adaptor.LastVParameter()
-
-        for i, (u_norm, v_norm) in enumerate(pit_uv_list):
-            u1 = umin + u_norm * (umax - umin)
-            v1 = vmin + v_norm * (vmax - vmin)
-            u2 = umin + (1 - u_norm) * (umax - umin)
-            v2 = v1
-            scale_xyz = scale_xyz_list[i]
-
-            pnt1 = gp_Pnt()
-            surf.D0(u1, v1, pnt1)
-            props1 = GeomLProp_SLProps(surf, u1, v1, 1, 1e-6)
-            if props1.IsNormalDefined():
-                normal1 = props1.Normal()
+def extract_pit_info_from_faces(shape, target_face_ids, pit_uv_list, scale_xyz_list, samplers=None):
+    """
+    批量计算每个坑及其镜像坑在目标面上的位置和法向
+    samplers 为 build_face_samplers(grid=True) 的结果，多次布坑时传入可跳过面网格求值；
+    不传时直接在曲面上求值
+    """
+    if samplers is None:
+        samplers = build_face_samplers(shape, target_face_ids, grid=False)
+    grouped_info = {fid: [] for fid in samplers}
+    if not pit_uv_list:
+        return grouped_info
+
+    uv = np.asarray(pit_uv_list, dtype=float)
+    mirrored_uv = np.column_stack((1 - uv[:, 0], uv[:, 1]))
+
+    for face_id, sampler in samplers.items():
+        pnts1, normals1, valid1 = sampler.sample(uv)
+        pnts2, normals2, valid2 = sampler.sample(mirrored_uv)
+        for i, scale_xyz in enumerate(scale_xyz_list):
+            if valid1[i]:
+                pnt1, normal1 = to_gp(pnts1[i], normals1[i])
                 grouped_info[face_id].append((pnt1, normal1, scale_xyz))
-
-            pnt2 = gp_Pnt()
-            surf.D0(u2, v2, pnt2)
-            props2 = GeomLProp_SLProps(surf, u2, v2, 1, 1e-6)
-            if props2.IsNormalDefined():
-                normal2 = props2.Normal()
-                mirrored_normal = gp_Dir(-normal2.X(), -normal2.Y(), -normal2.Z())
+            if valid2[i]:
+                pnt2, mirrored_normal = to_gp(pnts2[i], -normals2[i])
                 grouped_info[face_id].append((pnt2, mirrored_normal, scale_xyz))
 
     return grouped_info
 
 def build_ellipsoid_compound(pit_info_list, ellipsoid_template_path):
-    builder = BRep_Builder()
-    compound = TopoDS_Compound()
-    builder.MakeCompound(compound)
-    for pnt, normal, scale_xyz in pit_info_list:
-        ellipsoid = read_step_shape(ellipsoid_template_path)
-        ellipsoid = scale_shape(ellipsoid, *scale_xyz)
-        ellipsoid = rotate_shape_to_dir(ellipsoid, normal)
-        ellipsoid = translate_shape(ellipsoid, pnt)
-        builder.Add(compound, ellipsoid)
-    return compound
+    return get_pit_tool_factory(ellipsoid_template_path).make_compound(pit_info_list)
 
 def cut_ellipsoids_on_faces_per_face(step_path, ellipsoid_template_path, grouped_info, output_path):
-    shape = read_step_shape(step_path)
+    shape = load_step_shape(step_path)
     result = shape
     for face_id, pit_info_list in grouped_info.items():
         print(f"🔧 正在处理 Face ID = {face_id}, 坑数量 = {len(pit_info_list)}")
@@ -176,12 +115,9 @@ def fuse_ellipsoids(pit_info_list, ellipsoid_template_path):
     """将多个椭球按顺序 fuse 成一个 shape"""
     from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Fuse
 
+    factory = get_pit_tool_factory(ellipsoid_template_path)
     fused_shape = None
-    for idx, (pnt, normal, scale_xyz) in enumerate(pit_info_list):
-        ellipsoid = read_step_shape(ellipsoid_template_path)
-        ellipsoid = scale_shape(ellipsoid, *scale_xyz)
-        ellipsoid = rotate_shape_to_dir(ellipsoid, normal)
-        ellipsoid = translate_shape(ellipsoid, pnt)
+    for idx, ellipsoid in enumerate(factory.make_tools(pit_info_list)):
         if fused_shape is None:
             fused_shape = ellipsoid
         else:
@@ -191,7 +127,7 @@ def fuse_ellipsoids(pit_info_list, ellipsoid_template_path):
 
 def cut_ellipsoids_on_faces_per_face_fused(step_path, ellipsoid_template_path, grouped_info, output_path):
     """每个面内的椭球先 fuse 成一个 shape，再 cut 原工件"""
-    shape = read_step_shape(step_path)
+    shape = load_step_shape(step_path)
     result = shape
     for face_id, pit_info_list in grouped_info.items():
         print(f"🛠️ 正在处理 Face ID = {face_id}, 椭球数量 = {len(pit_info_list)}")
@@ -199,15 +135,42 @@ def cut_ellipsoids_on_faces_per_face_fused(step_path, ellipsoid_template_path, g
         result = BRepAlgoAPI_Cut(result, fused_ellipsoids).Shape()
     write_step_shape(result, output_path)
 
+def cut_ellipsoids_on_faces_multi_tool(step_path, ellipsoid_template_path, grouped_info, output_path,
+                                       fuzzy_value=0.0, parallel=True, local=False, prune=True):
+    """
+    所有面上的椭球作为刀具，对原工件只做一次多刀具并行布尔差
+    local=True 时只切坑所在的局部区域，再与齿轮其余部分粘合
+    prune=True 时先剪除被完全包含或近重合的冗余刀具
+    切除后在 output_path 旁写出坑清单（*.pits.json）
+    """
+    shape = load_step_shape(step_path)
+    factory = get_pit_tool_factory(ellipsoid_template_path)
+    all_pits = []
+    for face_id, pit_info_list in grouped_info.items():
+        print(f"🛠️ Face ID = {face_id}, 椭球数量 = {len(pit_info_list)}")
+        all_pits.extend(pit_info_list)
+    if prune:
+        all_pits = prune_pit_info(all_pits, factory.semi_axes)
+    tools = factory.make_tools(all_pits)
+    print(f"⏳ 正在执行多刀具布尔差，刀具总数 = {len(tools)}")
+    if local:
+        result = cut_with_tools_local(shape, tools, fuzzy_value=fuzzy_value, parallel=parallel)
+    else:
+        result = cut_with_tools(shape, tools, fuzzy_value=fuzzy_value, parallel=parallel)
+    write_step_shape(result, output_path)
+    # 记录实际切出的坑，供 mesh_make 在坑周围加密网格
+    write_pit_manifest(pit_manifest_path(output_path), all_pits, factory.semi_axes, source_step=step_path)
+
 def main():
     step_path = "./SpurGear1.STEP"
     output_path = "./SpurGear1_cut.step"
     ellipsoid_template_path = "./tuoqiu.STEP"
     target_face_ids = {22, 23, 26}
     pit_uv_list, scale_xyz_list = generate_all_pits_from_pitch(num_centers=2, level=2)
-    shape = read_step_shape(step_path)
-    grouped_info = extract_pit_info_from_faces(shape, target_face_ids, pit_uv_list, scale_xyz_list)
-    cut_ellipsoids_on_faces_per_face_fused(step_path, ellipsoid_template_path, grouped_info, output_path)
+    shape = load_step_shape(step_path)
+    samplers = build_face_samplers(shape, target_face_ids, face_index=get_face_index(step_path), grid=False)
+    grouped_info = extract_pit_info_from_faces(shape, target_face_ids, pit_uv_list, scale_xyz_list, samplers=samplers)
+    cut_ellipsoids_on_faces_multi_tool(step_path, ellipsoid_template_path, grouped_info, output_path)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,164 @@
+import os
+import json
+import math
+import hashlib
+import numpy as np
+from OCC.Core.TopoDS import topods
+from OCC.Core.TopAbs import TopAbs_FACE
+from OCC.Core.TopExp import TopExp_Explorer
+from OCC.Core.BRepAdaptor import BRepAdaptor_Surface
+from OCC.Core.BRepBndLib import brepbndlib
+from OCC.Core.BRepGProp import brepgprop
+from OCC.Core.GProp import GProp_GProps
+from OCC.Core.Bnd import Bnd_Box
+from OCC.Core.GeomAbs import GeomAbs_BSplineSurface, GeomAbs_BezierSurface
+from shape_cache import load_step_shape, cached_path, store_cache, touch_cache
+
+# 缓存格式变化时递增，旧缓存自动重建
+INDEX_VERSION = 1
+FREEFORM_TYPES = (int(GeomAbs_BSplineSurface), int(GeomAbs_BezierSurface))
+
+_index_memo = {}
+
+
+def explore_faces(shape):
+    """按 TopExp_Explorer 顺序列出全部面，列表下标即各脚本中使用的面 ID"""
+    faces = []
+    exp = TopExp_Explorer(shape, TopAbs_FACE)
+    while exp.More():
+        faces.append(topods.Face(exp.Current()))
+        exp.Next()
+    return faces
+
+
+def face_signature(surface_type, area, centroid):
+    """与面序号无关的几何签名，STEP 重新导出后可据此重新找到同一个面"""
+    key = f"{surface_type}|{area:.3f}|{centroid[0]:.3f}|{centroid[1]:.3f}|{centroid[2]:.3f}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class FaceIndex:
+    """
+    基准齿轮的面索引
+    每个面记录 explorer 序号、曲面类型、包围盒、形心、面积和几何签名，以 NumPy 数组保存；
+    按 ID 取面为 O(1)，按轮齿等几何条件查询为向量化筛选，之后不再遍历形状
+
+    参数:
+        records (dict): surface_type / bbox / centroid / area / signature 数组
+        faces (list): explorer 顺序的 TopoDS_Face 列表，可为 None（只做几何查询）
+    """
+
+    def __init__(self, records, faces=None):
+        self.surface_type = np.asarray(records["surface_type"], dtype=int)
+        self.bbox = np.asarray(records["bbox"], dtype=float).reshape(-1, 6)
+        self.centroid = np.asarray(records["centroid"], dtype=float).reshape(-1, 3)
+        self.area = np.asarray(records["area"], dtype=float)
+        self.signature = list(records["signature"])
+        self.faces = faces
+        self._by_signature = {sig: i for i, sig in enumerate(self.signature)}
+        self._tooth_buckets = {}
+
+    def __len__(self):
+        return len(self.area)
+
+    @classmethod
+    def build(cls, shape, faces=None):
+        faces = faces if faces is not None else explore_faces(shape)
+        records = {"surface_type": [], "bbox": [], "centroid": [], "area": [], "signature": []}
+        for face in faces:
+            surface_type = int(BRepAdaptor_Surface(face).GetType())
+            box = Bnd_Box()
+            brepbndlib.Add(face, box)
+            props = GProp_GProps()
+            brepgprop.SurfaceProperties(face, props)
+            c = props.CentreOfMass()
+            centroid = (c.X(), c.Y(), c.Z())
+            records["surface_type"].append(surface_type)
+            records["bbox"].append(list(box.Get()))
+            records["centroid"].append(centroid)
+            records["area"].append(props.Mass())
+            records["signature"].append(face_signature(surface_type, props.Mass(), centroid))
+        return cls(records, faces)
+
+    def to_records(self):
+        return {
+            "version": INDEX_VERSION,
+            "surface_type": self.surface_type.tolist(),
+            "bbox": self.bbox.tolist(),
+            "centroid": self.centroid.tolist(),
+            "area": self.area.tolist(),
+            "signature": self.signature,
+        }
+
+    def face(self, face_id):
+        return self.faces[face_id]
+
+    def faces_by_id(self, face_ids, freeform_only=False):
+        """{face_id: TopoDS_Face}；freeform_only 时只保留 NURBS / Bezier 面"""
+        return {fid: self.faces[fid] for fid in sorted(face_ids)
+                if not freeform_only or self.surface_type[fid] in FREEFORM_TYPES}
+
+    def find_signature(self, signature):
+        return self._by_signature.get(signature)
+
+    def faces_in_box(self, bbox, tol=1e-3):
+        """形心落在 bbox (xmin, ymin, zmin, xmax, ymax, zmax) 内的面 ID"""
+        lo = np.asarray(bbox[:3]) - tol
+        hi = np.asarray(bbox[3:]) + tol
+        mask = np.all((self.centroid >= lo) & (self.centroid <= hi), axis=1)
+        return np.nonzero(mask)[0].tolist()
+
+    def tooth_flanks(self, k, num_teeth, origin=(0.0, 0.0), phase=0.0):
+        """
+        第 k 个轮齿的齿面（NURBS 面）ID
+        轮齿 k 的角度范围为以 phase + k * 2π / num_teeth 为中心、宽一个齿距的扇区，
+        各齿分桶结果按 (num_teeth, origin, phase) 缓存，之后查询为 O(1)
+        """
+        key = (num_teeth, tuple(origin), phase)
+        buckets = self._tooth_buckets.get(key)
+        if buckets is None:
+            pitch = 2 * math.pi / num_teeth
+            angle = np.arctan2(self.centroid[:, 1] - origin[1], self.centroid[:, 0] - origin[0])
+            tooth = np.floor(((angle - phase) / pitch + 0.5) % num_teeth).astype(int)
+            freeform = np.isin(self.surface_type, FREEFORM_TYPES)
+            buckets = {t: np.nonzero(freeform & (tooth == t))[0].tolist() for t in range(num_teeth)}
+            self._tooth_buckets[key] = buckets
+        return buckets[k % num_teeth]
+
+
+def get_face_index(step_path, cache_dir=None):
+    """
+    读取（或首次建立并缓存）基准 STEP 的面索引
+    缓存文件与 shape_cache 共用目录和内容哈希，后缀 .faces.json
+    """
+    index_path = cached_path(step_path, suffix=".faces.json", cache_dir=cache_dir)
+    index = _index_memo.get(index_path)
+    if index is not None:
+        return index
+
+    shape = load_step_shape(step_path, cache_dir=cache_dir)
+    faces = explore_faces(shape)
+    records = None
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            touch_cache(index_path)
+        except (OSError, ValueError):
+            records = None  # 读到损坏的文件或读取时已被淘汰，按未命中处理
+        if records is not None and (records.get("version") != INDEX_VERSION or len(records["area"]) != len(faces)):
+            records = None
+
+    if records is None:
+        index = FaceIndex.build(shape, faces)
+        records = index.to_records()
+
+        def write(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(records, f)
+
+        store_cache(index_path, write)
+    else:
+        index = FaceIndex(records, faces)
+    _index_memo[index_path] = index
+    return index
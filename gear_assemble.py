@@ -1,27 +1,65 @@
+import os
 import cadquery as cq
-import math
+from concurrent.futures import ProcessPoolExecutor
+from shape_cache import load_step_workplane, cached_path
+from gear_layout import gear2_align_angle, gear2_offset
 
-# === 参数 ===
-modulus = 3.75
-z1, z2 = 19, 20
-face_width1 = 36
-face_width2 = 15
-center_distance = modulus * (z1 + z2) / 2
-gear2_align_angle = 360 / (2 * z2)  # 齿槽对齐
 
-# === 加载 STEP 文件 ===
-gear1 = cq.importers.importStep("./Macro/SpurGear1_cut.step")
-# gear2 = cq.importers.importStep("./Macro/SpurGear2_cut.step")
-gear2 = cq.importers.importStep("./Macro/SpurGear2.step")
+def _warm_cache(file_name):
+    """子进程中解析 STEP 并写入二进制 BREP 缓存"""
+    load_step_workplane(file_name)
+    return file_name
 
-# === 移动和旋转 gear2 使其正确啮合 ===
-gear2 = gear2.rotate((0, 0, 0), (0, 0, 1), -1 * gear2_align_angle)
-gear2 = gear2.translate((center_distance + 0.001, 0, 0))
 
-# === 合并两个齿轮模型 ===
-assembly = gear1.union(gear2)
+def load_gears(gear1_file_name, gear2_file_name):
+    """
+    并发加载两个齿轮
+    gear1 是每次运行重新生成的损伤齿轮，直接读 STEP、不写缓存；
+    gear2 是固定输入，走 shape_cache。gear2 尚未缓存时在子进程中解析并写缓存，与主进程解析 gear1 同时进行
+    """
+    if os.path.exists(cached_path(gear2_file_name)):
+        return load_step_workplane(gear1_file_name, cache=False), load_step_workplane(gear2_file_name)
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        warm = pool.submit(_warm_cache, gear2_file_name)
+        gear1 = load_step_workplane(gear1_file_name, cache=False)
+        warm.result()
+    return gear1, load_step_workplane(gear2_file_name)
 
-# === 导出为组合的 STEP 文件 ===
-cq.exporters.export(assembly, "./gear_step/assembled_gear_pair.step")
 
-print("extract successfully:assembled_gear_pair.step")
\ No newline at end of file
+def gear2_location():
+    """gear2 先绕 Z 轴旋转齿槽对齐角，再平移到中心距处"""
+    rotation = cq.Location(cq.Vector(0, 0, 0), cq.Vector(0, 0, 1), -1 * gear2_align_angle)
+    translation = cq.Location(cq.Vector(gear2_offset, 0, 0))
+    return translation * rotation
+
+
+def assemble_gear(gear1_file_name="./Macro/SpurGear1_cut.step", gear2_file_name="./Macro/SpurGear2.step",
+                  output_file_name="./gear_step/assembled_gear_pair.step", mode="compound"):
+    """
+    组装齿轮副并导出 STEP
+
+    参数:
+        mode (str): "compound" 两个实体直接组成 compound 导出（gear2 只附加位置变换，不做布尔）；
+                    "union" 为原先的布尔并集方式
+    """
+    gear1, gear2 = load_gears(gear1_file_name, gear2_file_name)
+
+    if mode == "union":
+        # === 移动和旋转 gear2 使其正确啮合 ===
+        gear2 = gear2.rotate((0, 0, 0), (0, 0, 1), -1 * gear2_align_angle)
+        gear2 = gear2.translate((gear2_offset, 0, 0))
+        # === 合并两个齿轮模型 ===
+        assembly = gear1.union(gear2)
+    else:
+        # 两齿轮互不重叠，mesh_make / Auto.py 本来就按两个体处理，无需布尔并集
+        location = gear2_location()
+        assembly = cq.Compound.makeCompound(gear1.vals() + [s.moved(location) for s in gear2.vals()])
+
+    # === 导出为组合的 STEP 文件 ===
+    cq.exporters.export(assembly, output_file_name)
+
+    print(f"extract successfully:{os.path.basename(output_file_name)}")
+
+
+if __name__ == '__main__':
+    assemble_gear()
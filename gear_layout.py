@@ -0,0 +1,23 @@
+import math
+import numpy as np
+
+# === 齿轮副参数（gear_assemble 装配与 pit_manifest 坐标换算共用，不依赖 cadquery）===
+modulus = 3.75
+z1, z2 = 19, 20
+face_width1 = 36
+face_width2 = 15
+center_distance = modulus * (z1 + z2) / 2
+gear2_align_angle = 360 / (2 * z2)  # 齿槽对齐
+gear2_offset = center_distance + 0.001  # gear2 中心的 X 坐标
+
+
+def gear_placement(gear):
+    """
+    齿轮自身坐标 -> 装配体坐标的 (R, t)，x_装配 = R @ x + t
+    gear1 不做变换；gear2 先绕 Z 轴旋转齿槽对齐角，再平移到中心距处（与 gear_assemble.gear2_location 一致）
+    """
+    if gear == 1:
+        return np.eye(3), np.zeros(3)
+    a = math.radians(-gear2_align_angle)
+    rotation = np.array([[math.cos(a), -math.sin(a), 0.0], [math.sin(a), math.cos(a), 0.0], [0.0, 0.0, 1.0]])
+    return rotation, np.array([gear2_offset, 0.0, 0.0])
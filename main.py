@@ -1,10 +1,34 @@
+import argparse
 import gear_assemble
 import mesh_make
 import u2c
 import surface_make
 
-gear_assemble.assemble_gear(gear1_file_name="gear_step/SpurGear1.STEP",gear2_file_name="gear_step/SpurGear2.STEP")
-mesh_make.make_mesh()
-u2c.convert_u2c()
-surface_make.make_surface("contact_1")
-surface_make.make_surface("contact_2")
\ No newline at end of file
+if __name__ == "__main__":
+    # 网格和装配会启动子进程（Windows 下以 spawn 方式重新导入本模块），流程代码需放在 main 保护下
+    parser = argparse.ArgumentParser(description="齿轮副装配 -> 网格 -> CalculiX INP 流程")
+    parser.add_argument("--mesh-profile", default="accurate", choices=list(mesh_make.MESH_PROFILES),
+                        help="网格档位: fast / balanced / accurate")
+    parser.add_argument("--mesh-refinement", default="curvature", choices=["curvature", "contact"],
+                        help="curvature: 全模型曲率细化; contact: 只细化啮合区和点蚀坑")
+    parser.add_argument("--mesh-cache", action="store_true", help="逐个齿轮划分并复用未变化齿轮的网格缓存")
+    parser.add_argument("--mesh-periodic", action="store_true", help="健康轮齿只划分一个扇区并旋转复制")
+    parser.add_argument("--mesh-parallel", action="store_true", help="两个齿轮在各自的子进程中同时划分，UNV 各数据集也并行解码")
+    parser.add_argument("--pit-manifest", default=None,
+                        help="齿轮1损伤时写出的坑清单（*.pits.json），在每个坑周围按坑半径加密网格")
+    parser.add_argument("--direct-inp", action="store_true", help="make_mesh 直接写出 INP，跳过 UNV 的写出和转换")
+    args = parser.parse_args()
+
+    gear_assemble.assemble_gear(gear1_file_name="gear_step/SpurGear1.STEP",gear2_file_name="gear_step/SpurGear2.STEP")
+    if args.direct_inp:
+        mesh_make.make_mesh(unv_path=None, inp_path="assembled_gears_OUT.inp",
+                            profile=args.mesh_profile, refinement=args.mesh_refinement,
+                            mesh_cache=args.mesh_cache, periodic=args.mesh_periodic, parallel=args.mesh_parallel,
+                            pit_manifest=args.pit_manifest)
+    else:
+        mesh_make.make_mesh(profile=args.mesh_profile, refinement=args.mesh_refinement,
+                            mesh_cache=args.mesh_cache, periodic=args.mesh_periodic, parallel=args.mesh_parallel,
+                            pit_manifest=args.pit_manifest)
+        u2c.convert_u2c(parallel=args.mesh_parallel)
+    surface_make.make_surface("contact_1")
+    surface_make.make_surface("contact_2")
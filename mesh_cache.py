@@ -0,0 +1,281 @@
+import os
+import math
+import json
+import hashlib
+import numpy as np
+import gmsh
+from shape_cache import CACHE_DIR, _write_atomic
+
+# 缓存格式或划分流程变化时递增，旧缓存自动失效
+MESH_CACHE_VERSION = 1
+
+# 单个齿轮网格的数组表示，各字段含义：
+#   node_tags (n,), coords (n, 3)
+#   entity_dim / entity_tag (e,): 网格所在的几何实体
+#   block_entity / block_type (b,): 单元块所属实体（entity 数组下标）和 gmsh 单元类型
+#   block_elem_offsets (b+1,) + elem_tags: 各单元块的单元编号
+#   block_node_offsets (b+1,) + elem_nodes: 各单元块的连接表（按单元展平）
+#   group_dim / group_name (g,) + group_entity_offsets (g+1,) + group_entities: 物理组
+MESH_FIELDS = ("node_tags", "coords", "entity_dim", "entity_tag", "block_entity", "block_type",
+               "block_elem_offsets", "elem_tags", "block_node_offsets", "elem_nodes",
+               "group_dim", "group_name", "group_entity_offsets", "group_entities")
+
+
+def _offsets(chunks):
+    return np.concatenate([[0], np.cumsum([len(c) for c in chunks])]).astype(np.int64)
+
+
+def _concat(chunks, dtype):
+    return np.concatenate(chunks).astype(dtype) if chunks else np.zeros(0, dtype=dtype)
+
+
+def mesh_arrays_from_model(dims=(2, 3)):
+    """
+    把当前 gmsh 模型中 dims 维实体上的网格和全部物理组导出为数组
+    一维、零维单元（棱线、顶点）不导出，write_inp 本来也不使用它们
+    """
+    node_tags, coords, _ = gmsh.model.mesh.getNodes()
+    entities = [(dim, tag) for dim in dims for _, tag in gmsh.model.getEntities(dim)]
+
+    block_entity, block_type, elem_tags, elem_nodes = [], [], [], []
+    for e, (dim, tag) in enumerate(entities):
+        types, tags, nodes = gmsh.model.mesh.getElements(dim, tag)
+        for t, et, en in zip(types, tags, nodes):
+            block_entity.append(e)
+            block_type.append(t)
+            elem_tags.append(np.asarray(et))
+            elem_nodes.append(np.asarray(en))
+
+    group_dim, group_name, group_entities = [], [], []
+    for dim, pg in gmsh.model.getPhysicalGroups():
+        group_dim.append(dim)
+        group_name.append(gmsh.model.getPhysicalName(dim, pg))
+        group_entities.append(np.asarray(gmsh.model.getEntitiesForPhysicalGroup(dim, pg)))
+
+    return {
+        "node_tags": np.asarray(node_tags, dtype=np.int64),
+        "coords": np.asarray(coords, dtype=float).reshape(-1, 3),
+        "entity_dim": np.array([d for d, _ in entities], dtype=np.int64),
+        "entity_tag": np.array([t for _, t in entities], dtype=np.int64),
+        "block_entity": np.array(block_entity, dtype=np.int64),
+        "block_type": np.array(block_type, dtype=np.int64),
+        "block_elem_offsets": _offsets(elem_tags),
+        "elem_tags": _concat(elem_tags, np.int64),
+        "block_node_offsets": _offsets(elem_nodes),
+        "elem_nodes": _concat(elem_nodes, np.int64),
+        "group_dim": np.array(group_dim, dtype=np.int64),
+        "group_name": np.array(group_name, dtype=str),
+        "group_entity_offsets": _offsets(group_entities),
+        "group_entities": _concat(group_entities, np.int64),
+    }
+
+
+def _coalesce_groups(mesh):
+    """同维同名的物理组合并为一个（按首次出现的顺序）"""
+    go = mesh["group_entity_offsets"]
+    keys = list(zip(mesh["group_dim"].tolist(), mesh["group_name"].tolist()))
+    order = list(dict.fromkeys(keys))
+    if len(order) == len(keys):
+        return mesh
+    entities = [np.concatenate([mesh["group_entities"][go[g]:go[g + 1]] for g, k in enumerate(keys) if k == key])
+                for key in order]
+    mesh["group_dim"] = np.array([d for d, _ in order], dtype=np.int64)
+    mesh["group_name"] = np.array([n for _, n in order], dtype=str)
+    mesh["group_entity_offsets"] = _offsets(entities)
+    mesh["group_entities"] = _concat(entities, np.int64)
+    return mesh
+
+
+def merge_mesh_arrays(meshes):
+    """
+    合并多个网格数组（两个齿轮，或同一齿轮的多个扇区）
+    节点、单元和各维实体编号依次加上前面网格的最大编号，保证合并后连续且互不冲突；
+    同名物理组合并
+    """
+    merged = {k: [] for k in MESH_FIELDS if not k.endswith("_offsets")}
+    elem_counts, node_counts, group_counts = [], [], []
+    node_off = elem_off = n_entities = 0
+    entity_off = {}
+    for mesh in meshes:
+        dim_off = np.array([entity_off.get(d, 0) for d in mesh["entity_dim"]], dtype=np.int64)
+        group_off = np.repeat([entity_off.get(d, 0) for d in mesh["group_dim"]],
+                              np.diff(mesh["group_entity_offsets"])).astype(np.int64)
+
+        merged["node_tags"].append(mesh["node_tags"] + node_off)
+        merged["coords"].append(mesh["coords"])
+        merged["entity_dim"].append(mesh["entity_dim"])
+        merged["entity_tag"].append(mesh["entity_tag"] + dim_off)
+        merged["block_entity"].append(mesh["block_entity"] + n_entities)
+        merged["block_type"].append(mesh["block_type"])
+        merged["elem_tags"].append(mesh["elem_tags"] + elem_off)
+        merged["elem_nodes"].append(mesh["elem_nodes"] + node_off)
+        merged["group_dim"].append(mesh["group_dim"])
+        merged["group_name"].append(mesh["group_name"])
+        merged["group_entities"].append(mesh["group_entities"] + group_off)
+        elem_counts.append(np.diff(mesh["block_elem_offsets"]))
+        node_counts.append(np.diff(mesh["block_node_offsets"]))
+        group_counts.append(np.diff(mesh["group_entity_offsets"]))
+
+        node_off += int(mesh["node_tags"].max(initial=0))
+        elem_off += int(mesh["elem_tags"].max(initial=0))
+        n_entities += len(mesh["entity_tag"])
+        for d in np.unique(mesh["entity_dim"]):
+            entity_off[d] = entity_off.get(d, 0) + int(mesh["entity_tag"][mesh["entity_dim"] == d].max())
+
+    result = {k: np.concatenate(v) for k, v in merged.items()}
+    result["coords"] = result["coords"].reshape(-1, 3)
+    for key, counts in (("block_elem_offsets", elem_counts), ("block_node_offsets", node_counts),
+                        ("group_entity_offsets", group_counts)):
+        result[key] = np.concatenate([[0], np.cumsum(np.concatenate(counts))]).astype(np.int64)
+    return _coalesce_groups(result)
+
+
+def submesh(mesh, keep_entity):
+    """
+    按实体筛选网格数组：只保留 keep_entity (e,) 为 True 的实体上的单元块，
+    节点只保留被这些单元引用的，物理组只保留其中仍存在的实体
+    """
+    keep_entity = np.asarray(keep_entity, dtype=bool)
+    new_index = np.cumsum(keep_entity) - 1
+    eo, no = mesh["block_elem_offsets"], mesh["block_node_offsets"]
+    blocks = np.nonzero(keep_entity[mesh["block_entity"]])[0]
+    elem_tags = [mesh["elem_tags"][eo[b]:eo[b + 1]] for b in blocks]
+    elem_nodes = [mesh["elem_nodes"][no[b]:no[b + 1]] for b in blocks]
+
+    used = np.unique(_concat(elem_nodes, np.int64))
+    node_keep = np.isin(mesh["node_tags"], used)
+
+    kept = set(zip(mesh["entity_dim"][keep_entity].tolist(), mesh["entity_tag"][keep_entity].tolist()))
+    go = mesh["group_entity_offsets"]
+    group_dim, group_name, group_entities = [], [], []
+    for g, dim in enumerate(mesh["group_dim"].tolist()):
+        ents = [t for t in mesh["group_entities"][go[g]:go[g + 1]].tolist() if (dim, t) in kept]
+        if ents:
+            group_dim.append(dim)
+            group_name.append(mesh["group_name"][g])
+            group_entities.append(np.array(ents, dtype=np.int64))
+
+    return {
+        "node_tags": mesh["node_tags"][node_keep],
+        "coords": mesh["coords"][node_keep],
+        "entity_dim": mesh["entity_dim"][keep_entity],
+        "entity_tag": mesh["entity_tag"][keep_entity],
+        "block_entity": new_index[mesh["block_entity"][blocks]],
+        "block_type": mesh["block_type"][blocks],
+        "block_elem_offsets": _offsets(elem_tags),
+        "elem_tags": _concat(elem_tags, np.int64),
+        "block_node_offsets": _offsets(elem_nodes),
+        "elem_nodes": _concat(elem_nodes, np.int64),
+        "group_dim": np.array(group_dim, dtype=np.int64),
+        "group_name": np.array(group_name, dtype=str),
+        "group_entity_offsets": _offsets(group_entities),
+        "group_entities": _concat(group_entities, np.int64),
+    }
+
+
+def rotate_mesh(mesh, angle, origin=(0.0, 0.0, 0.0)):
+    """网格绕过 origin 的 Z 轴旋转 angle（弧度），返回副本"""
+    c, s = math.cos(angle), math.sin(angle)
+    R = np.array([[c, -s, 0.0], [s, c, 0.0], [0.0, 0.0, 1.0]])
+    o = np.asarray(origin, dtype=float)
+    rotated = dict(mesh)
+    rotated["coords"] = (mesh["coords"] - o) @ R.T + o
+    return rotated
+
+
+def weld_nodes(mesh, tol=1e-6):
+    """
+    合并坐标重合（距离 < tol）的节点，用于拼接扇区网格
+    节点按首次出现的顺序重新编号为 1..n，连接表随之更新
+    """
+    from scipy.spatial import cKDTree
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    coords = mesh["coords"]
+    n = len(coords)
+    pairs = cKDTree(coords).query_pairs(tol, output_type="ndarray")
+    graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    first = np.full(labels.max() + 1, n)
+    np.minimum.at(first, labels, np.arange(n))
+    order = np.argsort(first)
+    new_index = np.empty_like(order)
+    new_index[order] = np.arange(len(order))
+
+    sorter = np.argsort(mesh["node_tags"])
+    old_index = sorter[np.searchsorted(mesh["node_tags"], mesh["elem_nodes"], sorter=sorter)]
+    welded = dict(mesh)
+    welded["node_tags"] = np.arange(1, len(order) + 1, dtype=np.int64)
+    welded["coords"] = coords[first[order]]
+    welded["elem_nodes"] = new_index[labels[old_index]] + 1
+    print(f"节点焊接: {n} -> {len(order)}")
+    return welded
+
+
+def load_mesh_into_gmsh(mesh, model_name="gear_pair"):
+    """
+    初始化 gmsh 并把网格数组装入离散模型，调用方负责 gmsh.finalize()
+    节点全部挂在第一个体实体上；物理组按名称重建，体组在前
+    """
+    gmsh.initialize()
+    gmsh.option.setNumber("General.Terminal", 1)
+    gmsh.model.add(model_name)
+
+    for dim, tag in zip(mesh["entity_dim"], mesh["entity_tag"]):
+        gmsh.model.addDiscreteEntity(int(dim), int(tag))
+    owner = int(np.argmax(mesh["entity_dim"]))
+    gmsh.model.mesh.addNodes(int(mesh["entity_dim"][owner]), int(mesh["entity_tag"][owner]),
+                             mesh["node_tags"], mesh["coords"].ravel())
+
+    eo, no = mesh["block_elem_offsets"], mesh["block_node_offsets"]
+    for b, (e, t) in enumerate(zip(mesh["block_entity"], mesh["block_type"])):
+        gmsh.model.mesh.addElementsByType(int(mesh["entity_tag"][e]), int(t),
+                                          mesh["elem_tags"][eo[b]:eo[b + 1]], mesh["elem_nodes"][no[b]:no[b + 1]])
+
+    go = mesh["group_entity_offsets"]
+    for g in sorted(range(len(mesh["group_name"])), key=lambda g: -mesh["group_dim"][g]):
+        dim = int(mesh["group_dim"][g])
+        pg = gmsh.model.addPhysicalGroup(dim, mesh["group_entities"][go[g]:go[g + 1]].tolist())
+        gmsh.model.setPhysicalName(dim, pg, str(mesh["group_name"][g]))
+
+
+def write_mesh_arrays(mesh, out_path, model_name="gear_pair"):
+    """把网格数组经 gmsh 离散模型写出（格式按扩展名，如 .unv）"""
+    load_mesh_into_gmsh(mesh, model_name)
+    gmsh.option.setNumber("Mesh.SaveAll", 1)
+    gmsh.option.setNumber("Mesh.SaveGroupsOfNodes", 1)
+    gmsh.write(out_path)
+    gmsh.finalize()
+
+
+def gear_geometry_hash(volume_tag, features):
+    """
+    齿轮体的几何哈希：体积、包围盒及各表面形心和尺寸（取 1e-4 精度）
+    需在导入几何后调用，features 为 mesh_make.surface_feature_table 的结果
+    """
+    h = hashlib.sha1()
+    h.update(np.round([gmsh.model.occ.getMass(3, volume_tag)], 4).tobytes())
+    h.update((np.round(gmsh.model.getBoundingBox(3, volume_tag), 4) + 0.0).tobytes())
+    table = np.column_stack([features["centroid"], features["size"]])
+    table = np.round(table, 4) + 0.0  # 消除 -0.0
+    h.update(table[np.lexsort(table.T[::-1])].tobytes())
+    return h.hexdigest()
+
+
+def mesh_cache_path(geometry_hash, mesh_params, cache_dir=None):
+    """按几何哈希和划分参数（档位、细化方式等，可 JSON 序列化）确定缓存文件"""
+    cache_dir = cache_dir or CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    key = json.dumps({"version": MESH_CACHE_VERSION, "gmsh": gmsh.__version__,
+                      "geometry": geometry_hash, "params": mesh_params}, sort_keys=True)
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".mesh.npz")
+
+
+def save_mesh_arrays(path, mesh):
+    _write_atomic(path, lambda p: np.savez(p, **mesh))
+
+
+def load_mesh_arrays(path):
+    with np.load(path) as data:
+        return {k: data[k] for k in MESH_FIELDS}
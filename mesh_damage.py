@@ -0,0 +1,217 @@
+import os
+import sys
+import numpy as np
+from unv2xc import FEM, UNVParser
+from unv2calculix import write_inp
+from pit_prune import rotation_from_y, pit_arrays
+
+# UNV 四面体：角节点和棱中节点在连接表中的位置（棱中节点顺序 m12, m23, m31, m14, m24, m34）
+TET_CORNERS = {111: [0, 1, 2, 3], 118: [0, 2, 4, 9]}
+TET_MIDS = {118: [1, 3, 5, 6, 7, 8]}
+# 四面体四个面的角节点、对应棱中节点（局部编号）及对顶点
+TET_FACES = np.array([[0, 1, 2], [0, 1, 3], [0, 2, 3], [1, 2, 3]])
+TET_FACE_MIDS = np.array([[0, 1, 2], [0, 4, 3], [2, 5, 3], [1, 5, 4]])
+TET_OPPOSITE = np.array([3, 2, 1, 0])
+
+
+def template_semi_axes(template_path):
+    """椭球模板 tuoqiu.STEP 的三个半轴长（模板坐标系 x, y, z）"""
+    from pit_tools import get_pit_tool_factory
+    return get_pit_tool_factory(template_path).semi_axes
+
+
+def pits_from_grouped_info(grouped_info):
+    """extract_pit_info_from_faces 的结果 -> (centers, normals, scales) 三个 (n, 3) 数组"""
+    return pit_arrays([pit for pit_info_list in grouped_info.values() for pit in pit_info_list])
+
+
+def tet_volumes(coords, tets):
+    a, b, c, d = (coords[tets[:, k]] for k in range(4))
+    return np.einsum("ij,ij->i", np.cross(b - a, c - a), d - a) / 6.0
+
+
+class HealthyMesh:
+    """
+    健康齿轮网格缓存：在网格空间直接施加点蚀，跳过 CAD 布尔、STEP 导出和重新划分网格
+    UNV 只解析一次，并预计算节点坐标数组、目标齿轮的表面节点及外法向、节点邻接边
+
+    参数:
+        unv_path (str): 健康齿轮副的 UNV 网格（mesh_make.make_mesh 的输出）
+        gear_group (str): 施加点蚀的齿轮体物理组名，找不到时使用全部体单元
+    """
+
+    def __init__(self, unv_path, gear_group="Gear1"):
+        self.unv_path = unv_path
+        # 健康网格在多次施加损伤之间不变，解析结果缓存在 UNV 旁
+        self.FEM = fem = UNVParser(unv_path, cache=True).parse()
+        self.node_ids = fem.node_ids
+        self.coords = fem.coords
+        order = np.argsort(self.node_ids)
+
+        in_gear = None
+        for group in fem.elemsets:
+            if group.name == gear_group:
+                in_gear = np.isin(fem.elem_ids, group.items)
+        if in_gear is None:
+            print(f"⚠️ 未找到体物理组 {gear_group}，点蚀将作用于全部体单元")
+            in_gear = np.ones(fem.nelems, dtype=bool)
+
+        tets, mids, edges = [], [], []
+        for elem_type, corners in TET_CORNERS.items():
+            sel = np.nonzero((fem.elem_types == elem_type) & in_gear)[0]
+            if not len(sel):
+                continue
+            nn = int(fem.elem_nnodes[sel[0]])
+            conn = fem.cntvt[fem.cntvt_offsets[sel][:, None] + np.arange(nn)]
+            idx = order[np.searchsorted(self.node_ids, conn, sorter=order)]
+            tets.append(idx[:, corners])
+            if elem_type in TET_MIDS:
+                mids.append(idx[:, TET_MIDS[elem_type]])
+            # 单元内节点两两相连，作为内部节点光顺的邻接关系
+            a, b = np.triu_indices(nn, 1)
+            edges.append(np.column_stack([idx[:, a].ravel(), idx[:, b].ravel()]))
+        if mids and sum(map(len, mids)) != sum(map(len, tets)):
+            raise ValueError("目标齿轮同时含有一阶和二阶四面体，暂不支持")
+
+        self.tets = np.concatenate(tets).astype(np.int64) if tets else np.zeros((0, 4), dtype=np.int64)
+        self.tet_mids = np.concatenate(mids).astype(np.int64) if mids else None
+        edges = np.concatenate(edges) if edges else np.zeros((0, 2), dtype=np.int64)
+        self.edges = np.unique(np.sort(edges.astype(np.int64), axis=1), axis=0)
+        self._build_surface()
+        print(f"健康网格: 节点 {len(self.node_ids)} 个, 目标齿轮四面体 {len(self.tets)} 个, "
+              f"表面节点 {len(self.surface_nodes)} 个")
+
+    def _build_surface(self):
+        """只出现一次的四面体面即边界面；由对顶点判断外法向，面积加权平均得到节点法向"""
+        faces = self.tets[:, TET_FACES].reshape(-1, 3)
+        opposite = self.tets[:, TET_OPPOSITE].reshape(-1)
+        _, inverse, counts = np.unique(np.sort(faces, axis=1), axis=0, return_inverse=True, return_counts=True)
+        boundary = counts[inverse.ravel()] == 1
+
+        p0, p1, p2 = (self.coords[faces[:, k]] for k in range(3))
+        n = np.cross(p1 - p0, p2 - p0)
+        n[np.einsum("ij,ij->i", n, self.coords[opposite] - p0) > 0] *= -1
+        face_nodes = faces
+        if self.tet_mids is not None:
+            face_nodes = np.hstack([faces, self.tet_mids[:, TET_FACE_MIDS].reshape(-1, 3)])
+        face_nodes, n = face_nodes[boundary], n[boundary]
+
+        normals = np.zeros_like(self.coords)
+        for k in range(face_nodes.shape[1]):
+            np.add.at(normals, face_nodes[:, k], n)
+        surface = np.unique(face_nodes)
+        length = np.linalg.norm(normals[surface], axis=1)
+        keep = length > 0
+        self.surface_nodes = surface[keep]
+        self.surface_normals = normals[self.surface_nodes] / length[keep, None]
+
+    def pit_depths(self, centers, normals, scales, semi_axes):
+        """
+        每个表面节点沿外法向的内移量
+        节点在椭球内时，沿 -外法向 射线求与椭球远侧的交点，即刀具切除后的新表面；多个坑取最大值
+        """
+        P = self.coords[self.surface_nodes]
+        M = self.surface_normals
+        depth = np.zeros(len(P))
+        for c, n, s in zip(centers, normals, scales):
+            R = rotation_from_y(n)
+            radii = np.asarray(semi_axes) * np.asarray(s)
+            near = np.nonzero(np.all(np.abs(P - c) <= radii.max(), axis=1))[0]
+            if not len(near):
+                continue
+            D = ((P[near] - c) @ R) / radii  # 椭球单位球坐标
+            V = (M[near] @ R) / radii
+            dd = np.einsum("ij,ij->i", D, D)
+            inside = dd < 1.0
+            if not inside.any():
+                continue
+            D, V, dd, near = D[inside], V[inside], dd[inside], near[inside]
+            dv = np.einsum("ij,ij->i", D, V)
+            vv = np.einsum("ij,ij->i", V, V)
+            t = (dv + np.sqrt(dv * dv - vv * (dd - 1.0))) / vv
+            np.maximum.at(depth, near, t)
+        return depth
+
+    def apply_pits(self, centers, normals, scales, semi_axes, band=2.0, smooth_iters=30):
+        """
+        在网格上施加点蚀，返回新的节点坐标数组
+        表面节点按椭球轮廓内移；坑附近（band 倍最大半轴内）的内部节点做拉普拉斯位移光顺，
+        其余节点不动
+        """
+        disp = np.zeros_like(self.coords)
+        depth = self.pit_depths(centers, normals, scales, semi_axes)
+        disp[self.surface_nodes] = -depth[:, None] * self.surface_normals
+
+        is_fixed = np.ones(len(self.coords), dtype=bool)
+        if len(centers):
+            reach = band * (np.asarray(semi_axes) * np.asarray(scales)).max(axis=1)
+            gear_nodes = np.unique(self.edges)
+            free = np.zeros(len(gear_nodes), dtype=bool)
+            for c, r in zip(centers, reach):
+                free |= np.all(np.abs(self.coords[gear_nodes] - c) <= r, axis=1)
+            is_fixed[gear_nodes[free]] = False
+            is_fixed[self.surface_nodes] = True
+
+        i, j = self.edges[:, 0], self.edges[:, 1]
+        degree = np.bincount(np.concatenate([i, j]), minlength=len(self.coords)).astype(float)
+        free_nodes = np.nonzero(~is_fixed & (degree > 0))[0]
+        for _ in range(smooth_iters if len(free_nodes) else 0):
+            acc = np.zeros_like(disp)
+            np.add.at(acc, i, disp[j])
+            np.add.at(acc, j, disp[i])
+            disp[free_nodes] = acc[free_nodes] / degree[free_nodes, None]
+
+        coords = self.coords + disp
+        flipped = np.count_nonzero(np.sign(tet_volumes(coords, self.tets)) != np.sign(tet_volumes(self.coords, self.tets)))
+        print(f"网格空间点蚀: 坑 {len(centers)} 个, 内移表面节点 {np.count_nonzero(depth)} 个, "
+              f"光顺内部节点 {len(free_nodes)} 个, 最大深度 {depth.max(initial=0):.3f}mm")
+        if flipped:
+            print(f"⚠️ {flipped} 个四面体发生翻转，建议加密坑附近网格或增大 band")
+        return coords
+
+    def damaged_fem(self, coords):
+        """用新坐标构造 FEM，单元和分组与健康网格共用"""
+        fem = FEM()
+        fem.node_ids = self.node_ids
+        fem.coords = coords
+        for name in ("elem_ids", "elem_types", "elem_nnodes", "cntvt", "cntvt_offsets"):
+            setattr(fem, name, getattr(self.FEM, name))
+        fem.nodesets = list(self.FEM.nodesets)
+        fem.elemsets = list(self.FEM.elemsets)  # write_inp 会移除 X_ 分组，不能影响缓存
+        fem.nnodesets = len(fem.nodesets)
+        fem.nelemsets = len(fem.elemsets)
+        return fem
+
+    def write_damaged_inp(self, out_inp_path, centers, normals, scales, semi_axes, reduced='N', **kwargs):
+        coords = self.apply_pits(centers, normals, scales, semi_axes, **kwargs)
+        write_inp(self.damaged_fem(coords), out_inp_path, reduced)
+        print(f"✅ 网格空间损伤 INP 已写出: {out_inp_path}")
+
+
+def main():
+    """
+    以 test777 的坑生成参数在健康网格上施加点蚀，直接写出 CalculiX INP
+    健康网格需先用 mesh_make.make_mesh 对未损伤的齿轮副划分一次
+    """
+    macro_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Macro")
+    sys.path.append(macro_dir)
+    from test777 import generate_all_pits_from_pitch, extract_pit_info_from_faces
+    from shape_cache import load_step_shape
+    from face_index import get_face_index
+    from surface_sampler import build_face_samplers
+
+    step_path = os.path.join(macro_dir, "SpurGear1.STEP")
+    template_path = os.path.join(macro_dir, "tuoqiu.STEP")
+    target_face_ids = {22, 23, 26}
+
+    mesh = HealthyMesh("assembled_gears.unv", gear_group="Gear1")
+    shape = load_step_shape(step_path)
+    samplers = build_face_samplers(shape, target_face_ids, face_index=get_face_index(step_path), grid=False)
+    pit_uv_list, scale_xyz_list = generate_all_pits_from_pitch(num_centers=2, level=2)
+    grouped_info = extract_pit_info_from_faces(shape, target_face_ids, pit_uv_list, scale_xyz_list, samplers=samplers)
+    centers, normals, scales = pits_from_grouped_info(grouped_info)
+    mesh.write_damaged_inp("assembled_gears_OUT.inp", centers, normals, scales, template_semi_axes(template_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,56 @@ import sys
 import os
 import numpy as np
 import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from shape_cache import import_step_gmsh
+from unv2calculix import write_inp_arrays
+from mesh_report import MeshReport
+from pit_manifest import read_pit_manifest
+from mesh_cache import (mesh_arrays_from_model, merge_mesh_arrays, gear_geometry_hash,
+                        mesh_cache_path, save_mesh_arrays, load_mesh_arrays, submesh, rotate_mesh, weld_nodes,
+                        load_mesh_into_gmsh)
+
+# === 网格剖分档位 ===
+# threads: General.NumThreads，0 表示使用全部 CPU 核
+# algorithm_3d: 1 = Delaunay（单线程，最稳健），10 = HXT（多线程并行 Delaunay）
+# optimize / optimize_netgen: 四面体优化和 Netgen 优化的遍数，0 表示关闭
+# size_min / size_max: 全局单元尺寸上下限；curvature_size_min: 曲率细化区的最小尺寸
+MESH_PROFILES = {
+    "fast": {
+        "threads": 0, "algorithm_3d": 10, "optimize": 0, "optimize_netgen": 0,
+        "size_min": 0.8, "size_max": 6.0, "curvature_size_min": 0.6,
+    },
+    "balanced": {
+        "threads": 0, "algorithm_3d": 10, "optimize": 1, "optimize_netgen": 0,
+        "size_min": 0.5, "size_max": 5.0, "curvature_size_min": 0.4,
+    },
+    # 与原先的单一设置一致（Delaunay + 两种优化），仅开启多线程
+    "accurate": {
+        "threads": 0, "algorithm_3d": 1, "optimize": 1, "optimize_netgen": 1,
+        "size_min": 0.5, "size_max": 5.0, "curvature_size_min": 0.3,
+    },
+}
+
+
+def apply_mesh_profile(profile, threads=None):
+    """
+    按档位设置 gmsh 线程数、三维算法、优化遍数和尺寸上下限，返回该档位的参数字典
+    需在 gmsh.initialize() 之后、生成网格之前调用；threads 不为 None 时覆盖档位的线程数
+    """
+    if profile not in MESH_PROFILES:
+        raise ValueError(f"未知的网格档位: {profile}，可选 {list(MESH_PROFILES)}")
+    params = MESH_PROFILES[profile]
+    threads = threads or params["threads"] or os.cpu_count() or 1
+    gmsh.option.setNumber("General.NumThreads", threads)
+    gmsh.option.setNumber("Mesh.Algorithm3D", params["algorithm_3d"])
+    gmsh.option.setNumber("Mesh.Optimize", params["optimize"])
+    gmsh.option.setNumber("Mesh.OptimizeNetgen", params["optimize_netgen"])
+    gmsh.option.setNumber("Mesh.CharacteristicLengthMin", params["size_min"])
+    gmsh.option.setNumber("Mesh.CharacteristicLengthMax", params["size_max"])
+    print(f"网格档位: {profile} (线程 {threads}, Algorithm3D={params['algorithm_3d']}, "
+          f"Optimize={params['optimize']}, OptimizeNetgen={params['optimize_netgen']})")
+    return params
 
 
 # === 添加物理组 ===
@@ -20,93 +70,115 @@ def add_surface_group(name, tag_list):
         print(f"创建物理组 {name} 失败: {str(e)}")
         return -1
 
-# === 用于自动给内径面进行物理分组 ===
-def find_hole_surfaces(gear_volume_tag, origin_point, max_radial_distance=0.3):
+# === 表面特征表 ===
+def surface_feature_table(gear_volume_tag, exclude=()):
     """
-    精确识别内径面（孔的内表面）
-    使用的逻辑是将所有中心点坐标(x,y)满足:
-    x^2+y^2<=(max_radial_distance*r)^2的面分类到内径面中
-    max_radial_distance可以考虑的计算方式为:
-    max_radial_distance=齿轮内径/齿轮外径+0.05
+    一次遍历体的所有相邻表面，构建 NumPy 特征表，供内径面/接触面识别共用
+    每个表面只调用一次 getBoundingBox / getCenterOfMass / getParametrization / getNormal
 
     参数:
-        gear_volume_tag (int): 齿轮体积标签
-        origin_point (tuple): 齿轮中心点坐标 (x, y, z)
-        max_radial_distance (float): 最大径向距离系数 (相对于齿轮半径)
-    """
-    hole_surfaces = []
-    # 获取齿轮尺寸特征
-    bbox = gmsh.model.getBoundingBox(3, gear_volume_tag)
+        gear_volume_tag (int | list): 齿轮体标签；齿轮被切成多个扇区体时传入全部扇区的标签
+        exclude (iterable): 不参与识别的表面（如扇区之间的内部切面）
 
-    # 计算齿轮半径 (取最大尺寸的一半)
-    gear_radius = max(
-        (bbox[3] - bbox[0]) / 2,
-        (bbox[4] - bbox[1]) / 2,
-        (bbox[5] - bbox[2]) / 2
-    )
-
-    # origin = (bbox[3] + bbox[0]) / 2
-
-    print(f"齿轮 {gear_volume_tag} 中心点: {origin_point}, 半径: {gear_radius:.2f}mm")
-
-    # 获取所有相邻表面
+    返回:
+        dict: tags, centroid (n,3), normal (n,3 单位化), normal_norm, size (包围盒最大边长),
+              radial (到齿轮包围盒中心的 XY 距离), valid, gear_center, gear_radius
+        获取体信息失败时返回 None
+    """
+    volume_tags = [gear_volume_tag] if np.isscalar(gear_volume_tag) else list(gear_volume_tag)
     try:
-        _, surfaces = gmsh.model.getAdjacencies(3, gear_volume_tag)
-        print(f"齿轮 {gear_volume_tag} 共有 {len(surfaces)} 个表面")
+        boxes = np.array([gmsh.model.getBoundingBox(3, tag) for tag in volume_tags])
+        bbox_gear = (*boxes[:, :3].min(axis=0), *boxes[:, 3:].max(axis=0))
+        surfaces = []
+        for tag in volume_tags:
+            surfaces.extend(s for s in gmsh.model.getAdjacencies(3, tag)[1] if s not in surfaces)
+        excluded = set(exclude)
+        surfaces = [s for s in surfaces if s not in excluded]
     except Exception as e:
-        print(f"获取齿轮 {gear_volume_tag} 的相邻面失败: {str(e)}")
-        return hole_surfaces
-    #可以通过调用log.py中的代码来打印日志信息
-
-    for surf_tag in surfaces:
+        print(f"获取齿轮 {gear_volume_tag} 信息失败: {str(e)}")
+        return None
+
+    n = len(surfaces)
+    centroid = np.zeros((n, 3))
+    normal = np.zeros((n, 3))
+    size = np.zeros(n)
+    valid = np.ones(n, dtype=bool)
+    for i, surf_tag in enumerate(surfaces):
         try:
-            # 获取表面中心点
+            bbox = gmsh.model.getBoundingBox(2, surf_tag)
+            size[i] = max(bbox[3] - bbox[0], bbox[4] - bbox[1], bbox[5] - bbox[2])
             center = gmsh.model.occ.getCenterOfMass(2, surf_tag)
-
-            # 计算到齿轮中心的径向距离（忽略Z轴差异）
-            radial_vector = [
-                center[0] - origin_point[0],
-                center[1] - origin_point[1],
-                0  # 忽略Z轴差异
-            ]
-            radial_distance = np.linalg.norm(radial_vector)
-
-            # 计算法向量
+            centroid[i] = center
             uv = gmsh.model.getParametrization(2, surf_tag, center)
-            normal = gmsh.model.getNormal(surf_tag, uv)
-            normal_magnitude = np.linalg.norm(normal)
-
-            if normal_magnitude < 1e-6:
-                continue
+            normal[i] = gmsh.model.getNormal(surf_tag, uv)[:3]
+        except Exception as e:
+            print(f"  处理曲面 {surf_tag} 时出错: {str(e)}")
+            valid[i] = False
 
-            # 归一化法向量
-            normalized_normal = [n / normal_magnitude for n in normal]
+    normal_norm = np.linalg.norm(normal, axis=1)
+    has_normal = normal_norm > 1e-6
+    normal[has_normal] /= normal_norm[has_normal, None]
+    normal[~has_normal] = 0.0
 
-            z_vector = [0,0,1]
+    gear_center = np.array([(bbox_gear[0] + bbox_gear[3]) / 2,
+                            (bbox_gear[1] + bbox_gear[4]) / 2,
+                            (bbox_gear[2] + bbox_gear[5]) / 2])
+    # 计算齿轮半径 (取最大尺寸的一半)
+    gear_radius = max(
+        (bbox_gear[3] - bbox_gear[0]) / 2,
+        (bbox_gear[4] - bbox_gear[1]) / 2,
+        (bbox_gear[5] - bbox_gear[2]) / 2
+    )
+    radial = np.hypot(centroid[:, 0] - gear_center[0], centroid[:, 1] - gear_center[1])
+    print(f"齿轮 {gear_volume_tag} 共有 {n} 个表面")
+    return {
+        "tags": np.asarray(surfaces, dtype=int), "centroid": centroid, "normal": normal,
+        "normal_norm": normal_norm, "size": size, "radial": radial, "valid": valid,
+        "gear_center": gear_center, "gear_radius": gear_radius,
+    }
 
-            # 计算法向与径向向量的点积
-            dot_product = sum(n * r for n, r in zip(normalized_normal, z_vector))
 
-            # 避免数值误差导致无效值
-            if abs(dot_product) > 1.0:
-                dot_product = 1.0 if dot_product > 0 else -1.0
+# === 用于自动给内径面进行物理分组 ===
+def find_hole_surfaces(gear_volume_tag, origin_point, max_radial_distance=0.3, features=None):
+    """
+    精确识别内径面（孔的内表面）
+    使用的逻辑是将所有中心点坐标(x,y)满足:
+    x^2+y^2<=(max_radial_distance*r)^2的面分类到内径面中
+    max_radial_distance可以考虑的计算方式为:
+    max_radial_distance=齿轮内径/齿轮外径+0.05
 
-            # 内径面识别条件：
-            # 1. 靠近齿轮中心（径向距离小）
-            # 2. 法线方向与径向方向一致（夹角小）
-            if radial_distance < max_radial_distance * gear_radius and abs(dot_product) < 0.2:
-                hole_surfaces.append(surf_tag)
-                print(f"  内径面候选 {surf_tag}: 径向距离={radial_distance:.2f}mm, "
-                      f"法向={normal}")
+    参数:
+        gear_volume_tag (int): 齿轮体积标签
+        origin_point (tuple): 齿轮中心点坐标 (x, y, z)
+        max_radial_distance (float): 最大径向距离系数 (相对于齿轮半径)
+        features (dict): surface_feature_table 的结果，None 时现场构建
+    """
+    if features is None:
+        features = surface_feature_table(gear_volume_tag)
+    if features is None:
+        return []
+    gear_radius = features["gear_radius"]
+    print(f"齿轮 {gear_volume_tag} 中心点: {origin_point}, 半径: {gear_radius:.2f}mm")
 
-        except Exception as e:
-            print(f"  处理曲面 {surf_tag} 时出错: {str(e)}")
-            continue
+    # 到齿轮中心的径向距离（忽略Z轴差异）
+    centroid = features["centroid"]
+    radial_distance = np.hypot(centroid[:, 0] - origin_point[0], centroid[:, 1] - origin_point[1])
+    # 法向与 Z 轴夹角的余弦
+    dot_product = np.abs(features["normal"][:, 2])
+
+    # 内径面识别条件：
+    # 1. 靠近齿轮中心（径向距离小）
+    # 2. 法线方向垂直于 Z 轴（柱面）
+    mask = (features["valid"] & (features["normal_norm"] >= 1e-6)
+            & (radial_distance < max_radial_distance * gear_radius) & (dot_product < 0.2))
+    hole_surfaces = features["tags"][mask].tolist()
+    for surf_tag, dist, normal in zip(hole_surfaces, radial_distance[mask], features["normal"][mask]):
+        print(f"  内径面候选 {surf_tag}: 径向距离={dist:.2f}mm, 法向={normal.tolist()}")
 
     return hole_surfaces
 
 
-def find_contact_surfaces(gear_volume_tag, max_size=10.0, min_radial_distance=0.8):
+def find_contact_surfaces(gear_volume_tag, max_size=10.0, min_radial_distance=0.8, features=None):
     """
     基于尺寸或几何特征识别齿轮接触表面（满足任一条件）
     识别的是齿轮的完整齿面
@@ -118,110 +190,159 @@ def find_contact_surfaces(gear_volume_tag, max_size=10.0, min_radial_distance=0.
 
     参数:
         gear_volume_tag (int): 齿轮体积标签
-        origin_point (tuple): 齿轮中心点坐标 (x, y, z)
+        max_size (float): 尺寸条件的最大包围盒边长
         min_radial_distance (float): 最小径向距离系数 (相对于齿轮半径)
+        features (dict): surface_feature_table 的结果，None 时现场构建
     """
-    contact_surfaces = []
-
-    try:
-        # 获取齿轮体积的边界框和实际中心点
-        bbox_gear = gmsh.model.getBoundingBox(3, gear_volume_tag)
-        gear_center = [
-            (bbox_gear[0] + bbox_gear[3]) / 2,
-            (bbox_gear[1] + bbox_gear[4]) / 2,
-            (bbox_gear[2] + bbox_gear[5]) / 2
-        ]
-
-        # 计算齿轮半径 (取最大尺寸的一半)
-        gear_radius = max(
-            (bbox_gear[3] - bbox_gear[0]) / 2,
-            (bbox_gear[4] - bbox_gear[1]) / 2,
-            (bbox_gear[5] - bbox_gear[2]) / 2
-        )
-
-        # 获取所有相邻表面
-        _, surfaces = gmsh.model.getAdjacencies(3, gear_volume_tag)
-    except Exception as e:
-        print(f"获取齿轮 {gear_volume_tag} 信息失败: {str(e)}")
-        return contact_surfaces
-
-    # 单次遍历所有表面，应用两个条件
-    for surf_tag in surfaces:
-        try:
-            # 获取表面边界框和尺寸
-            bbox = gmsh.model.getBoundingBox(2, surf_tag)
-            size_x = bbox[3] - bbox[0]
-            size_y = bbox[4] - bbox[1]
-            size_z = bbox[5] - bbox[2]
-            surface_size = max(size_x, size_y, size_z)
-
-            # 获取表面中心点
-            center = gmsh.model.occ.getCenterOfMass(2, surf_tag)
-
-            # 计算到齿轮中心的径向距离（XY平面）
-            dx = center[0] - gear_center[0]
-            dy = center[1] - gear_center[1]
-            radial_distance = math.sqrt(dx * dx + dy * dy)
-
-            # 计算法向量
-            uv = gmsh.model.getParametrization(2, surf_tag, center)
-            normal = gmsh.model.getNormal(surf_tag, uv)
-
-            # 计算法向量长度并归一化
-            norm = math.sqrt(normal[0] ** 2 + normal[1] ** 2 + normal[2] ** 2)
-            normal_z = normal[2] / norm if norm > 1e-6 else 0.0
-
-            # 两个独立条件：
-            condition_size = surface_size < max_size
-            condition_geometry = (
-                    radial_distance > min_radial_distance * gear_radius and
-                    abs(normal_z) < 0.2
-            )
-
-            # 满足任一条件即视为接触面
-            if condition_size or condition_geometry:
-                contact_surfaces.append(surf_tag)
-
-                # 打印详细信息
-                reason = "尺寸" if condition_size else "几何"
-                if condition_size and condition_geometry:
-                    reason = "尺寸和几何"
-
-                print(f"  接触面 {surf_tag}: 原因={reason}, "
-                      f"尺寸={surface_size:.2f}, "
-                      f"径向距离={radial_distance:.2f}, "
-                      f"法向Z={normal_z:.2f}")
-
-        except Exception as e:
-            print(f"  处理曲面 {surf_tag} 时出错: {str(e)}")
-            continue
-
-    return contact_surfaces
-
-def make_mesh(step_path="./gear_step/assembled_gear_pair.step",unv_path="assembled_gears.unv",origin_point_1=(0,0,0), origin_point_2=(73.126,0,0),):
-
+    if features is None:
+        features = surface_feature_table(gear_volume_tag)
+    if features is None:
+        return []
+
+    # 两个独立条件：
+    normal_z = np.abs(features["normal"][:, 2])
+    condition_size = features["size"] < max_size
+    condition_geometry = (features["radial"] > min_radial_distance * features["gear_radius"]) & (normal_z < 0.2)
+
+    # 满足任一条件即视为接触面
+    mask = features["valid"] & (condition_size | condition_geometry)
+    n_both = np.count_nonzero(mask & condition_size & condition_geometry)
+    n_size = np.count_nonzero(mask & condition_size) - n_both
+    n_geometry = np.count_nonzero(mask & condition_geometry) - n_both
+    print(f"  接触面: 尺寸 {n_size} 个, 几何 {n_geometry} 个, 尺寸和几何 {n_both} 个")
+
+    return features["tags"][mask].tolist()
+
+
+# === 啮合区局部细化 ===
+def pitch_point(origin_point_1, origin_point_2, radius_1, radius_2):
+    """节点（啮合线与中心连线的交点），按两齿轮半径比例分中心距"""
+    o1 = np.asarray(origin_point_1, dtype=float)
+    o2 = np.asarray(origin_point_2, dtype=float)
+    return o1 + (o2 - o1) * radius_1 / (radius_1 + radius_2)
+
+
+def contact_zone_surfaces(features, contact_tags, point, window):
+    """接触面中形心到 point 的 XY 距离在 window 以内的面，即啮合线附近轮齿的齿面"""
+    mask = np.isin(features["tags"], contact_tags) & features["valid"]
+    dist = np.hypot(features["centroid"][:, 0] - point[0], features["centroid"][:, 1] - point[1])
+    return features["tags"][mask & (dist < window)].tolist()
+
+
+def pit_surfaces(features, contact_tags, max_size):
+    """接触面中包围盒边长小于 max_size 的小面，即布尔切出的点蚀坑面"""
+    mask = np.isin(features["tags"], contact_tags) & features["valid"] & (features["size"] < max_size)
+    return features["tags"][mask].tolist()
+
+
+def add_distance_threshold(surface_tags, size_min, size_max, dist_max, dist_min=0.0):
+    """到 surface_tags 的 Distance + Threshold 尺寸场（field 标签由 gmsh 自动分配），返回 Threshold 场的标签"""
+    distance = gmsh.model.mesh.field.add("Distance")
+    gmsh.model.mesh.field.setNumbers(distance, "SurfacesList", list(surface_tags))
+    threshold = gmsh.model.mesh.field.add("Threshold")
+    gmsh.model.mesh.field.setNumber(threshold, "InField", distance)
+    gmsh.model.mesh.field.setNumber(threshold, "SizeMin", size_min)
+    gmsh.model.mesh.field.setNumber(threshold, "SizeMax", size_max)
+    gmsh.model.mesh.field.setNumber(threshold, "DistMin", dist_min)
+    gmsh.model.mesh.field.setNumber(threshold, "DistMax", dist_max)
+    return threshold
+
+
+def use_size_fields(fields):
+    """取多个尺寸场的最小值作为背景网格；没有尺寸场时返回 None，使用全局粗网格"""
+    if not fields:
+        print("⚠️ 警告: 没有可用的局部细化尺寸场，使用全局粗网格")
+        return None
+    background = gmsh.model.mesh.field.add("Min")
+    gmsh.model.mesh.field.setNumbers(background, "FieldsList", fields)
+    gmsh.model.mesh.field.setAsBackgroundMesh(background)
+    # 尺寸完全由尺寸场控制，不再从边界点和曲率外推
+    gmsh.option.setNumber("Mesh.MeshSizeExtendFromBoundary", 0)
+    gmsh.option.setNumber("Mesh.MeshSizeFromPoints", 0)
+    gmsh.option.setNumber("Mesh.MeshSizeFromCurvature", 0)
+    return background
+
+
+def add_contact_zone_fields(zone_tags, pit_tags, size_fine, size_coarse, grading=6.0, pit_size=None, pit_band=2.0):
     """
+    只在啮合区齿面和点蚀坑附近加密的尺寸场，其余区域按距离过渡到粗网格，返回 Threshold 场标签列表
 
-    :param step_path: 组合齿轮在项目文件根目录下的路径
-    :param unv_path: 输出的unv文件在根目录下的路径
-    :param origin_point_1: 齿轮1的原点坐标
-    :param origin_point_2: 齿轮2的原点坐标
-    :return:
+    参数:
+        zone_tags, pit_tags (list): 啮合区齿面、坑面的 surface 标签
+        size_fine, size_coarse (float): 啮合区单元尺寸、远离啮合区的单元尺寸
+        grading (float): 从 size_fine 过渡到 size_coarse 的距离 (mm)
+        pit_size (float): 坑面单元尺寸，None 时取 size_fine 的一半
+        pit_band (float): 坑面细化带宽度 (mm)
     """
-    # 初始化 Gmsh
-    gmsh.initialize()
-    gmsh.option.setNumber("General.Terminal", 1)
-    gmsh.model.add("gear_pair")
+    fields = []
+    if zone_tags:
+        fields.append(add_distance_threshold(zone_tags, size_fine, size_coarse, grading))
+    if pit_tags:
+        fields.append(add_distance_threshold(pit_tags, pit_size or size_fine / 2, size_coarse, pit_band))
+    print(f"啮合区细化: 齿面 {len(zone_tags)} 个, 坑面 {len(pit_tags)} 个, "
+          f"尺寸 {size_fine} -> {size_coarse} (过渡 {grading}mm)")
+    return fields
+
+
+# === 按坑清单细化 ===
+def match_pit_surfaces(features, contact_tags, center, radius, reach=1.5):
+    """接触面中形心到坑中心的距离小于 reach 倍坑半径、且包围盒不超过 reach 倍坑直径的面，即该坑切出的坑面"""
+    mask = np.isin(features["tags"], contact_tags) & features["valid"]
+    dist = np.linalg.norm(features["centroid"] - np.asarray(center), axis=1)
+    mask &= (dist < reach * radius) & (features["size"] < 2 * reach * radius)
+    return features["tags"][mask].tolist()
+
+
+def add_pit_fields(pits, features, contact_tags, size_coarse, resolution=4.0, band=2.0):
+    """
+    按坑清单（pit_manifest.read_pit_manifest 的结果）在每个坑的实际位置加密，返回 (尺寸场标签列表, 最小单元尺寸)
+    坑面单元尺寸为坑半径 / resolution，细化带宽度为 band 倍坑半径；
+    尺寸相同（0.01mm 取整）的坑共用一组 Distance + Threshold，控制尺寸场数量。
+    找不到对应坑面的坑（如被合并的刀具）用以坑中心为球心的 Ball 场加密
 
-    # === 1. 载入 STEP 文件 ===
+    参数:
+        features, contact_tags: 坑所在齿轮的表面特征表和接触面标签
+        size_coarse (float): 远离坑处的单元尺寸
+    """
+    buckets = {}
+    unmatched = []
+    for center, radius in zip(pits["centers"], pits["radii"]):
+        tags = match_pit_surfaces(features, contact_tags, center, radius)
+        if not tags:
+            unmatched.append((center, radius))
+            continue
+        tag_set, reach = buckets.setdefault(round(radius / resolution, 2), (set(), [0.0]))
+        tag_set.update(tags)
+        reach[0] = max(reach[0], band * radius)
+
+    fields = [add_distance_threshold(sorted(tag_set), size, size_coarse, reach[0])
+              for size, (tag_set, reach) in buckets.items()]
+    for center, radius in unmatched:
+        ball = gmsh.model.mesh.field.add("Ball")
+        gmsh.model.mesh.field.setNumber(ball, "Radius", radius)
+        gmsh.model.mesh.field.setNumber(ball, "Thickness", band * radius)
+        gmsh.model.mesh.field.setNumber(ball, "VIn", radius / resolution)
+        gmsh.model.mesh.field.setNumber(ball, "VOut", size_coarse)
+        for axis, value in zip("XYZ", center):
+            gmsh.model.mesh.field.setNumber(ball, f"{axis}Center", float(value))
+        fields.append(ball)
+
+    size_min = float(np.min(pits["radii"])) / resolution if len(pits["radii"]) else size_coarse
+    print(f"坑清单细化: 坑 {len(pits['radii'])} 个, 尺寸场 {len(fields)} 个 (未匹配坑面 {len(unmatched)} 个), "
+          f"最小尺寸 {size_min:.3f}mm")
+    return fields, size_min
+
+
+# === 载入几何 ===
+def import_gear_pair(step_path):
+    """导入组合齿轮 STEP 并打印几何统计，返回全部体 [(3, tag), ...]；失败时退出"""
     if not os.path.exists(step_path):
         print(f"文件未找到: {step_path}")
         gmsh.finalize()
         sys.exit(1)
 
     try:
-        gmsh.model.occ.importShapes(step_path)
-        gmsh.model.occ.synchronize()
+        import_step_gmsh(step_path)
     except Exception as e:
         print(f"导入模型失败: {str(e)}")
         gmsh.finalize()
@@ -240,35 +361,34 @@ def make_mesh(step_path="./gear_step/assembled_gear_pair.step",unv_path="assembl
                 except:
                     print(f"  面 {tag}: 无法获取中心点")
 
-    # === 2. 添加 Volume 的物理组 ===
     volumes = gmsh.model.getEntities(dim=3)
     if not volumes:
         print("错误: 未找到任何三维体积!")
         gmsh.finalize()
         sys.exit(1)
+    return volumes
 
-    for i, (dim, tag) in enumerate(volumes):
-        gmsh.model.addPhysicalGroup(dim, [tag], i + 1)
-        gmsh.model.setPhysicalName(dim, i + 1, f"Gear{i + 1}")
-    print(f"识别并添加 {len(volumes)} 个 Volume。")
-
-
-    # 应用改进的表面识别
-    gear1_tag = volumes[0][1]  # 第一个齿轮
-    gear2_tag = volumes[1][1]  # 第二个齿轮
 
-    print("识别孔表面...")
-    gear1_hole = find_hole_surfaces(gear1_tag, origin_point_1)
-    print(f"齿轮1孔表面: {len(gear1_hole)}个面")
-    gear2_hole = find_hole_surfaces(gear2_tag, origin_point_2)
-    print(f"齿轮2孔表面: {len(gear2_hole)}个面")
-
-    print("识别接触表面...")
-    gear1_contact = find_contact_surfaces(gear1_tag, max_size=15.0)
-    print(f"齿轮1接触面: {len(gear1_contact)}个面")
-    gear2_contact = find_contact_surfaces(gear2_tag, max_size=15.0)
-    print(f"齿轮2接触面: {len(gear2_contact)}个面")
+def classify_gear_surfaces(volumes, origin_points):
+    """
+    识别每个齿轮的内径面和接触面
+    每个体只遍历一次表面，两个分类器共用特征表
 
+    返回:
+        (features, groups): 每个齿轮的特征表，以及 {"hole_gear_N": [...], "contact_N": [...]}
+    """
+    features, groups = [], []
+    for i, ((_, tag), origin_point) in enumerate(zip(volumes, origin_points)):
+        gear_no = i + 1
+        table = surface_feature_table(tag)
+        print(f"识别齿轮{gear_no}孔表面...")
+        hole = find_hole_surfaces(tag, origin_point, features=table)
+        print(f"齿轮{gear_no}孔表面: {len(hole)}个面")
+        print(f"识别齿轮{gear_no}接触表面...")
+        contact = find_contact_surfaces(tag, max_size=15.0, features=table)
+        print(f"齿轮{gear_no}接触面: {len(contact)}个面")
+        features.append(table)
+        groups.append({f"hole_gear_{gear_no}": hole, f"contact_{gear_no}": contact})
 
     #如果获取失败，那么需要在日志里给出报错信息
     # # 后备方案：如果自动识别失败，使用硬编码标签
@@ -287,18 +407,28 @@ def make_mesh(step_path="./gear_step/assembled_gear_pair.step",unv_path="assembl
     # if not gear2_contact:
     #     print("⚠️ 警告: 齿轮2接触面未自动识别，使用后备方案")
     #     gear2_contact = list(range(1944, 1963)) + list(range(1964, 1985))  # 替换为实际范围
+    return features, groups
 
 
-
-
-    hole1_pg = add_surface_group('hole_gear_1', gear1_hole)
-    hole2_pg = add_surface_group('hole_gear_2', gear2_hole)
-    contact1_pg = add_surface_group('contact_1', gear1_contact)
-    contact2_pg = add_surface_group('contact_2', gear2_contact)
-
+def add_gear_physical_groups(volumes, groups, gear_indices):
+    """为 gear_indices 中的齿轮添加体组 GearN 和表面组（先全部内径面，再全部接触面）"""
+    for i in gear_indices:
+        dim, tag = volumes[i]
+        gmsh.model.addPhysicalGroup(dim, [tag], i + 1)
+        gmsh.model.setPhysicalName(dim, i + 1, f"Gear{i + 1}")
+    print(f"识别并添加 {len(gear_indices)} 个 Volume。")
+
+    for prefix in ("hole_gear_", "contact_"):
+        for i in gear_indices:
+            if i >= len(groups):
+                continue  # 齿轮副以外的体只添加体组
+            name = f"{prefix}{i + 1}"
+            add_surface_group(name, groups[i][name])
     gmsh.model.occ.synchronize()
 
-    # === 4. 删除未分组的 surface 实体 ===
+
+def delete_ungrouped_surfaces():
+    """删除未分组的 surface 实体"""
     all_surface_tags = [tag for dim, tag in gmsh.model.getEntities(2)]
     physical_surface_tags = []
 
@@ -306,7 +436,7 @@ def make_mesh(step_path="./gear_step/assembled_gear_pair.step",unv_path="assembl
     for dim, pg in gmsh.model.getPhysicalGroups(dim=2):
         try:
             tags = gmsh.model.getEntitiesForPhysicalGroup(dim, pg)
-            if tags:  # 只添加非空列表
+            if tags is not None and len(tags):  # 只添加非空列表
                 physical_surface_tags += list(tags)
         except Exception as e:
             print(f"获取物理组 {pg} 的实体失败: {str(e)}")
@@ -328,33 +458,118 @@ def make_mesh(step_path="./gear_step/assembled_gear_pair.step",unv_path="assembl
 
     gmsh.model.occ.synchronize()
 
-    # === 5. 设置网格尺寸与细化控制 ===
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMin", 0.5)
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMax", 5.0)
-
-    # 添加曲率自适应
-    gmsh.model.mesh.field.add("Curvature", 1)
-    gmsh.model.mesh.field.add("Threshold", 2)
-    gmsh.model.mesh.field.setNumber(2, "InField", 1)
-    gmsh.model.mesh.field.setNumber(2, "SizeMin", 0.3)
-    gmsh.model.mesh.field.setNumber(2, "SizeMax", 5.0)
-    gmsh.model.mesh.field.setNumber(2, "DistMin", 0.05)
-    gmsh.model.mesh.field.setNumber(2, "DistMax", 1.0)
-    gmsh.model.mesh.field.setAsBackgroundMesh(2)
-
-    # 添加网格优化
-    gmsh.option.setNumber("Mesh.Optimize", 1)
-    gmsh.option.setNumber("Mesh.OptimizeNetgen", 1)
 
-    # === 6. 网格生成 ===
+def gear_pair_pitch_point(origin_points, features):
+    """由两齿轮的原点和特征表中的半径求节点"""
+    return pitch_point(origin_points[0], origin_points[1], features[0]["gear_radius"], features[1]["gear_radius"])
+
+
+def add_curvature_field(params, volume_tags):
+    """
+    只作用于 volume_tags 各体（及其面、边、点）的曲率 Threshold 尺寸场，返回 Restrict 场标签
+    体外取 Restrict 的默认值（极大），与其他尺寸场取 Min 时不影响其他齿轮
+    """
+    curvature = gmsh.model.mesh.field.add("Curvature")
+    threshold = gmsh.model.mesh.field.add("Threshold")
+    gmsh.model.mesh.field.setNumber(threshold, "InField", curvature)
+    gmsh.model.mesh.field.setNumber(threshold, "SizeMin", params["curvature_size_min"])
+    gmsh.model.mesh.field.setNumber(threshold, "SizeMax", params["size_max"])
+    gmsh.model.mesh.field.setNumber(threshold, "DistMin", 0.05)
+    gmsh.model.mesh.field.setNumber(threshold, "DistMax", 1.0)
+
+    entities = {3: list(volume_tags)}
+    dim_tags = [(3, tag) for tag in volume_tags]
+    for dim in (2, 1, 0):
+        dim_tags = gmsh.model.getBoundary(dim_tags, combined=False, oriented=False)
+        entities[dim] = sorted({tag for _, tag in dim_tags})
+    restrict = gmsh.model.mesh.field.add("Restrict")
+    gmsh.model.mesh.field.setNumber(restrict, "InField", threshold)
+    for dim, key in ((3, "VolumesList"), (2, "SurfacesList"), (1, "CurvesList"), (0, "PointsList")):
+        gmsh.model.mesh.field.setNumbers(restrict, key, entities[dim])
+    return restrict
+
+
+def setup_size_fields(params, refinement, features, groups, point, gear_indices,
+                      contact_window=14.0, pit_max_size=3.0, pits=None, volumes=None):
+    """
+    设置网格尺寸场（全局尺寸上下限和优化遍数由档位设置），只作用于 gear_indices 中的齿轮
+    point 为节点（gear_pair_pitch_point），"contact" 模式下以其为中心选取啮合区
+    pits 为坑清单（pit_manifest.read_pit_manifest）时在坑所在齿轮的每个坑的实际位置按坑半径加密：
+    取代该齿轮在 "curvature" 模式下的曲率场，以及 "contact" 模式下按面尺寸猜测的坑面；
+    其余齿轮的细化方式不变。两个齿轮在同一会话中划分时需传入 volumes（[(3, tag), ...]），
+    以便把曲率场限制在没有坑的齿轮上
+    """
+    pit_gear = pits["gear"] - 1 if pits is not None else None
+    if refinement != "contact" and pit_gear not in gear_indices:
+        # 添加曲率自适应
+        gmsh.model.mesh.field.add("Curvature", 1)
+        gmsh.model.mesh.field.add("Threshold", 2)
+        gmsh.model.mesh.field.setNumber(2, "InField", 1)
+        gmsh.model.mesh.field.setNumber(2, "SizeMin", params["curvature_size_min"])
+        gmsh.model.mesh.field.setNumber(2, "SizeMax", params["size_max"])
+        gmsh.model.mesh.field.setNumber(2, "DistMin", 0.05)
+        gmsh.model.mesh.field.setNumber(2, "DistMax", 1.0)
+        gmsh.model.mesh.field.setAsBackgroundMesh(2)
+        return
+
+    size_fine = params["curvature_size_min"]
+    size_min = size_fine / 2
+    fields = []
+    if refinement == "contact":
+        # 只在啮合线附近的轮齿和点蚀坑加密
+        zone_tags, pit_tags = [], []
+        for i in gear_indices:
+            contact = groups[i][f"contact_{i + 1}"]
+            zone_tags += contact_zone_surfaces(features[i], contact, point, contact_window)
+            if i != pit_gear:
+                pit_tags += pit_surfaces(features[i], contact, pit_max_size)
+        fields += add_contact_zone_fields(zone_tags, pit_tags, size_fine, params["size_max"])
+    else:
+        # 坑所在齿轮改用坑清单加密，其余齿轮仍按曲率细化
+        others = [volumes[i][1] for i in gear_indices if i != pit_gear]
+        if others:
+            fields.append(add_curvature_field(params, others))
+    # read_pit_manifest 已把坑的中心和法向换算到装配体坐标，与组合 STEP 一致
+    if pit_gear in gear_indices:
+        pit_fields, pit_size = add_pit_fields(pits, features[pit_gear], groups[pit_gear][f"contact_{pit_gear + 1}"],
+                                              params["size_max"])
+        fields += pit_fields
+        size_min = min(size_min, pit_size)
+    gmsh.option.setNumber("Mesh.CharacteristicLengthMin", size_min)
+    use_size_fields(fields)
+
+
+def generate_volume_mesh(report=None):
+    """
+    生成三维网格并打印体单元数；失败时退出
+    二维、三维和优化分步执行（优化遍数取自档位设置的 Mesh.Optimize / Mesh.OptimizeNetgen），各自计时
+    分步期间临时关闭 generate 自带的优化，结束后恢复档位设置
+    """
+    report = report or MeshReport()
+    optimize = int(gmsh.option.getNumber("Mesh.Optimize"))
+    optimize_netgen = int(gmsh.option.getNumber("Mesh.OptimizeNetgen"))
+    gmsh.option.setNumber("Mesh.Optimize", 0)
+    gmsh.option.setNumber("Mesh.OptimizeNetgen", 0)
     print("开始生成三维网格...")
     try:
-        gmsh.model.mesh.generate(3)
+        with report.phase("mesh_2d"):
+            gmsh.model.mesh.generate(2)
+        with report.phase("mesh_3d"):
+            gmsh.model.mesh.generate(3)
+        with report.phase("optimize"):
+            if optimize:
+                gmsh.model.mesh.optimize("", niter=optimize)
+            if optimize_netgen:
+                gmsh.model.mesh.optimize("Netgen", niter=optimize_netgen)
         print("网格完成。")
     except Exception as e:
         print(f"网格生成失败: {str(e)}")
         gmsh.finalize()
         sys.exit(1)
+    finally:
+        if gmsh.isInitialized():
+            gmsh.option.setNumber("Mesh.Optimize", optimize)
+            gmsh.option.setNumber("Mesh.OptimizeNetgen", optimize_netgen)
 
     # 检查网格质量
     try:
@@ -366,6 +581,411 @@ def make_mesh(step_path="./gear_step/assembled_gear_pair.step",unv_path="assembl
     except:
         print("无法获取网格元素信息")
 
+
+def mesh_single_gear(step_path, gear_index, origin_points, profile="accurate", refinement="curvature",
+                     contact_window=14.0, pit_max_size=3.0, pits=None, threads=None, report=None):
+    """
+    单独划分组合 STEP 中的一个齿轮，返回 mesh_cache 的网格数组
+    导入整个齿轮副（两齿轮的特征表用于确定节点），识别表面后删除另一个齿轮再划分
+    """
+    report = report or MeshReport()
+    gmsh.initialize()
+    gmsh.option.setNumber("General.Terminal", 1)
+    params = apply_mesh_profile(profile, threads=threads)
+    gmsh.model.add(f"gear_{gear_index + 1}")
+
+    with report.phase("import"):
+        volumes = import_gear_pair(step_path)
+    with report.phase("classify"):
+        features, groups = classify_gear_surfaces(volumes, origin_points)
+        others = [volumes[i] for i in range(len(volumes)) if i != gear_index]
+        if others:
+            gmsh.model.occ.remove(others, recursive=True)
+            gmsh.model.occ.synchronize()
+        add_gear_physical_groups(volumes, groups, [gear_index])
+        delete_ungrouped_surfaces()
+    with report.phase("fields"):
+        setup_size_fields(params, refinement, features, groups, gear_pair_pitch_point(origin_points, features),
+                          [gear_index], contact_window=contact_window, pit_max_size=pit_max_size, pits=pits)
+    generate_volume_mesh(report)
+    mesh = mesh_arrays_from_model()
+    gmsh.finalize()
+    return mesh
+
+
+# === 轮齿周期复制 ===
+def tooth_phase(features):
+    """齿顶面（法向垂直于 Z 轴且离中心最远的面）形心的方位角，即某个轮齿中心线的角度"""
+    candidates = features["valid"] & (np.abs(features["normal"][:, 2]) < 0.2)
+    i = np.argmax(np.where(candidates, features["radial"], -np.inf))
+    c = features["centroid"][i] - features["gear_center"]
+    return math.atan2(c[1], c[0])
+
+
+def rotation_affine(angle, origin):
+    """绕过 origin 的 Z 轴旋转 angle 的 4x4 仿射矩阵（按行展开，gmsh setPeriodic 格式）"""
+    c, s = math.cos(angle), math.sin(angle)
+    ox, oy = origin[0], origin[1]
+    return [c, -s, 0, ox - c * ox + s * oy,
+            s, c, 0, oy - s * ox - c * oy,
+            0, 0, 1, 0,
+            0, 0, 0, 1]
+
+
+def split_into_sectors(volume_tag, origin_point, num_teeth, cut_angle_0):
+    """
+    用过齿轮轴线的半平面在齿槽中线处把齿轮切成 num_teeth 个扇区
+    第 k 个扇区的角度范围为 [cut_angle_0 + k * pitch, cut_angle_0 + (k + 1) * pitch)
+
+    返回:
+        (sectors, interfaces): {k: 扇区体标签}，{k: 扇区 k-1 与 k 之间的切面标签}；切分失败返回 None
+    """
+    pitch = 2 * math.pi / num_teeth
+    bbox = gmsh.model.getBoundingBox(3, volume_tag)
+    reach = 2 * max(bbox[3] - bbox[0], bbox[4] - bbox[1])
+    z0, z1 = bbox[2] - 1.0, bbox[5] + 1.0
+    planes = []
+    for k in range(num_teeth):
+        rect = gmsh.model.occ.addRectangle(0, z0, 0, reach, z1 - z0)
+        gmsh.model.occ.rotate([(2, rect)], 0, 0, 0, 1, 0, 0, math.pi / 2)  # XY 平面 -> XZ 平面
+        gmsh.model.occ.rotate([(2, rect)], 0, 0, 0, 0, 0, 1, cut_angle_0 + k * pitch)
+        gmsh.model.occ.translate([(2, rect)], origin_point[0], origin_point[1], 0)
+        planes.append((2, rect))
+    gmsh.model.occ.fragment([(3, volume_tag)], planes)
+    gmsh.model.occ.synchronize()
+
+    # 去掉落在实体外的切面碎片
+    loose = [(2, t) for _, t in gmsh.model.getEntities(2) if len(gmsh.model.getAdjacencies(2, t)[0]) == 0]
+    if loose:
+        gmsh.model.occ.remove(loose, recursive=True)
+        gmsh.model.occ.synchronize()
+
+    def slot(dim, tag, shift):
+        x, y, _ = gmsh.model.occ.getCenterOfMass(dim, tag)
+        angle = math.atan2(y - origin_point[1], x - origin_point[0])
+        return int(math.floor((angle - cut_angle_0) / pitch + shift)) % num_teeth
+
+    volumes = [t for _, t in gmsh.model.getEntities(3)]
+    sectors = {slot(3, t, 0.0): t for t in volumes}
+    interfaces = {slot(2, t, 0.5): t for _, t in gmsh.model.getEntities(2)
+                  if len(gmsh.model.getAdjacencies(2, t)[0]) == 2}
+    if len(sectors) != num_teeth or len(volumes) != num_teeth or len(interfaces) != num_teeth:
+        print(f"⚠️ 扇区切分失败: 体 {len(volumes)} 个, 切面 {len(interfaces)} 个, 期望 {num_teeth} 个")
+        return None
+    return sectors, interfaces
+
+
+def irregular_sectors(sectors, interfaces, rel_tol=1e-6):
+    """
+    与多数扇区几何不一致的扇区：体积或表面数不同（点蚀、键槽等），
+    或任一切面面积与多数切面不同（两侧扇区都需单独划分，不能与旋转副本拼接）
+    """
+    mass = {k: gmsh.model.occ.getMass(3, t) for k, t in sectors.items()}
+    n_faces = {k: len(gmsh.model.getAdjacencies(3, t)[1]) for k, t in sectors.items()}
+    face_area = {k: gmsh.model.occ.getMass(2, t) for k, t in interfaces.items()}
+    ref_mass = np.median(list(mass.values()))
+    ref_faces = max(set(n_faces.values()), key=list(n_faces.values()).count)
+    ref_area = np.median(list(face_area.values()))
+
+    irregular = {k for k in sectors
+                 if abs(mass[k] - ref_mass) > rel_tol * ref_mass or n_faces[k] != ref_faces}
+    num_teeth = len(sectors)
+    for k, area in face_area.items():
+        if abs(area - ref_area) > rel_tol * ref_area:
+            irregular |= {(k - 1) % num_teeth, k}
+    return irregular
+
+
+def mesh_gear_periodic(step_path, gear_index, origin_points, num_teeth, profile="accurate", refinement="curvature",
+                       contact_window=14.0, pit_max_size=3.0, pits=None, threads=None, report=None):
+    """
+    轮齿周期复制方式划分单个齿轮，返回 mesh_cache 的网格数组
+    齿轮按齿切成扇区；几何与多数扇区一致的健康扇区只划分一个模板，其余健康扇区由模板绕轴旋转得到，
+    点蚀等不规则扇区（"contact" 模式下还有啮合区扇区，给定坑清单时还有坑所在扇区）单独划分。
+    所有保留的切面都设为模板切面的周期面，保证扇区之间节点一一对应，最后焊接重合节点
+    切分失败或没有可用的模板扇区时返回 None
+    """
+    report = report or MeshReport()
+    gmsh.initialize()
+    gmsh.option.setNumber("General.Terminal", 1)
+    params = apply_mesh_profile(profile, threads=threads)
+    gmsh.model.add(f"gear_{gear_index + 1}_periodic")
+
+    with report.phase("import"):
+        volumes = import_gear_pair(step_path)
+    with report.phase("classify"):
+        features, groups = classify_gear_surfaces(volumes, origin_points)
+        point = gear_pair_pitch_point(origin_points, features)
+        gear_no = gear_index + 1
+        origin = origin_points[gear_index]
+        others = [volumes[i] for i in range(len(volumes)) if i != gear_index]
+        if others:
+            gmsh.model.occ.remove(others, recursive=True)
+            gmsh.model.occ.synchronize()
+
+        pitch = 2 * math.pi / num_teeth
+        cut_angle_0 = tooth_phase(features[gear_index]) + pitch / 2  # 在齿槽中线处切分
+        split = split_into_sectors(volumes[gear_index][1], origin, num_teeth, cut_angle_0)
+        if split is None:
+            gmsh.finalize()
+            return None
+        sectors, interfaces = split
+        sector_of = {t: k for k, t in sectors.items()}
+        interface_tags = set(interfaces.values())
+
+        # 切分后重新识别表面（内部切面不参与）
+        table = surface_feature_table(list(sectors.values()), exclude=interface_tags)
+        hole = find_hole_surfaces(list(sectors.values()), origin, features=table)
+        contact = find_contact_surfaces(list(sectors.values()), max_size=15.0, features=table)
+        features[gear_index] = table
+        groups[gear_index] = {f"hole_gear_{gear_no}": hole, f"contact_{gear_no}": contact}
+
+        individual = irregular_sectors(sectors, interfaces)
+        if refinement == "contact":
+            for tag in contact_zone_surfaces(table, contact, point, contact_window):
+                individual |= {sector_of[v] for v in gmsh.model.getAdjacencies(2, tag)[0]}
+        if pits is not None and pits["gear"] == gear_no:
+            for center, radius in zip(pits["centers"], pits["radii"]):
+                for tag in match_pit_surfaces(table, contact, center, radius):
+                    individual |= {sector_of[v] for v in gmsh.model.getAdjacencies(2, tag)[0]}
+        healthy = [k for k in range(num_teeth) if k not in individual]
+        if not healthy:
+            print("⚠️ 没有可复制的健康扇区")
+            gmsh.finalize()
+            return None
+        # 模板取离节点最远的健康扇区
+        point_angle = math.atan2(point[1] - origin[1], point[0] - origin[0])
+        template = max(healthy, key=lambda k: abs(math.remainder(cut_angle_0 + (k + 0.5) * pitch - point_angle, 2 * math.pi)))
+        print(f"扇区: 共 {num_teeth} 个, 单独划分 {sorted(individual)}, 模板 {template}, 旋转复制 {len(healthy) - 1} 个")
+
+        # 只保留模板和单独划分的扇区
+        removed = [(3, sectors[k]) for k in healthy if k != template]
+        if removed:
+            gmsh.model.occ.remove(removed, recursive=True)
+            gmsh.model.occ.synchronize()
+        kept_volumes = [sectors[k] for k in sorted(individual | {template})]
+        kept_surfaces = {t for v in kept_volumes for t in gmsh.model.getAdjacencies(3, v)[1]}
+
+        gmsh.model.addPhysicalGroup(3, kept_volumes, gear_no)
+        gmsh.model.setPhysicalName(3, gear_no, f"Gear{gear_no}")
+        for name, tags in groups[gear_index].items():
+            add_surface_group(name, [t for t in tags if t in kept_surfaces])
+
+        # 所有保留的切面与模板左切面周期对应
+        master = interfaces[template]
+        for k, tag in interfaces.items():
+            if k != template and tag in kept_surfaces:
+                gmsh.model.mesh.setPeriodic(2, [tag], [master], rotation_affine((k - template) * pitch, origin))
+
+    with report.phase("fields"):
+        setup_size_fields(params, refinement, features, groups, point, [gear_index],
+                          contact_window=contact_window, pit_max_size=pit_max_size, pits=pits)
+    generate_volume_mesh(report)
+    mesh = mesh_arrays_from_model()
+    template_surfaces = gmsh.model.getAdjacencies(3, sectors[template])[1]
+    gmsh.finalize()
+
+    with report.phase("replicate"):
+        return replicate_template(mesh, interface_tags, sectors[template], template_surfaces,
+                                  [(k - template) * pitch for k in healthy], origin)
+
+
+def replicate_template(mesh, interface_tags, template_volume, template_surfaces, angles, origin):
+    """把模板扇区旋转到各健康扇区位置，与单独划分的扇区合并并焊接节点"""
+    # 扇区之间的内部切面不输出面单元
+    is_interface = (mesh["entity_dim"] == 2) & np.isin(mesh["entity_tag"], list(interface_tags))
+    is_template = ((mesh["entity_dim"] == 3) & (mesh["entity_tag"] == template_volume)) | \
+                  ((mesh["entity_dim"] == 2) & np.isin(mesh["entity_tag"], template_surfaces))
+    parts = [submesh(mesh, ~is_interface & ~is_template)]
+    template_mesh = submesh(mesh, ~is_interface & is_template)
+    parts += [rotate_mesh(template_mesh, angle, origin) for angle in angles]
+    return weld_nodes(merge_mesh_arrays(parts))
+
+
+def gear_mesh_cache_paths(step_path, origin_points, mesh_params, pits=None):
+    """导入几何并计算两个齿轮各自的网格缓存路径（几何哈希 + 划分参数 + 节点位置 + 该齿轮的坑清单）"""
+    gmsh.initialize()
+    gmsh.option.setNumber("General.Terminal", 0)
+    gmsh.model.add("gear_pair_plan")
+    volumes = import_gear_pair(step_path)
+    features = [surface_feature_table(tag) for _, tag in volumes]
+    point = gear_pair_pitch_point(origin_points, features)
+    paths = []
+    for i, (_, tag) in enumerate(volumes):
+        params = dict(mesh_params, gear_no=i + 1, origin_point=list(origin_points[i]),
+                      pitch_point=np.round(point, 4).tolist())
+        if pits is not None and pits["gear"] == i + 1:
+            params["pits"] = np.round(np.column_stack([pits["centers"], pits["radii"]]), 4).tolist()
+        paths.append(mesh_cache_path(gear_geometry_hash(tag, features[i]), params))
+    gmsh.finalize()
+    return paths
+
+
+def mesh_gear(step_path, gear_index, origin_points, profile="accurate", refinement="curvature",
+              contact_window=14.0, pit_max_size=3.0, pits=None, num_teeth=None, threads=None, report=None):
+    """划分单个齿轮；给定齿数时使用轮齿周期复制，失败则退回整体划分"""
+    kwargs = dict(profile=profile, refinement=refinement, contact_window=contact_window,
+                  pit_max_size=pit_max_size, pits=pits, threads=threads, report=report)
+    if num_teeth:
+        mesh = mesh_gear_periodic(step_path, gear_index, origin_points, num_teeth, **kwargs)
+        if mesh is not None:
+            return mesh
+        print(f"⚠️ 齿轮{gear_index + 1}周期复制失败，改为整体划分")
+    return mesh_single_gear(step_path, gear_index, origin_points, **kwargs)
+
+
+def _mesh_gear_worker(*args, **kwargs):
+    """并行划分时子进程的入口：返回网格数组和各阶段耗时，传回主进程合并"""
+    report = MeshReport()
+    mesh = mesh_gear(*args, report=report, **kwargs)
+    return mesh, report.data["phases"]
+
+
+def make_mesh_by_gear(step_path, unv_path, origin_points, profile="accurate", refinement="curvature",
+                      contact_window=14.0, pit_max_size=3.0, pits=None, use_cache=True, num_teeth=None,
+                      parallel=False, inp_path=None, report=None):
+    """
+    逐个齿轮划分网格并合并写出
+    use_cache 时按齿轮几何哈希和划分参数查找网格缓存：命中则直接复用（通常是未损伤的齿轮2），
+    只重新划分发生变化的齿轮；合并时节点和单元依次编号
+    num_teeth 为两齿轮齿数时使用轮齿周期复制，见 mesh_gear_periodic
+    parallel 时需要划分的齿轮各在一个子进程中导入、划分（各自的 gmsh 会话和物理组），CPU 核在子进程间平分
+    unv_path / inp_path 为 None 时不写对应文件；report 为 None 时只计时，不统计节点单元数和单元质量
+    """
+    statistics = report is not None
+    report = report or MeshReport()
+    mesh_params = {"profile": MESH_PROFILES[profile], "refinement": refinement,
+                   "contact_window": contact_window, "pit_max_size": pit_max_size,
+                   "num_teeth": list(num_teeth) if num_teeth else None}
+    with report.phase("cache_lookup"):
+        cache_paths = gear_mesh_cache_paths(step_path, origin_points, mesh_params, pits) if use_cache else None
+
+    meshes = [None] * len(origin_points)
+    todo = []
+    for i in range(len(origin_points)):
+        if use_cache and os.path.exists(cache_paths[i]):
+            print(f"♻️ 齿轮{i + 1}网格命中缓存: {os.path.basename(cache_paths[i])}")
+            meshes[i] = load_mesh_arrays(cache_paths[i])
+        else:
+            todo.append(i)
+
+    kwargs = dict(profile=profile, refinement=refinement, contact_window=contact_window, pit_max_size=pit_max_size,
+                  pits=pits)
+    if parallel and len(todo) > 1:
+        threads = max(1, (os.cpu_count() or 1) // len(todo))
+        print(f"并行划分齿轮 {[i + 1 for i in todo]}，每个进程 {threads} 线程")
+        with ProcessPoolExecutor(max_workers=len(todo)) as pool:
+            with report.phase("mesh_parallel"):
+                futures = {i: pool.submit(_mesh_gear_worker, step_path, i, origin_points, threads=threads,
+                                          num_teeth=num_teeth[i] if num_teeth else None, **kwargs) for i in todo}
+                for i, future in futures.items():
+                    meshes[i], phases = future.result()
+                    report.add_phases(phases, prefix=f"gear{i + 1}.")
+    else:
+        for i in todo:
+            gear_report = MeshReport()
+            meshes[i] = mesh_gear(step_path, i, origin_points, num_teeth=num_teeth[i] if num_teeth else None,
+                                  report=gear_report, **kwargs)
+            report.add_phases(gear_report.data["phases"], prefix=f"gear{i + 1}.")
+    if use_cache:
+        for i in todo:
+            save_mesh_arrays(cache_paths[i], meshes[i])
+
+    with report.phase("merge"):
+        merged = merge_mesh_arrays(meshes)
+    print(f"合并网格: 节点 {len(merged['node_tags'])} 个, 单元 {len(merged['elem_tags'])} 个")
+    if statistics:
+        report.add_counts(merged)
+    with report.phase("write"):
+        # 合并网格只在写 UNV 或统计单元质量时才需要装回 gmsh
+        if unv_path or statistics:
+            load_mesh_into_gmsh(merged)
+            if statistics:
+                report.add_quality()
+            if unv_path:
+                gmsh.option.setNumber("Mesh.SaveAll", 1)
+                gmsh.option.setNumber("Mesh.SaveGroupsOfNodes", 1)
+                gmsh.write(unv_path)
+                print(f"导出完成: {unv_path}")
+            gmsh.finalize()
+        if inp_path:
+            write_inp_arrays(merged, inp_path, reduced='N')
+            print(f"导出完成: {inp_path}")
+
+
+def make_mesh(step_path="./gear_step/assembled_gear_pair.step",unv_path="assembled_gears.unv",origin_point_1=(0,0,0), origin_point_2=(73.126,0,0),
+              profile="accurate", refinement="curvature", contact_window=14.0, pit_max_size=3.0, mesh_cache=False,
+              periodic=False, num_teeth=(19, 20), parallel=False, inp_path=None, report_path="mesh_report.json",
+              pit_manifest=None):
+
+    """
+
+    :param step_path: 组合齿轮在项目文件根目录下的路径
+    :param unv_path: 输出的unv文件在根目录下的路径
+    :param origin_point_1: 齿轮1的原点坐标
+    :param origin_point_2: 齿轮2的原点坐标
+    :param profile: 网格档位 "fast" / "balanced" / "accurate"，见 MESH_PROFILES
+    :param refinement: "curvature" 全模型曲率细化；"contact" 只细化啮合线附近的轮齿和点蚀坑，其余为粗网格
+    :param contact_window: "contact" 模式下，齿面形心到节点的距离小于该值 (mm) 视为啮合区，默认约 1.2 个齿距
+    :param pit_max_size: "contact" 模式下，包围盒边长小于该值 (mm) 的接触面视为点蚀坑面
+    :param mesh_cache: True 时逐个齿轮划分并缓存网格，未变化的齿轮直接复用，见 make_mesh_by_gear
+    :param periodic: True 时健康轮齿只划分一个扇区并旋转复制，见 mesh_gear_periodic
+    :param num_teeth: 两齿轮齿数，periodic 时使用
+    :param parallel: True 时两个齿轮在各自的子进程中同时划分，见 make_mesh_by_gear
+    :param inp_path: 不为 None 时直接由 gmsh 网格数组写出 CalculiX INP（与 u2c.convert_u2c 的结果一致），
+                     此时可令 unv_path=None 跳过 UNV 的写出和重新解析
+    :param report_path: 网格报告 JSON（各阶段耗时、各体/物理组的节点和单元数、质量直方图），None 时不写
+    :param pit_manifest: 损伤阶段写出的坑清单（*.pits.json，见 pit_manifest），给定时在每个坑的实际位置
+                         按坑半径加密，不再使用全局曲率场；"contact" 模式下取代按面尺寸猜测的坑面
+    :return:
+    """
+    origin_points = (origin_point_1, origin_point_2)
+    pits = read_pit_manifest(pit_manifest) if pit_manifest else None
+    report = MeshReport(step_path=step_path, profile=profile, refinement=refinement, mesh_cache=mesh_cache,
+                        periodic=periodic, parallel=parallel, pit_manifest=pit_manifest)
+    if mesh_cache or periodic or parallel:
+        with report.phase("total"):
+            make_mesh_by_gear(step_path, unv_path, origin_points, profile=profile, refinement=refinement,
+                              contact_window=contact_window, pit_max_size=pit_max_size, pits=pits,
+                              use_cache=mesh_cache, num_teeth=num_teeth if periodic else None, parallel=parallel,
+                              inp_path=inp_path, report=report if report_path else None)
+        if report_path:
+            report.write(report_path)
+        return
+
+    start = time.perf_counter()
+
+    # 初始化 Gmsh
+    gmsh.initialize()
+    gmsh.option.setNumber("General.Terminal", 1)
+    params = apply_mesh_profile(profile)
+    gmsh.model.add("gear_pair")
+
+    # === 1. 载入 STEP 文件 ===
+    with report.phase("import"):
+        volumes = import_gear_pair(step_path)
+
+    # === 2. 识别表面并添加物理组 ===
+    with report.phase("classify"):
+        features, groups = classify_gear_surfaces(volumes, origin_points)
+        add_gear_physical_groups(volumes, groups, range(len(volumes)))
+
+        # === 4. 删除未分组的 surface 实体 ===
+        delete_ungrouped_surfaces()
+
+    # === 5. 设置网格尺寸与细化控制 ===
+    with report.phase("fields"):
+        setup_size_fields(params, refinement, features, groups, gear_pair_pitch_point(origin_points, features),
+                          range(len(groups)), contact_window=contact_window, pit_max_size=pit_max_size, pits=pits,
+                          volumes=volumes)
+
+    # === 6. 网格生成 ===
+    generate_volume_mesh(report)
+    mesh = mesh_arrays_from_model()
+    if report_path:
+        report.add_counts(mesh)
+        report.add_quality()
+
     gmsh.option.setNumber("Mesh.SaveAll", 0)
 
     # === 7. 导出文件 ===
@@ -376,9 +996,16 @@ def make_mesh(step_path="./gear_step/assembled_gear_pair.step",unv_path="assembl
     # except Exception as e:
     #     print(f"导出INP文件失败: {str(e)}")
 
-    gmsh.option.setNumber("Mesh.SaveAll", 1)
-    gmsh.option.setNumber("Mesh.SaveGroupsOfNodes", 1)
-    gmsh.write(unv_path)
+    with report.phase("write"):
+        if unv_path:
+            gmsh.option.setNumber("Mesh.SaveAll", 1)
+            gmsh.option.setNumber("Mesh.SaveGroupsOfNodes", 1)
+            gmsh.write(unv_path)
+
+        # === 8. 直接导出 CalculiX INP（不经过 UNV） ===
+        if inp_path:
+            write_inp_arrays(mesh, inp_path, reduced='N')
+            print(f"导出完成: {inp_path}")
 
     # # === 9. 打开 Gmsh GUI 查看 ===
     # print("在GUI中查看网格...")
@@ -388,6 +1015,26 @@ def make_mesh(step_path="./gear_step/assembled_gear_pair.step",unv_path="assembl
     #     print("无法打开GUI")
 
     gmsh.finalize()
+    report.data["phases"]["total"] = time.perf_counter() - start
+    if report_path:
+        report.write(report_path)
     return
 
-make_mesh()
\ No newline at end of file
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="齿轮副 gmsh 网格划分")
+    parser.add_argument("--profile", default="accurate", choices=list(MESH_PROFILES), help="网格档位")
+    parser.add_argument("--refinement", default="curvature", choices=["curvature", "contact"],
+                        help="curvature: 全模型曲率细化; contact: 只细化啮合区和点蚀坑")
+    parser.add_argument("--mesh-cache", action="store_true", help="逐个齿轮划分并复用未变化齿轮的网格缓存")
+    parser.add_argument("--periodic", action="store_true", help="健康轮齿只划分一个扇区并旋转复制")
+    parser.add_argument("--parallel", action="store_true", help="两个齿轮在各自的子进程中同时划分")
+    parser.add_argument("--inp", default=None, help="直接写出的 CalculiX INP 路径（同时不再写 UNV）")
+    parser.add_argument("--report", default="mesh_report.json", help="网格报告 JSON 路径")
+    parser.add_argument("--pit-manifest", default=None, help="损伤阶段写出的坑清单，在每个坑周围按坑半径加密")
+    args = parser.parse_args()
+    make_mesh(unv_path=None if args.inp else "assembled_gears.unv", inp_path=args.inp, report_path=args.report,
+              profile=args.profile, refinement=args.refinement, mesh_cache=args.mesh_cache, periodic=args.periodic,
+              parallel=args.parallel, pit_manifest=args.pit_manifest)
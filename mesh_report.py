@@ -0,0 +1,97 @@
+import json
+import time
+import contextlib
+import numpy as np
+import gmsh
+
+# 质量直方图分箱：[-1, 0) 为翻转单元，之后每 0.1 一档
+QUALITY_BINS = [-1.0] + [round(0.1 * i, 1) for i in range(11)]
+
+
+class MeshReport:
+    """
+    make_mesh 的运行报告：各阶段耗时、各体/物理组的节点和单元数、单元质量直方图，写出为 JSON
+    用于跨运行追踪网格回归，以及按数据权衡速度和精度
+
+    参数:
+        settings: 本次划分的参数（档位、细化方式等），原样写入报告
+    """
+
+    def __init__(self, **settings):
+        self.data = {"settings": settings, "phases": {}, "volumes": {}, "groups": {}, "totals": {}, "quality": {}}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """累计 with 块的墙钟时间到 phases[name]（秒）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            phases = self.data["phases"]
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+    def add_phases(self, phases, prefix=""):
+        """并入子过程（如逐齿轮划分的子进程）的阶段耗时"""
+        for name, seconds in phases.items():
+            key = prefix + name
+            self.data["phases"][key] = self.data["phases"].get(key, 0.0) + seconds
+
+    def add_counts(self, mesh):
+        """由 mesh_cache 格式的网格数组统计总数及每个物理组的节点数、按单元类型的单元数"""
+        eo, no = mesh["block_elem_offsets"], mesh["block_node_offsets"]
+        entity_key = list(zip(mesh["entity_dim"].tolist(), mesh["entity_tag"].tolist()))
+        blocks_of = {}
+        for b, e in enumerate(mesh["block_entity"].tolist()):
+            blocks_of.setdefault(entity_key[e], []).append(b)
+
+        def summarize(blocks):
+            by_type = {}
+            for b in blocks:
+                name = gmsh_element_name(int(mesh["block_type"][b]))
+                by_type[name] = by_type.get(name, 0) + int(eo[b + 1] - eo[b])
+            nodes = np.unique(np.concatenate([mesh["elem_nodes"][no[b]:no[b + 1]] for b in blocks])) if blocks else []
+            return {"nodes": int(len(nodes)), "elements": by_type}
+
+        self.data["totals"] = {"nodes": int(len(mesh["node_tags"])), "elements": int(len(mesh["elem_tags"]))}
+        go = mesh["group_entity_offsets"]
+        for g, name in enumerate(mesh["group_name"].tolist()):
+            dim = int(mesh["group_dim"][g])
+            blocks = [b for t in mesh["group_entities"][go[g]:go[g + 1]].tolist() for b in blocks_of.get((dim, t), [])]
+            self.data["volumes" if dim == 3 else "groups"][name] = summarize(blocks)
+
+    def add_quality(self, quality_name="minSICN"):
+        """对当前 gmsh 模型中每个体物理组的三维单元计算 gmsh 单元质量并统计直方图"""
+        for dim, pg in gmsh.model.getPhysicalGroups(3):
+            name = gmsh.model.getPhysicalName(dim, pg)
+            tags = []
+            for entity in gmsh.model.getEntitiesForPhysicalGroup(dim, pg):
+                _, elem_tags, _ = gmsh.model.mesh.getElements(dim, entity)
+                tags.extend(np.concatenate(elem_tags).tolist() if len(elem_tags) else [])
+            if not tags:
+                continue
+            q = np.asarray(gmsh.model.mesh.getElementQualities(tags, quality_name))
+            counts, _ = np.histogram(np.clip(q, -1.0, 1.0), bins=QUALITY_BINS)
+            self.data["quality"][name] = {
+                "measure": quality_name, "bins": QUALITY_BINS, "counts": counts.tolist(),
+                "min": float(q.min()), "mean": float(q.mean()), "below_0.1": int(np.count_nonzero(q < 0.1)),
+            }
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        phases = ", ".join(f"{k} {v:.1f}s" for k, v in self.data["phases"].items())
+        print(f"网格报告已写出: {path} ({phases})")
+
+
+# gmsh 单元类型编号 -> gmsh.model.mesh.getElementProperties 给出的名称；静态表不依赖 gmsh 会话，
+# 逐齿轮划分时各子会话已经结束，统计合并网格也能得到与单会话路径相同的键
+GMSH_ELEMENT_NAMES = {
+    1: "Line 2", 2: "Triangle 3", 3: "Quadrilateral 4", 4: "Tetrahedron 4", 5: "Hexahedron 8",
+    6: "Prism 6", 7: "Pyramid 5", 8: "Line 3", 9: "Triangle 6", 10: "Quadrilateral 9",
+    11: "Tetrahedron 10", 12: "Hexahedron 27", 13: "Prism 18", 14: "Pyramid 14", 15: "Point",
+    16: "Quadrilateral 8", 17: "Hexahedron 20", 18: "Prism 15", 19: "Pyramid 13",
+}
+
+
+def gmsh_element_name(element_type):
+    return GMSH_ELEMENT_NAMES.get(element_type, f"Type {element_type}")
@@ -0,0 +1,69 @@
+import os
+import json
+import numpy as np
+from pit_prune import pit_arrays
+
+PIT_MANIFEST_VERSION = 1
+
+
+def pit_manifest_path(step_path):
+    """损伤 STEP 对应的坑清单路径：SpurGear1_cut.step -> SpurGear1_cut.pits.json"""
+    return os.path.splitext(step_path)[0] + ".pits.json"
+
+
+def write_pit_manifest(path, pit_info_list, semi_axes, source_step=None, gear=1):
+    """
+    写出损伤阶段实际切出的坑（剪枝后的刀具）：中心、法向、各轴缩放及半轴长
+    坐标为齿轮自身坐标系，read_pit_manifest 读取时再按 gear 换算到装配体坐标
+
+    参数:
+        pit_info_list: [(gp_Pnt, gp_Dir, scale_xyz), ...]
+        semi_axes: 椭球模板的三个半轴长
+        gear (int): 坑所在齿轮编号，对应体物理组 Gear{gear}
+    """
+    centers, normals, scales = pit_arrays(pit_info_list)
+    radii = np.asarray(semi_axes, dtype=float) * scales
+    data = {
+        "version": PIT_MANIFEST_VERSION,
+        "gear": gear,
+        "source_step": source_step,
+        "frame": "gear",
+        "template_semi_axes": np.asarray(semi_axes, dtype=float).tolist(),
+        "pits": [{"center": c.tolist(), "normal": n.tolist(), "scale": s.tolist(),
+                  "semi_axes": r.tolist(), "radius": float(r.max())}
+                 for c, n, s, r in zip(centers, normals, scales, radii)],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"坑清单已写出: {path} ({len(centers)} 个坑)")
+
+
+def read_pit_manifest(path, assembly=True):
+    """
+    读取坑清单 -> dict(gear, centers, normals, scales, semi_axes, radii)，数组均为 numpy
+    assembly=True 时中心和法向按 gear_layout.gear_placement 换算到装配体坐标（mesh_make 的网格坐标）
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != PIT_MANIFEST_VERSION:
+        raise ValueError(f"坑清单版本不匹配: {path}")
+    pits = data["pits"]
+
+    def column(key, width):
+        return np.array([p[key] for p in pits], dtype=float).reshape(-1, width)
+
+    gear = int(data.get("gear", 1))
+    centers, normals = column("center", 3), column("normal", 3)
+    if assembly and gear != 1:
+        from gear_layout import gear_placement
+        rotation, translation = gear_placement(gear)
+        centers = centers @ rotation.T + translation
+        normals = normals @ rotation.T
+    return {
+        "gear": gear,
+        "centers": centers,
+        "normals": normals,
+        "scales": column("scale", 3),
+        "semi_axes": column("semi_axes", 3),
+        "radii": np.array([p["radius"] for p in pits], dtype=float),
+    }
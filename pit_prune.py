@@ -0,0 +1,127 @@
+import numpy as np
+
+
+def rotation_from_y(normal):
+    """把 +Y 转到 normal 的最短弧旋转矩阵，与 pit_tools.pit_gtrsf 中的 gp_Quaternion 一致"""
+    n = np.asarray(normal, dtype=float)
+    n = n / np.linalg.norm(n)
+    y = np.array([0.0, 1.0, 0.0])
+    c = float(y @ n)
+    if c < -1 + 1e-12:
+        return np.diag([1.0, -1.0, -1.0])  # 反向时绕 X 轴转 180°
+    v = np.cross(y, n)
+    vx = np.array([[0, -v[2], v[1]], [v[2], 0, -v[0]], [-v[1], v[0], 0]])
+    return np.eye(3) + vx + vx @ vx / (1 + c)
+
+
+def pit_arrays(pit_info_list):
+    """[(gp_Pnt, gp_Dir, scale_xyz), ...] -> (centers, normals, scales) 三个 (n, 3) 数组"""
+    centers = [(p.X(), p.Y(), p.Z()) for p, _, _ in pit_info_list]
+    normals = [(n.X(), n.Y(), n.Z()) for _, n, _ in pit_info_list]
+    scales = [s for _, _, s in pit_info_list]
+    return np.array(centers).reshape(-1, 3), np.array(normals).reshape(-1, 3), np.array(scales).reshape(-1, 3)
+
+
+def _max_norm_sq(A, c):
+    """
+    单位球经 x = c + A u 映射成的椭球上 |x|^2 的最大值（信赖域子问题）
+    按对偶问题 min_{λ > λmax(AᵀA)} λ + Σ β²/(λ - m) + |c|² 一维二分求解；
+    任意可行 λ 给出的都是上界，因此二分未完全收敛时结果只会偏大，包含判断不会误判
+    """
+    m, V = np.linalg.eigh(A.T @ A)
+    beta2 = (V.T @ (A.T @ c)) ** 2
+    top = m[-1]
+    lo, hi = top, top + np.sqrt(beta2.sum()) + 1e-12 * max(top, 1.0)
+    for _ in range(100):
+        lam = 0.5 * (lo + hi)
+        if lam <= lo or lam >= hi:
+            break
+        if np.sum(beta2 / (lam - m) ** 2) > 1:
+            lo = lam
+        else:
+            hi = lam
+    return float(c @ c + hi + np.sum(beta2 / (hi - m)))
+
+
+def ellipsoid_inside(center_i, rotation_i, radii_i, center_j, rotation_j, radii_j, margin=1e-3):
+    """
+    椭球 i 是否完全落在椭球 j 内（精确判定，j 的各半轴留 margin 相对余量）
+    在 j 的单位球坐标系下，椭球 i 为 x = c + A u (|u| <= 1)，包含等价于 max |x| <= 1 - margin
+    """
+    A = (rotation_j.T @ rotation_i * radii_i) / radii_j[:, None]
+    c = (rotation_j.T @ (center_i - center_j)) / radii_j
+    return _max_norm_sq(A, c) <= (1 - margin) ** 2
+
+
+def _merge_coincident(centers, normals, scales, merge_tol, cos_tol=0.98):
+    """中心距离小于 merge_tol 且法向接近的刀具合并为一个（中心取平均，各轴缩放取最大）"""
+    from scipy.spatial import cKDTree
+
+    parent = np.arange(len(centers))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in cKDTree(centers).query_pairs(merge_tol):
+        if normals[i] @ normals[j] >= cos_tol:
+            parent[find(i)] = find(j)
+
+    roots = np.array([find(i) for i in range(len(centers))])
+    _, group = np.unique(roots, return_inverse=True)
+    n_groups = group.max() + 1 if len(group) else 0
+    counts = np.bincount(group, minlength=n_groups)[:, None]
+    merged_c = np.zeros((n_groups, 3))
+    merged_n = np.zeros((n_groups, 3))
+    merged_s = np.zeros((n_groups, 3))
+    np.add.at(merged_c, group, centers)
+    np.add.at(merged_n, group, normals)
+    np.maximum.at(merged_s, group, scales)
+    merged_n /= np.linalg.norm(merged_n, axis=1, keepdims=True)
+    return merged_c / counts, merged_n, merged_s
+
+
+def prune_pits(centers, normals, scales, semi_axes, merge_tol=0.01, margin=1e-3):
+    """
+    布尔前剪除冗余刀具
+    1. 中心近重合（merge_tol 内）且法向接近的刀具合并
+    2. 完全被其他刀具包含的刀具删除：KD-tree 按中心和外接球半径筛出候选，
+       再精确判定该椭球是否落在候选椭球内（见 ellipsoid_inside，留 margin 余量）
+
+    参数:
+        centers, normals, scales: (n, 3) 数组，含义同 pit_info 的 (pnt, normal, scale_xyz)
+        semi_axes: 椭球模板半轴长，见 PitToolFactory.semi_axes
+
+    返回:
+        (centers, normals, scales, n_removed)
+    """
+    from scipy.spatial import cKDTree
+
+    n_input = len(centers)
+    if n_input < 2:
+        return centers, normals, scales, 0
+
+    normals = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+    centers, normals, scales = _merge_coincident(centers, normals, scales, merge_tol)
+
+    radii = np.asarray(semi_axes) * scales
+    r_out = radii.max(axis=1)
+    rotations = np.array([rotation_from_y(n) for n in normals])
+    tree = cKDTree(centers)
+
+    removed = np.zeros(len(centers), dtype=bool)
+    # 由小到大检查，保证互相包含（近似相同）时只删掉其中一个
+    for i in np.argsort(r_out):
+        for j in tree.query_ball_point(centers[i], r_out.max()):
+            if j == i or removed[j] or r_out[j] < r_out[i]:
+                continue
+            if np.linalg.norm(centers[i] - centers[j]) > r_out[j]:
+                continue
+            if ellipsoid_inside(centers[i], rotations[i], radii[i], centers[j], rotations[j], radii[j], margin):
+                removed[i] = True
+                break
+
+    keep = ~removed
+    return centers[keep], normals[keep], scales[keep], n_input - int(keep.sum())
@@ -0,0 +1,258 @@
+import os
+import numpy as np
+from OCC.Core.TopoDS import topods, TopoDS_Compound, TopoDS_Shell, TopoDS_Solid
+from OCC.Core.TopAbs import TopAbs_SOLID, TopAbs_FACE, TopAbs_EDGE, TopAbs_VERTEX
+from OCC.Core.TopExp import TopExp_Explorer, topexp
+from OCC.Core.BRep import BRep_Builder
+from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Cut, BRepAlgoAPI_Splitter
+from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_GTransform
+from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeBox
+from OCC.Core.BRepBndLib import brepbndlib
+from OCC.Core.Bnd import Bnd_Box
+from OCC.Core.ShapeUpgrade import ShapeUpgrade_UnifySameDomain
+from OCC.Core.TopTools import (TopTools_ListOfShape, TopTools_MapOfShape, TopTools_IndexedMapOfShape,
+                               TopTools_IndexedDataMapOfShapeListOfShape)
+from OCC.Core.gp import gp_Pnt, gp_Dir, gp_Vec, gp_Mat, gp_XYZ, gp_GTrsf, gp_Quaternion
+from shape_cache import load_step_shape
+from surface_sampler import to_gp
+from pit_prune import pit_arrays, prune_pits
+
+# 椭球模板的法向轴（模板的"深"方向沿 +Y）
+TEMPLATE_AXIS = gp_Dir(0, 1, 0)
+
+_factory_cache = {}
+
+
+def pit_gtrsf(pnt, normal, scale_xyz):
+    """
+    把 缩放 -> 旋转到法向 -> 平移到中心 三步合成为一个 gp_GTrsf
+    合成后的线性部分为 R * S，平移部分为坑中心坐标
+    """
+    sx, sy, sz = scale_xyz
+    scale = gp_Mat(sx, 0, 0, 0, sy, 0, 0, 0, sz)
+    rotation = gp_Quaternion(gp_Vec(TEMPLATE_AXIS), gp_Vec(normal)).GetMatrix()
+    gtrsf = gp_GTrsf()
+    gtrsf.SetVectorialPart(rotation.Multiplied(scale))
+    gtrsf.SetTranslationPart(gp_XYZ(pnt.X(), pnt.Y(), pnt.Z()))
+    return gtrsf
+
+
+class PitToolFactory:
+    """
+    凹坑刀具工厂
+    椭球模板 STEP 只解析一次，之后每个坑只做一次组合变换（一次形状拷贝）
+
+    参数:
+        template_path (str): 椭球模板 STEP 路径（如 tuoqiu.STEP）
+    """
+
+    def __init__(self, template_path):
+        self.template_path = template_path
+        self.template = load_step_shape(template_path)
+        # 模板三个半轴长；NURBS 的控制点包围盒偏大，用 AddOptimal 取精确包围盒
+        box = Bnd_Box()
+        brepbndlib.AddOptimal(self.template, box, False, False)
+        xmin, ymin, zmin, xmax, ymax, zmax = box.Get()
+        self.semi_axes = np.array([xmax - xmin, ymax - ymin, zmax - zmin]) / 2
+
+    def make_tool(self, pnt, normal, scale_xyz):
+        return BRepBuilderAPI_GTransform(self.template, pit_gtrsf(pnt, normal, scale_xyz), True).Shape()
+
+    def make_tools(self, pit_info_list):
+        return [self.make_tool(pnt, normal, scale_xyz) for pnt, normal, scale_xyz in pit_info_list]
+
+    def make_compound(self, pit_info_list):
+        builder = BRep_Builder()
+        compound = TopoDS_Compound()
+        builder.MakeCompound(compound)
+        for tool in self.make_tools(pit_info_list):
+            builder.Add(compound, tool)
+        return compound
+
+
+def prune_pit_info(pit_info_list, semi_axes, merge_tol=0.01):
+    """
+    布尔前剪除冗余刀具（被其他刀具完全包含的删除，近重合的合并），见 pit_prune.prune_pits
+    返回新的 pit_info 列表
+    """
+    centers, normals, scales = pit_arrays(pit_info_list)
+    centers, normals, scales, n_removed = prune_pits(centers, normals, scales, semi_axes, merge_tol=merge_tol)
+    print(f"🧹 剪除冗余刀具 {n_removed} 个，剩余 {len(centers)} 个")
+    return [(*to_gp(c, n), tuple(s)) for c, n, s in zip(centers, normals, scales)]
+
+
+def get_pit_tool_factory(template_path):
+    """按模板绝对路径复用工厂，同一进程内模板只读取一次"""
+    key = os.path.abspath(template_path)
+    factory = _factory_cache.get(key)
+    if factory is None:
+        factory = PitToolFactory(template_path)
+        _factory_cache[key] = factory
+    return factory
+
+
+def run_boolean(algo, shape, tools, fuzzy_value=0.0, parallel=True):
+    """
+    以 shape 为对象、tools 为刀具列表执行一次 BRepAlgoAPI 布尔运算
+    基准齿轮由 shape_cache 在进程内复用，因此始终使用非破坏模式，不修改输入形状的容差
+    """
+    arguments = TopTools_ListOfShape()
+    arguments.Append(shape)
+    tool_list = TopTools_ListOfShape()
+    for tool in tools:
+        tool_list.Append(tool)
+
+    op = algo()
+    op.SetArguments(arguments)
+    op.SetTools(tool_list)
+    op.SetRunParallel(parallel)
+    op.SetNonDestructive(True)
+    if fuzzy_value > 0:
+        op.SetFuzzyValue(fuzzy_value)
+    op.Build()
+    if not op.IsDone():
+        raise RuntimeError(f"{algo.__name__} 布尔运算失败（刀具数量 = {len(tools)}）")
+    return op.Shape()
+
+
+def cut_with_tools(shape, tools, fuzzy_value=0.0, parallel=True):
+    """
+    一次多刀具布尔差：工件对全部刀具只做一次 General Fuse，不再逐个 fuse 刀具
+    刀具之间允许相互重叠
+
+    参数:
+        shape (TopoDS_Shape): 被切工件
+        tools (list): 刀具形状列表
+        fuzzy_value (float): 模糊布尔容差，0 表示使用 OCC 默认精度
+        parallel (bool): 是否开启 OCC 并行模式
+    """
+    if not tools:
+        return shape
+    return run_boolean(BRepAlgoAPI_Cut, shape, tools, fuzzy_value=fuzzy_value, parallel=parallel)
+
+
+def tools_region_box(tools, margin=1.0):
+    """所有刀具的包围盒（各方向外扩 margin）对应的长方体及其 Bnd_Box"""
+    box = Bnd_Box()
+    for tool in tools:
+        brepbndlib.Add(tool, box)
+    box.Enlarge(margin)
+    xmin, ymin, zmin, xmax, ymax, zmax = box.Get()
+    return BRepPrimAPI_MakeBox(gp_Pnt(xmin, ymin, zmin), gp_Pnt(xmax, ymax, zmax)).Shape(), box
+
+
+def sub_shapes(shape, kind):
+    """按 TopExp_Explorer 顺序列出 shape 中某类子形状"""
+    result = []
+    exp = TopExp_Explorer(shape, kind)
+    while exp.More():
+        result.append(exp.Current())
+        exp.Next()
+    return result
+
+
+def inside_box(shape, region, tol=1e-6):
+    """shape 的包围盒是否落在 region（Bnd_Box）内"""
+    box = Bnd_Box()
+    brepbndlib.Add(shape, box)
+    box.Enlarge(tol)
+    xmin, ymin, zmin, xmax, ymax, zmax = box.Get()
+    rxmin, rymin, rzmin, rxmax, rymax, rzmax = region.Get()
+    return (xmin >= rxmin - tol and ymin >= rymin - tol and zmin >= rzmin - tol
+            and xmax <= rxmax + tol and ymax <= rymax + tol and zmax <= rzmax + tol)
+
+
+def face_ancestors(solids):
+    """面 -> 所属实体列表的映射（TopTools_IndexedDataMapOfShapeListOfShape）"""
+    builder = BRep_Builder()
+    compound = TopoDS_Compound()
+    builder.MakeCompound(compound)
+    for solid in solids:
+        builder.Add(compound, solid)
+    ancestors = TopTools_IndexedDataMapOfShapeListOfShape()
+    topexp.MapShapesAndAncestors(compound, TopAbs_FACE, TopAbs_SOLID, ancestors)
+    return ancestors
+
+
+def count_shared_faces(solids):
+    ancestors = face_ancestors(solids)
+    return sum(1 for i in range(1, ancestors.Size() + 1) if ancestors.FindFromIndex(i).Size() > 1)
+
+
+def sew_split_solids(solids):
+    """
+    把共享切分面的若干实体拼回一个实体（纯拓扑操作，不做求交）
+    被两个实体共享的面即为切分面，丢弃；其余面按原朝向组成新的外壳
+
+    返回:
+        (solid, seam_faces)，seam_faces 为被丢弃的切分面列表
+    """
+    ancestors = face_ancestors(solids)
+    builder = BRep_Builder()
+    shell = TopoDS_Shell()
+    builder.MakeShell(shell)
+    seam_faces = []
+    for solid in solids:
+        for face in sub_shapes(solid, TopAbs_FACE):
+            if ancestors.FindFromKey(face).Size() > 1:
+                seam_faces.append(face)
+            else:
+                builder.Add(shell, face)
+    shell.Closed(True)
+    result = TopoDS_Solid()
+    builder.MakeSolid(result)
+    builder.Add(result, shell)
+    return result, seam_faces
+
+
+def unify_seam(shape, seam_faces):
+    """
+    只在切分线附近合并同一曲面上被拆开的面和边
+    不属于切分面的边和顶点全部登记为保留，UnifySameDomain 不会改动其余拓扑
+    """
+    seam = TopTools_IndexedMapOfShape()
+    for face in seam_faces:
+        topexp.MapShapes(face, TopAbs_EDGE, seam)
+        topexp.MapShapes(face, TopAbs_VERTEX, seam)
+    keep = TopTools_MapOfShape()
+    for kind in (TopAbs_EDGE, TopAbs_VERTEX):
+        for sub in sub_shapes(shape, kind):
+            if not seam.Contains(sub):
+                keep.Add(sub)
+
+    unify = ShapeUpgrade_UnifySameDomain(shape, True, True, False)
+    unify.KeepShapes(keep)
+    unify.Build()
+    return unify.Shape()
+
+
+def cut_with_tools_local(shape, tools, margin=1.0, fuzzy_value=0.0, parallel=True):
+    """
+    局部布尔差：区域盒只把齿轮切分一次，刀具只和盒内的小块做布尔，
+    再按共享的切分面把各块拼回一个实体，最后只在切分线附近合并被拆开的面
+    刀具求交的耗时只和坑所在区域有关，与整个齿轮的拓扑规模无关
+
+    参数:
+        margin (float): 区域包围盒相对刀具包围盒的外扩量（mm），需保证刀具完全落在区域内
+        其余参数同 cut_with_tools
+    """
+    if not tools:
+        return shape
+
+    region_box, region = tools_region_box(tools, margin)
+    pieces = sub_shapes(run_boolean(BRepAlgoAPI_Splitter, shape, [region_box], parallel=parallel), TopAbs_SOLID)
+    local, rest = [], []
+    for piece in pieces:
+        (local if inside_box(piece, region) else rest).append(topods.Solid(piece))
+    if not local or not rest:
+        # 区域盒没有把齿轮切开（刀具区域覆盖了整个齿轮或落在齿轮外），直接整体切
+        return cut_with_tools(shape, tools, fuzzy_value=fuzzy_value, parallel=parallel)
+
+    # 刀具离盒面至少 margin，切分面不参与求交，布尔后仍与盒外部分共享
+    cut = [topods.Solid(s) for piece in local
+           for s in sub_shapes(cut_with_tools(piece, tools, fuzzy_value=fuzzy_value, parallel=parallel), TopAbs_SOLID)]
+    solid, seam_faces = sew_split_solids(rest + cut)
+    if len(seam_faces) != 2 * count_shared_faces(rest + local):
+        print("⚠️ 局部切分面未能复用，改为整体布尔")
+        return cut_with_tools(shape, tools, fuzzy_value=fuzzy_value, parallel=parallel)
+    return unify_seam(solid, seam_faces)
@@ -0,0 +1,105 @@
+import math
+import numpy as np
+
+
+def _axis_map(lo, hi, spacing, grid=None, arc=None):
+    """
+    把一个参数轴映射到"间距为 1"的缩放坐标
+    spacing 为 None 表示该轴不受间距约束（坐标塌缩为 0，最后再均匀随机取值）
+    给定 grid/arc（归一化参数 -> 累积弧长）时，spacing 按真实弧长计算
+    """
+    if spacing is None:
+        return 0.0, 0.0, None
+    if arc is None:
+        return lo / spacing, hi / spacing, lambda x: x * spacing
+    s_lo, s_hi = np.interp([lo, hi], grid, arc)
+    return s_lo / spacing, s_hi / spacing, lambda x: np.interp(x * spacing, arc, grid)
+
+
+def poisson_disk_uv(n=None, u_range=(0.0, 1.0), v_range=(0.0, 1.0), u_spacing=0.05, v_spacing=None,
+                    arc_length=None, k=30, rng=None):
+    """
+    Bridson 泊松圆盘采样（背景网格加速，线性时间）
+    两点 (u1,v1)、(u2,v2) 合格当且仅当 (du/u_spacing)^2 + (dv/v_spacing)^2 >= 1
+
+    参数:
+        n (int): 需要的点数，None 表示返回整个极大点集
+        u_range, v_range (tuple): 归一化参数范围
+        u_spacing (float): u 方向最小间距，None 表示 u 方向不约束
+        v_spacing (float): v 方向最小间距，默认与 u_spacing 相同（各向同性）
+        arc_length (tuple): FaceSampler.arc_length_maps() 的结果，
+                            给定时 u_spacing / v_spacing 的单位为真实弧长（mm）
+        k (int): 每个活动点的候选数
+        rng: np.random.Generator，默认使用 np.random 全局状态（便于 np.random.seed 复现）
+
+    返回:
+        [(u, v), ...]，点数不足 n 时打印警告并返回全部合格点，不抛异常
+    """
+    rng = np.random if rng is None else rng
+    if v_spacing is None:
+        v_spacing = u_spacing
+    u_grid, s_u, v_grid, s_v = arc_length if arc_length is not None else (None,) * 4
+
+    x_lo, x_hi, x_to_u = _axis_map(*u_range, u_spacing, u_grid, s_u)
+    y_lo, y_hi, y_to_v = _axis_map(*v_range, v_spacing, v_grid, s_v)
+
+    # 缩放坐标系中最小距离为 1，格子边长 1/sqrt(2)，每格最多一个点
+    cell = 1.0 / math.sqrt(2.0)
+    nx = max(int(math.ceil((x_hi - x_lo) / cell)), 1)
+    ny = max(int(math.ceil((y_hi - y_lo) / cell)), 1)
+    grid = -np.ones((nx, ny), dtype=np.int64)
+    samples = []
+
+    def cell_of(x, y):
+        return min(int((x - x_lo) / cell), nx - 1), min(int((y - y_lo) / cell), ny - 1)
+
+    def accept(x, y):
+        ix, iy = cell_of(x, y)
+        for i in range(max(ix - 2, 0), min(ix + 3, nx)):
+            for j in range(max(iy - 2, 0), min(iy + 3, ny)):
+                idx = grid[i, j]
+                if idx >= 0:
+                    px, py = samples[idx]
+                    if (px - x) ** 2 + (py - y) ** 2 < 1.0:
+                        return False
+        return True
+
+    def insert(x, y):
+        ix, iy = cell_of(x, y)
+        grid[ix, iy] = len(samples)
+        samples.append((x, y))
+        active.append(len(samples) - 1)
+
+    active = []
+    insert(rng.uniform(x_lo, x_hi), rng.uniform(y_lo, y_hi))
+    while active:
+        a = int(rng.uniform(0, len(active)))
+        ax, ay = samples[active[a]]
+        radius = rng.uniform(1.0, 2.0, k)
+        theta = rng.uniform(0.0, 2.0 * math.pi, k)
+        found = False
+        for x, y in zip(ax + radius * np.cos(theta), ay + radius * np.sin(theta)):
+            # 塌缩轴（不约束方向）上直接投影，其余越界候选丢弃
+            x = x_lo if x_hi == x_lo else x
+            y = y_lo if y_hi == y_lo else y
+            if not (x_lo <= x <= x_hi and y_lo <= y <= y_hi):
+                continue
+            if accept(x, y):
+                insert(x, y)
+                found = True
+                break
+        if not found:
+            active[a] = active[-1]
+            active.pop()
+
+    pts = np.array(samples)
+    order = rng.permutation(len(pts))
+    if n is not None:
+        if n > len(pts):
+            print(f"⚠️ 间距约束下最多放置 {len(pts)} 个点，少于请求的 {n} 个")
+        order = order[:n]
+    pts = pts[order]
+
+    u = x_to_u(pts[:, 0]) if x_to_u is not None else rng.uniform(*u_range, len(pts))
+    v = y_to_v(pts[:, 1]) if y_to_v is not None else rng.uniform(*v_range, len(pts))
+    return [(float(a), float(b)) for a, b in zip(u, v)]
@@ -0,0 +1,173 @@
+import os
+import hashlib
+
+# 缓存目录，可通过环境变量 GEAR_SHAPE_CACHE 指定
+CACHE_DIR = os.environ.get("GEAR_SHAPE_CACHE",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), ".shape_cache"))
+
+# 缓存总大小上限（MB），超出时按最近使用时间淘汰最旧的条目，可通过环境变量 GEAR_SHAPE_CACHE_MB 指定
+CACHE_MAX_MB = float(os.environ.get("GEAR_SHAPE_CACHE_MB", 1024))
+# 由本模块管理并参与淘汰的缓存后缀（mesh_cache 的网格缓存另行管理）
+CACHE_SUFFIXES = (".bin.brep", ".gmsh.brep", ".faces.json")
+
+_digest_memo = {}
+_shape_memo = {}
+
+
+def file_digest(filepath):
+    """STEP 文件内容的 sha1；同一进程内按 (路径, 大小, 修改时间) 记忆，避免重复读文件"""
+    stat = os.stat(filepath)
+    key = (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns)
+    digest = _digest_memo.get(key)
+    if digest is None:
+        h = hashlib.sha1()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _digest_memo[key] = digest
+    return digest
+
+
+def cached_path(filepath, suffix=".bin.brep", cache_dir=None):
+    """STEP 文件对应的缓存文件路径（按内容哈希命名，STEP 内容变化后自然失效）"""
+    cache_dir = cache_dir or CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, file_digest(filepath) + suffix)
+
+
+def _write_atomic(path, write):
+    """先写临时文件再改名，多进程同时写同一缓存时不会留下半截文件"""
+    root, ext = os.path.splitext(path)
+    tmp_path = f"{root}.{os.getpid()}.tmp{ext}"  # 保留扩展名，gmsh 按扩展名判断格式
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def touch_cache(path):
+    """命中缓存时更新修改时间，淘汰按修改时间从旧到新进行"""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def prune_cache(cache_dir=None, max_mb=None):
+    """缓存目录中 CACHE_SUFFIXES 条目的总大小超过上限时，从最久未使用的开始删除"""
+    cache_dir = cache_dir or CACHE_DIR
+    limit = (CACHE_MAX_MB if max_mb is None else max_mb) * (1 << 20)
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(CACHE_SUFFIXES) and ".tmp" not in entry.name:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def store_cache(path, write):
+    """原子写入一个缓存条目，并把缓存目录控制在大小上限内"""
+    _write_atomic(path, write)
+    prune_cache(os.path.dirname(path))
+
+
+def load_step_shape(filepath, cache_dir=None, cache=True):
+    """
+    读取 STEP 为 pythonocc 的 TopoDS_Shape
+    首次读取后写入 OCC 二进制 BREP 缓存，之后跳过 STEP 转换直接读缓存
+    cache=False 时直接读 STEP 且不写缓存，用于每次运行都会重新生成的文件
+    """
+    from OCC.Core.STEPControl import STEPControl_Reader
+    from OCC.Core.BinTools import bintools
+    from OCC.Core.TopoDS import TopoDS_Shape
+
+    def read_step():
+        reader = STEPControl_Reader()
+        status = reader.ReadFile(filepath)
+        if status != 1:
+            raise RuntimeError(f"STEP文件读取失败: {filepath}")
+        reader.TransferRoot()
+        return reader.Shape()
+
+    if not cache:
+        return read_step()
+
+    brep_path = cached_path(filepath, cache_dir=cache_dir)
+    shape = _shape_memo.get(brep_path)
+    if shape is not None:
+        return shape
+
+    shape = None
+    if os.path.exists(brep_path):
+        shape = TopoDS_Shape()
+        if bintools.Read(shape, brep_path):
+            touch_cache(brep_path)
+        else:
+            # 缓存损坏或读取时已被淘汰，按未命中处理
+            shape = None
+    if shape is None:
+        shape = read_step()
+        store_cache(brep_path, lambda p: bintools.Write(shape, p))
+    _shape_memo[brep_path] = shape
+    return shape
+
+
+def load_step_workplane(filepath, cache_dir=None, cache=True):
+    """
+    读取 STEP 为 cadquery Workplane，与 load_step_shape 共用同一份二进制 BREP 缓存
+    cache=False 时直接读 STEP 且不写缓存
+    """
+    import cadquery as cq
+
+    if not cache:
+        return cq.importers.importStep(filepath)
+
+    brep_path = cached_path(filepath, cache_dir=cache_dir)
+    if os.path.exists(brep_path):
+        try:
+            workplane = cq.Workplane("XY").newObject([cq.Shape.importBin(brep_path)])
+            touch_cache(brep_path)
+            return workplane
+        except Exception:
+            pass  # 缓存损坏或读取时已被淘汰，按未命中处理
+
+    workplane = cq.importers.importStep(filepath)
+    solids = workplane.vals()
+    shape = solids[0] if len(solids) == 1 else cq.Compound.makeCompound(solids)
+    store_cache(brep_path, shape.exportBin)
+    return workplane
+
+
+def import_step_gmsh(filepath, cache_dir=None):
+    """
+    gmsh 导入 STEP，并缓存为 gmsh 可直接读取的 BREP
+    gmsh 只能读文本 BREP，因此与 OCC 二进制缓存分开存放（同一哈希，后缀 .gmsh.brep）
+    每次运行重新生成的装配体 STEP 在同一次运行内会被逐齿轮划分的多个进程重复导入，
+    因此仍然缓存，旧条目由 prune_cache 按大小上限淘汰
+    """
+    import gmsh
+
+    brep_path = cached_path(filepath, suffix=".gmsh.brep", cache_dir=cache_dir)
+    if os.path.exists(brep_path):
+        try:
+            gmsh.model.occ.importShapes(brep_path)
+            gmsh.model.occ.synchronize()
+            touch_cache(brep_path)
+            return
+        except Exception:
+            # 缓存损坏或读取时已被淘汰，清掉可能导入了一半的实体后按未命中处理
+            gmsh.model.occ.remove(gmsh.model.occ.getEntities(), recursive=True)
+            gmsh.model.occ.synchronize()
+    gmsh.model.occ.importShapes(filepath)
+    gmsh.model.occ.synchronize()
+    store_cache(brep_path, lambda p: gmsh.write(p))
@@ -0,0 +1,140 @@
+import numpy as np
+from OCC.Core.TopoDS import topods
+from OCC.Core.TopAbs import TopAbs_FACE
+from OCC.Core.TopExp import TopExp_Explorer
+from OCC.Core.BRep import BRep_Tool
+from OCC.Core.GeomAdaptor import GeomAdaptor_Surface
+from OCC.Core.GeomLProp import GeomLProp_SLProps
+from OCC.Core.gp import gp_Pnt, gp_Dir
+
+
+class FaceSampler:
+    """
+    目标面 (u, v) 采样器
+
+    grid=True 时每个面只在稠密网格上求值一次，点和法向缓存为 NumPy 数组，
+    之后所有坑位都通过双线性插值批量查询；适用于多次布坑复用同一采样器（batch_damage）。
+    grid=False 时每次查询直接在曲面上求值，结果精确落在面上，单次布坑只需几十个点时更快；
+    网格在首次调用 arc_length_maps 时才建立
+
+    参数:
+        face (TopoDS_Face): 目标面
+        nu, nv (int): u / v 方向的网格点数
+        grid (bool): 是否立即建立插值网格
+    """
+
+    def __init__(self, face, nu=101, nv=101, grid=True):
+        self.surf = BRep_Tool.Surface(face)
+        adaptor = GeomAdaptor_Surface(self.surf)
+        self.umin, self.umax = adaptor.FirstUParameter(), adaptor.LastUParameter()
+        self.vmin, self.vmax = adaptor.FirstVParameter(), adaptor.LastVParameter()
+        self.nu, self.nv = nu, nv
+        self.props = GeomLProp_SLProps(self.surf, 1, 1e-6)
+
+        # 归一化参数网格，与 pit_uv_list 的 (0~1) 坐标一致
+        self.u_grid = np.linspace(0.0, 1.0, nu)
+        self.v_grid = np.linspace(0.0, 1.0, nv)
+        self.points = self.normals = self.valid = None
+        if grid:
+            self.build_grid()
+
+    def build_grid(self):
+        """在 nu x nv 网格上求值，缓存点、法向及法向是否有定义"""
+        uu, vv = np.meshgrid(self.u_grid, self.v_grid, indexing="ij")
+        points, normals, valid = self.evaluate(np.column_stack((uu.ravel(), vv.ravel())))
+        self.points = points.reshape(self.nu, self.nv, 3)
+        self.normals = normals.reshape(self.nu, self.nv, 3)
+        self.valid = valid.reshape(self.nu, self.nv)
+
+    def evaluate(self, uv_norm):
+        """
+        直接在曲面上求归一化 (u, v) 处的点和单位法向（逐点 GeomLProp_SLProps）
+
+        返回:
+            points (n, 3), normals (n, 3), valid (n,)
+        """
+        uv = np.asarray(uv_norm, dtype=float).reshape(-1, 2)
+        points = np.zeros((len(uv), 3))
+        normals = np.zeros((len(uv), 3))
+        valid = np.zeros(len(uv), dtype=bool)
+        props = self.props
+        for k, (u_norm, v_norm) in enumerate(uv.tolist()):
+            props.SetParameters(self.umin + u_norm * (self.umax - self.umin),
+                                self.vmin + v_norm * (self.vmax - self.vmin))
+            p = props.Value()
+            points[k] = (p.X(), p.Y(), p.Z())
+            if props.IsNormalDefined():
+                n = props.Normal()
+                normals[k] = (n.X(), n.Y(), n.Z())
+                valid[k] = True
+        return points, normals, valid
+
+    def sample(self, uv_norm):
+        """
+        批量查询归一化 (u, v) 处的点和单位法向
+
+        返回:
+            points (n, 3), normals (n, 3), valid (n,)
+            valid 为 False 表示法向未定义（网格模式下为插值单元内存在法向未定义的网格点）
+        """
+        if self.points is None:
+            return self.evaluate(np.clip(np.asarray(uv_norm, dtype=float).reshape(-1, 2), 0.0, 1.0))
+        uv = np.asarray(uv_norm, dtype=float).reshape(-1, 2)
+        fu = np.clip(uv[:, 0], 0.0, 1.0) * (self.nu - 1)
+        fv = np.clip(uv[:, 1], 0.0, 1.0) * (self.nv - 1)
+        i0 = np.minimum(fu.astype(int), self.nu - 2)
+        j0 = np.minimum(fv.astype(int), self.nv - 2)
+        tu = (fu - i0)[:, None]
+        tv = (fv - j0)[:, None]
+
+        def bilinear(grid):
+            return ((1 - tu) * (1 - tv) * grid[i0, j0] + tu * (1 - tv) * grid[i0 + 1, j0]
+                    + (1 - tu) * tv * grid[i0, j0 + 1] + tu * tv * grid[i0 + 1, j0 + 1])
+
+        points = bilinear(self.points)
+        normals = bilinear(self.normals)
+        length = np.linalg.norm(normals, axis=1)
+        valid = (self.valid[i0, j0] & self.valid[i0 + 1, j0]
+                 & self.valid[i0, j0 + 1] & self.valid[i0 + 1, j0 + 1] & (length > 1e-12))
+        normals[valid] /= length[valid, None]
+        return points, normals, valid
+
+    def arc_length_maps(self):
+        """
+        归一化参数到累积弧长（mm）的映射，用于按真实弧长控制坑间距
+        u 方向弧长对所有 v 等参线取平均，v 方向同理
+
+        返回:
+            (u_grid, s_u, v_grid, s_v)
+        """
+        if self.points is None:
+            self.build_grid()
+        du = np.linalg.norm(np.diff(self.points, axis=0), axis=2).mean(axis=1)
+        dv = np.linalg.norm(np.diff(self.points, axis=1), axis=2).mean(axis=0)
+        s_u = np.concatenate(([0.0], np.cumsum(du)))
+        s_v = np.concatenate(([0.0], np.cumsum(dv)))
+        return self.u_grid, s_u, self.v_grid, s_v
+
+
+def build_face_samplers(shape, target_face_ids, nu=101, nv=101, face_index=None, grid=True):
+    """
+    对基准形状的目标面各建一个采样器，返回 {face_id: FaceSampler}
+    grid=True 建立插值网格，供多次布坑复用；单次布坑传 grid=False 直接在曲面上求值
+    给定 face_index（face_index.FaceIndex）时直接按 ID 取面，不再遍历形状
+    """
+    if face_index is not None:
+        return {fid: FaceSampler(face, nu, nv, grid) for fid, face in face_index.faces_by_id(target_face_ids).items()}
+    samplers = {}
+    exp = TopExp_Explorer(shape, TopAbs_FACE)
+    face_idx = -1
+    while exp.More():
+        face_idx += 1
+        if face_idx in target_face_ids:
+            samplers[face_idx] = FaceSampler(topods.Face(exp.Current()), nu, nv, grid)
+        exp.Next()
+    return samplers
+
+
+def to_gp(point, normal):
+    """NumPy 行向量转换为 OCC 的 gp_Pnt / gp_Dir"""
+    return gp_Pnt(*map(float, point)), gp_Dir(*map(float, normal))
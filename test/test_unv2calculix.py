@@ -0,0 +1,122 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from unv2calculix import convert_unv_to_inp, write_inp_arrays
+
+# gmsh 写 UNV 时的单元类型和节点重排（GModelIO_UNV / MElement::getVertexUNV）
+GMSH_UNV = {
+    2: (91, [0, 1, 2]),
+    4: (111, [0, 1, 2, 3]),
+    9: (92, [0, 3, 1, 4, 2, 5]),
+    11: (118, [0, 4, 1, 5, 2, 6, 7, 9, 8, 3]),
+}
+
+
+def small_mesh(volume_type=4, surface_type=2):
+    """
+    两个体实体（4 个四面体）加一个面实体（2 个三角形）的网格数组（mesh_cache 格式）
+    物理组：Gear1（两个体）、contact_1（面）、X_cut（第二个体，写 INP 时剔除）
+    """
+    rng = np.random.default_rng(1)
+    nodes_per_volume = {4: 4, 11: 10}[volume_type]
+    nodes_per_surface = {2: 3, 9: 6}[surface_type]
+    n_nodes = 40
+    blocks = [(0, volume_type, [11, 12, 13]), (1, volume_type, [14]), (2, surface_type, [21, 22])]
+    elem_nodes, block_node_offsets = [], [0]
+    for _, gtype, tags in blocks:
+        width = nodes_per_volume if gtype == volume_type else nodes_per_surface
+        for _ in tags:
+            elem_nodes.extend(rng.choice(np.arange(1, n_nodes + 1), width, replace=False).tolist())
+        block_node_offsets.append(len(elem_nodes))
+    return {
+        "node_tags": np.arange(1, n_nodes + 1, dtype=np.int64),
+        "coords": rng.uniform(-50, 50, (n_nodes, 3)),
+        "entity_dim": np.array([3, 3, 2]),
+        "entity_tag": np.array([1, 2, 7]),
+        "block_entity": np.array([b[0] for b in blocks]),
+        "block_type": np.array([b[1] for b in blocks]),
+        "elem_tags": np.array([t for b in blocks for t in b[2]], dtype=np.int64),
+        "block_elem_offsets": np.cumsum([0] + [len(b[2]) for b in blocks]),
+        "elem_nodes": np.array(elem_nodes, dtype=np.int64),
+        "block_node_offsets": np.array(block_node_offsets),
+        "group_name": np.array(["Gear1", "contact_1", "X_cut"]),
+        "group_dim": np.array([3, 2, 3]),
+        "group_entities": np.array([1, 2, 7, 2]),
+        "group_entity_offsets": np.array([0, 2, 3, 4]),
+    }
+
+
+def write_unv_like_gmsh(mesh, path):
+    """按 gmsh 的 UNV 版式写出网格（Mesh.SaveAll=1, Mesh.SaveGroupsOfNodes=1）"""
+    lines = ["    -1", "  2411"]
+    for nid, xyz in zip(mesh["node_tags"].tolist(), mesh["coords"].tolist()):
+        lines.append("%10d%10d%10d%10d" % (nid, 1, 1, 11))
+        lines.append("".join("%25.16E" % x for x in xyz).replace("E", "D"))
+    lines += ["    -1", "    -1", "  2412"]
+    eo, no = mesh["block_elem_offsets"], mesh["block_node_offsets"]
+    for b, gtype in enumerate(mesh["block_type"].tolist()):
+        unv_type, order = GMSH_UNV[gtype]
+        tags = mesh["elem_tags"][eo[b]:eo[b + 1]]
+        conn = mesh["elem_nodes"][no[b]:no[b + 1]].reshape(len(tags), -1)[:, order]
+        for tag, row in zip(tags.tolist(), conn.tolist()):
+            lines.append("%10d%10d%10d%10d%10d%10d" % (tag, unv_type, 2, 1, 7, len(row)))
+            for k in range(0, len(row), 8):
+                lines.append("".join("%10d" % n for n in row[k:k + 8]))
+    lines += ["    -1", "    -1", "  2477"]
+    entity_key = list(zip(mesh["entity_dim"].tolist(), mesh["entity_tag"].tolist()))
+    go = mesh["group_entity_offsets"]
+    for g, name in enumerate(mesh["group_name"].tolist()):
+        dim = int(mesh["group_dim"][g])
+        blocks = [b for b, e in enumerate(mesh["block_entity"].tolist())
+                  if entity_key[e][0] == dim and entity_key[e][1] in mesh["group_entities"][go[g]:go[g + 1]]]
+        nodes = np.unique(np.concatenate([mesh["elem_nodes"][no[b]:no[b + 1]] for b in blocks]))
+        elems = np.concatenate([mesh["elem_tags"][eo[b]:eo[b + 1]] for b in blocks])
+        items = [(7, n) for n in nodes.tolist()] + [(8, e) for e in elems.tolist()]
+        lines.append("%10d%10d%10d%10d%10d%10d%10d%10d" % (g + 1, 0, 0, 0, 0, 0, 0, len(items)))
+        lines.append(name)
+        for k in range(0, len(items), 2):
+            lines.append("".join("%10d%10d%10d%10d" % (t, i, 0, 0) for t, i in items[k:k + 2]))
+    lines.append("    -1")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def read_inp(path):
+    """INP -> [(关键字行, 数值行列表)]，数值按 float 比较，不受 1 / 1.0 之类格式差异影响"""
+    sections = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("*"):
+                sections.append((line, []))
+            elif line:
+                sections[-1][1].append([float(v) for v in line.split(",")])
+    return sections
+
+
+def check_same_as_unv_route(tmp_path, **kwargs):
+    mesh = small_mesh(**kwargs)
+    unv_path = str(tmp_path / "mesh.unv")
+    write_unv_like_gmsh(mesh, unv_path)
+    convert_unv_to_inp(unv_path, str(tmp_path / "via_unv.inp"), reduced="N")
+    write_inp_arrays(mesh, str(tmp_path / "direct.inp"), reduced="N")
+    via_unv = read_inp(tmp_path / "via_unv.inp")
+    direct = read_inp(tmp_path / "direct.inp")
+    assert direct == via_unv
+    return direct
+
+
+def test_direct_inp_matches_unv_route_linear(tmp_path):
+    sections = check_same_as_unv_route(tmp_path, volume_type=4, surface_type=2)
+    keywords = [k for k, _ in sections]
+    # 面单元不单独成块，X_ 组的单元和 ELSET 都被剔除
+    assert keywords == ["*NODE, NSET=NALL", "*ELEMENT,TYPE=C3D4,ELSET=C3D4", "*NSET,NSET=Gear1",
+                        "*NSET,NSET=contact_1", "*NSET,NSET=X_cut", "*ELSET,ELSET=Gear1", "*ELSET,ELSET=contact_1"]
+    assert [row[0] for row in sections[1][1]] == [11, 12, 13]
+
+
+def test_direct_inp_matches_unv_route_quadratic(tmp_path):
+    sections = check_same_as_unv_route(tmp_path, volume_type=11, surface_type=9)
+    assert [k for k, _ in sections][1] == "*ELEMENT,TYPE=C3D10,ELSET=C3D10"
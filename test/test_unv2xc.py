@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import unv2xc
+from unv2xc import FEM, FEM_ARRAYS, Element, Node, UNVParser, decode_2411, fem_cache_path
+
+# gmsh 版式的小 UNV：单位数据集 164（解析时跳过）、节点 2411、单元 2412（beam 11、三角形 91、
+# 四面体 111、十节点四面体 118 跨两行）、分组 2477（奇数个条目，末行只有一个条目）
+UNV_TEXT = """\
+    -1
+   164
+         1  SI: Meter (newton)         2
+    1.0000000000000000E+00    1.0000000000000000E+00    1.0000000000000000E+00
+    2.7314999999999998E+02
+    -1
+    -1
+  2411
+         1         1         1        11
+  -1.2500000000000000D+01   3.3333333333333331D-01   0.0000000000000000D+00
+         2         1         1        11
+   7.0710678118654757D-01  -2.2250738585072014D-30   1.7976931348623157D+25
+         3         1         1        11
+   9.9999999999999995D-08   1.2345678901234567D+02  -6.0221407599999999D+23
+         4         1         1        11
+   1.0000000000000000D+00   2.0000000000000000D+00   3.0000000000000000D+00
+         5         1         1        11
+  -4.4408920985006262D-16   5.0000000000000000D-01   1.1000000000000001D+00
+         6         1         1        11
+   2.5000000000000000D+00  -7.5000000000000000D+00   9.8765432109876543D-12
+    -1
+    -1
+  2412
+         1        11         2         1         7         2
+         0         1         1
+         1         2
+         2        91         2         1         7         3
+         1         2         3
+         3       111         2         1         7         4
+         1         2         3         4
+         4       111         2         1         7         4
+         2         3         4         5
+         5       118         2         1         7        10
+         1         2         3         4         5         6         1         2
+         3         4
+    -1
+    -1
+  2477
+         1         0         0         0         0         0         0         3
+Gear1
+         7         1         0         0         7         2         0         0
+         8         3         0         0
+         2         0         0         0         0         0         0         2
+contact_1
+         8         2         0         0         8         5         0         0
+    -1
+"""
+
+
+def node_block(coords):
+    """gmsh 版式的 2411 数据内容（不含首尾标记行），坐标为 %25.16E 且 E 换成 D"""
+    lines = []
+    for i, xyz in enumerate(coords):
+        lines.append("%10d%10d%10d%10d" % (i + 1, 1, 1, 11))
+        lines.append("".join("%25.16E" % x for x in xyz).replace("E", "D"))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def write_unv(tmp_path, text=UNV_TEXT, name="mesh.unv"):
+    path = str(tmp_path / name)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def baseline_parse(path):
+    """
+    原逐行解析（baseline UNVParser）的参照实现：先扫描各数据集起点，再逐行读取，坐标逐个 float()
+    返回 (nodes, elems, nodesets, elemsets)，节点为 (id, [x, y, z])，单元为 (id, type, nnodes, cntvt)
+    """
+    nodes, elems, nodesets, elemsets = [], [], [], []
+    with open(path) as f:
+        lines = f.read().splitlines()
+    i = 0
+    while i < len(lines):
+        if not lines[i].startswith("    -1"):
+            i += 1
+            continue
+        section = int(lines[i + 1])
+        i += 2
+        while not lines[i].startswith("    -1"):
+            if section == 2411:
+                coords = [float(v) for v in lines[i + 1].replace("D", "E").split()]
+                nodes.append((int(lines[i].split()[0]), coords))
+                i += 2
+            elif section == 2412:
+                head = [int(v) for v in lines[i].split()]
+                i += 1 if head[1] < 33 else 0
+                cntvt = []
+                for line in lines[i + 1:]:
+                    cntvt += [int(v) for v in line.split()]
+                    i += 1
+                    if len(cntvt) >= head[5]:
+                        break
+                elems.append((head[0], head[1], head[5], cntvt))
+                i += 1
+            elif section in (2467, 2477):
+                head = [int(v) for v in lines[i].split()]
+                name = lines[i + 1].strip()
+                nlines = (head[7] + 1) // 2
+                items = []
+                for line in lines[i + 2:i + 2 + nlines]:
+                    values = [int(v) for v in line.split()]
+                    items += [values[k:k + 4] for k in range(0, len(values), 4)]
+                i += 2 + nlines
+                for group_type, sets in ((7, nodesets), (8, elemsets)):
+                    ids = [item[1] for item in items if item[0] == group_type]
+                    if ids:
+                        sets.append((head[0], name, ids))
+            else:
+                i += 1
+        i += 1
+    return nodes, elems, nodesets, elemsets
+
+
+def assert_same_as_baseline(fem, path):
+    nodes, elems, nodesets, elemsets = baseline_parse(path)
+    assert fem.node_ids.tolist() == [n[0] for n in nodes]
+    # 坐标须与逐个 float() 的结果逐位一致
+    assert fem.coords.tolist() == [n[1] for n in nodes]
+    assert [(e.id, e.type, e.nnodes, e.cntvt) for e in fem.elems] == elems
+    assert [(g.id, g.name, g.items.tolist()) for g in fem.nodesets] == nodesets
+    assert [(g.id, g.name, g.items.tolist()) for g in fem.elemsets] == elemsets
+    assert (fem.nnodesets, fem.nelemsets) == (len(nodesets), len(elemsets))
+
+
+def test_parse_matches_baseline(tmp_path):
+    path = write_unv(tmp_path)
+    fem = UNVParser(path).parse()
+    assert_same_as_baseline(fem, path)
+    assert (fem.nnodes, fem.nelems) == (6, 5)
+    assert [g.name for g in fem.elemsets] == ["Gear1", "contact_1"]
+
+
+def test_parse_without_trailing_newline(tmp_path):
+    path = write_unv(tmp_path, UNV_TEXT.rstrip("\n"))
+    assert_same_as_baseline(UNVParser(path).parse(), path)
+
+
+def test_parse_empty_file(tmp_path):
+    fem = UNVParser(write_unv(tmp_path, "")).parse()
+    assert (fem.nnodes, fem.nelems, fem.nnodesets, fem.nelemsets) == (0, 0, 0, 0)
+
+
+def test_fem_arrays_round_trip(tmp_path):
+    fem = UNVParser(write_unv(tmp_path)).parse()
+    np.savez(tmp_path / "fem.npz", **fem.to_arrays())
+    with np.load(tmp_path / "fem.npz") as data:
+        loaded = FEM.from_arrays(data)
+    for name in FEM_ARRAYS:
+        assert np.array_equal(getattr(loaded, name), getattr(fem, name))
+    assert [(g.id, g.name, g.type, g.items.tolist()) for g in loaded.nodesets + loaded.elemsets] == \
+        [(g.id, g.name, g.type, g.items.tolist()) for g in fem.nodesets + fem.elemsets]
+
+
+def test_fem_object_views():
+    fem = FEM()
+    fem.nodes = [Node(3, [0.0, 1.0, 2.0]), Node(7, [3.0, 4.0, 5.0])]
+    fem.elems = [Element(1, 111, 0, 0, 4, [3, 7, 3, 7]), Element(2, 11, 0, 0, 2, [7, 3])]
+    assert [(n.id, n.coords) for n in fem.nodes] == [(3, [0.0, 1.0, 2.0]), (7, [3.0, 4.0, 5.0])]
+    assert fem.nodes[1].id == 7 and len(fem.nodes) == 2
+    assert [(e.id, e.type, e.nnodes, e.cntvt) for e in fem.elems] == [(1, 111, 4, [3, 7, 3, 7]), (2, 11, 2, [7, 3])]
+    assert fem.elems[1].cntvt == [7, 3] and len(fem.elems) == 2
+    assert fem.cntvt_offsets.tolist() == [0, 4, 6]
+
+
+def random_doubles(rng, n, emin, emax):
+    """十进制指数在 [emin, emax) 内的随机 double：随机尾数乘 10 的幂，加上随机位模式"""
+    scaled = rng.uniform(1, 10, n) * rng.choice([-1.0, 1.0], n) * 10.0 ** rng.integers(emin, emax, n)
+    bits = rng.integers(0, 2 ** 63, 50 * n, dtype=np.int64).view(float)
+    bits = bits[(np.abs(bits) >= 10.0 ** emin) & (np.abs(bits) < 10.0 ** emax)][:n]
+    values = np.concatenate([scaled, bits])
+    return values[:len(values) // 3 * 3].reshape(-1, 3)
+
+
+def test_decode_2411_matches_float():
+    rng = np.random.default_rng(0)
+    # 两位指数（gmsh 网格坐标的常见情况）和三位指数分别成块：同一块内各行的列位置须一致
+    two_digit = np.concatenate([random_doubles(rng, 3000, -99, 99),
+                                [[0.0, 1.0, -1.0], [0.1, 2.0 ** -52, 123456789.0]]])
+    for values in (two_digit, random_doubles(rng, 1500, 100, 270), random_doubles(rng, 1500, -260, -100)):
+        block = node_block(values)
+        ids, coords = decode_2411(block, 0, len(block))
+        expected = np.array([[float(x) for x in ("%25.16E" % v for v in row)] for row in values])
+        assert ids.tolist() == list(range(1, len(values) + 1))
+        # 逐位一致，不只是数值接近
+        assert np.array_equal(coords.view(np.int64), expected.view(np.int64))
+
+
+def test_decode_2411_falls_back_to_line_reader(tmp_path):
+    # 超出双双精度 10 的幂表范围的指数、同一块内两位和三位指数混排，以及非等宽的自由格式记录，都不走批量解码
+    extreme = node_block([[1e-300, -1.7976931348623157e308, 5e-324]])
+    mixed = node_block([[1.5, -2.5e-120, 3.0], [4.0, 5.0, 6.0e150]])
+    free = b"1 1 1 11\n1.5D+00 -2.25 3\n2 1 1 11\n4 5 6\n"
+    for block in (extreme, mixed, free):
+        assert decode_2411(block, 0, len(block)) is None
+        path = write_unv(tmp_path, "    -1\n  2411\n" + block.decode() + "    -1\n")
+        assert_same_as_baseline(UNVParser(path).parse(), path)
+
+
+@pytest.fixture
+def no_decode(monkeypatch):
+    """禁止重新解析 UNV：只有读缓存的路径能通过"""
+    def fail(mm):
+        raise AssertionError("UNV 被重新解析")
+    return lambda: monkeypatch.setattr(unv2xc, "iter_sections", fail)
+
+
+def test_cache_is_opt_in(tmp_path):
+    path = write_unv(tmp_path)
+    UNVParser(path).parse()
+    assert not os.path.exists(fem_cache_path(path))
+
+
+def test_cache_reused_when_content_unchanged(tmp_path, no_decode):
+    path = write_unv(tmp_path)
+    UNVParser(path, cache=True).parse()
+    assert os.path.exists(fem_cache_path(path))
+    no_decode()
+    assert_same_as_baseline(UNVParser(path, cache=True).parse(), path)
+    # 只改修改时间（touch、复制）时按 sha1 判断内容未变，仍命中，并按新的修改时间重写缓存键
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert_same_as_baseline(UNVParser(path, cache=True).parse(), path)
+    with np.load(fem_cache_path(path)) as data:
+        assert json.loads(str(data["key"]))["mtime_ns"] == os.stat(path).st_mtime_ns
+
+
+def test_cache_invalidated_when_content_changes(tmp_path):
+    path = write_unv(tmp_path)
+    UNVParser(path, cache=True).parse()
+    stat = os.stat(path)
+    # 大小不变、只改一个坐标，修改时间变化后须按 sha1 判定失效并重新解析
+    write_unv(tmp_path, UNV_TEXT.replace("-1.2500000000000000D+01", "-1.2600000000000000D+01"))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert os.stat(path).st_size == stat.st_size
+    fem = UNVParser(path, cache=True).parse()
+    assert fem.coords[0, 0] == -12.6
+    assert_same_as_baseline(fem, path)
+    # 大小变化时直接失效
+    write_unv(tmp_path, UNV_TEXT.replace("Gear1", "Gear_1"))
+    assert UNVParser(path, cache=True).parse().elemsets[0].name == "Gear_1"
+
+
+def fem_state(fem):
+    return ([getattr(fem, name).tolist() for name in FEM_ARRAYS],
+            [(g.id, g.name, g.type, g.items.tolist()) for g in fem.nodesets + fem.elemsets],
+            (fem.nnodesets, fem.nelemsets))
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_parallel_parse_matches_serial(tmp_path, workers):
+    # 第二个节点数据集接在分组之后，并行解码后仍须按文件顺序拼装
+    extra = "    -1\n  2411\n" + node_block([[7.0, 8.0, 9.0]]).decode().replace("         1", "         7", 1) + "    -1\n"
+    path = write_unv(tmp_path, UNV_TEXT + extra)
+    serial = UNVParser(path).parse()
+    parallel = UNVParser(path).parse(parallel=True, workers=workers)
+    assert_same_as_baseline(parallel, path)
+    assert fem_state(parallel) == fem_state(serial)
+    assert parallel.node_ids.tolist() == [1, 2, 3, 4, 5, 6, 7]
+
+
+def test_parallel_parse_with_cache(tmp_path, no_decode):
+    path = write_unv(tmp_path)
+    serial = UNVParser(path).parse()
+    parallel = UNVParser(path, cache=True).parse(parallel=True, workers=2)
+    no_decode()
+    cached = UNVParser(path, cache=True).parse(parallel=True, workers=2)
+    assert fem_state(parallel) == fem_state(serial) == fem_state(cached)
@@ -1,3 +1,4 @@
+import numpy as np
 from unv2xc import *
 
 inp_to_med_C3D10 = [1,3,5,10,2,4,6,7,8,9]
@@ -6,8 +7,28 @@ inp_to_med_S6 = [1,3,5,2,4,6]
 inp_to_med_S8 = [1,3,5,7,2,4,6,8]
 inp_to_med_C3D15 = [1,3,5,10,12,14,2,4,6,11,13,15,7,8,9]
 
-def convert_unv_to_inp(unvfile, out_inp_path, reduced='R'):
-    types = {
+def convert_unv_to_inp(unvfile, out_inp_path, reduced='R', parallel=False, cache=False):
+    """cache=True 时复用 UNV 旁的 .fem.npz 解析缓存，适合对同一个 UNV 反复转换"""
+    UNV = UNVParser(unvfile, cache=cache)
+    FEM = UNV.parse(parallel=parallel)
+    write_inp(FEM, out_inp_path, reduced)
+    print(f"✅ UNV 文件 {unvfile} 成功转换为 INP 文件 {out_inp_path}")
+
+# gmsh 单元类型 -> (UNV 单元类型, gmsh 节点顺序到 UNV 节点顺序的映射)，与 gmsh 写 UNV 时的类型和重排一致
+# gmsh 把面单元写成薄壳类型 91/92/94/95，write_inp 不输出这些类型，直接写 INP 时同样跳过
+gmsh_to_unv = {
+    2: (91, [0, 1, 2]),
+    3: (94, [0, 1, 2, 3]),
+    4: (111, [0, 1, 2, 3]),
+    5: (115, [0, 1, 2, 3, 4, 5, 6, 7]),
+    6: (112, [0, 1, 2, 3, 4, 5]),
+    9: (92, [0, 3, 1, 4, 2, 5]),
+    11: (118, [0, 4, 1, 5, 2, 6, 7, 9, 8, 3]),
+    16: (95, [0, 4, 1, 5, 2, 6, 3, 7]),
+}
+
+def inp_element_types(reduced='R'):
+    return {
         41: 'STRI35', 42: 'S6', 44: 'S4R5', 45: 'S8R',
         111: 'C3D4', 112: 'C3D6', 113: 'C3D15',
         115: 'C3D8R', 116: 'C3D20R', 118: 'C3D10'
@@ -17,12 +38,21 @@ def convert_unv_to_inp(unvfile, out_inp_path, reduced='R'):
         115: 'C3D8', 116: 'C3D20', 118: 'C3D10'
     }
 
+def connectivity_map(map_name):
+    return {
+        'C3D10': inp_to_med_C3D10,
+        'C3D20': inp_to_med_C3D20,
+        'S6': inp_to_med_S6,
+        'S8': inp_to_med_S8,
+        'C3D15': inp_to_med_C3D15
+    }.get(map_name, list(range(1, 21)))
+
+def write_inp(FEM, out_inp_path, reduced='R'):
+    types = inp_element_types(reduced)
+
     elemdic = {k: [] for k in types}
     ls = '\n'
 
-    UNV = UNVParser(unvfile)
-    FEM = UNV.parse()
-
     with open(out_inp_path, 'w') as fil:
         fil.write('*NODE, NSET=NALL' + ls)
         for node in FEM.nodes:
@@ -43,13 +73,7 @@ def convert_unv_to_inp(unvfile, out_inp_path, reduced='R'):
             if elems:
                 map_name = types[typ]
                 fil.write(f'*ELEMENT,TYPE={map_name},ELSET={map_name}' + ls)
-                themap = {
-                    'C3D10': inp_to_med_C3D10,
-                    'C3D20': inp_to_med_C3D20,
-                    'S6': inp_to_med_S6,
-                    'S8': inp_to_med_S8,
-                    'C3D15': inp_to_med_C3D15
-                }.get(map_name, list(range(1, 21)))
+                themap = connectivity_map(map_name)
                 for elem in elems:
                     if elem.id not in X_Ids:
                         lst = elem.cntvt
@@ -86,6 +110,77 @@ def convert_unv_to_inp(unvfile, out_inp_path, reduced='R'):
                     fil.write(ls)
                     count = 0
 
-    print(f"✅ UNV 文件 {unvfile} 成功转换为 INP 文件 {out_inp_path}")
+def _write_id_lines(fil, ids):
+    """每行 8 个编号，逗号分隔（与 write_inp 的 NSET/ELSET 格式一致）"""
+    ids = np.asarray(ids, dtype=np.int64)
+    n_full = len(ids) // 8 * 8
+    if n_full:
+        np.savetxt(fil, ids[:n_full].reshape(-1, 8), fmt='%d', delimiter=',')
+    if n_full < len(ids):
+        fil.write(','.join(map(str, ids[n_full:].tolist())) + '\n')
+
+def write_inp_arrays(mesh, out_inp_path, reduced='R'):
+    """
+    直接由网格数组（mesh_cache 格式，来自 gmsh）写出 CalculiX INP，不经过 UNV
+    gmsh 节点顺序先按 gmsh_to_unv 转为 UNV 顺序，再用与 write_inp 相同的连接表映射，
+    单元类型、分组方式（每个物理组一个 NSET 和一个 ELSET）、X_ 组单元的剔除均与 UNV 转换结果一致；
+    节点坐标按 17 位有效数字写出，数值与 write_inp 相同，文本格式可能不同（如 1 与 1.0）
+    """
+    types = inp_element_types(reduced)
+    eo, no = mesh["block_elem_offsets"], mesh["block_node_offsets"]
+    entity_key = list(zip(mesh["entity_dim"].tolist(), mesh["entity_tag"].tolist()))
+    blocks_of = {}
+    for b, e in enumerate(mesh["block_entity"].tolist()):
+        blocks_of.setdefault(entity_key[e], []).append(b)
+
+    go = mesh["group_entity_offsets"]
+    nsets, elsets = [], []
+    for g, name in enumerate(mesh["group_name"].tolist()):
+        dim = int(mesh["group_dim"][g])
+        blocks = [b for t in mesh["group_entities"][go[g]:go[g + 1]].tolist() for b in blocks_of.get((dim, t), [])]
+        if not blocks:
+            continue
+        elsets.append((name, np.concatenate([mesh["elem_tags"][eo[b]:eo[b + 1]] for b in blocks])))
+        nsets.append((name, np.unique(np.concatenate([mesh["elem_nodes"][no[b]:no[b + 1]] for b in blocks]))))
+    # 与 write_inp 相同：X_ 组的单元不写入 *ELEMENT，X_ 组本身也不写 ELSET
+    x_ids = [ids for name, ids in elsets if name.startswith('X_')]
+    x_ids = np.concatenate(x_ids) if x_ids else np.zeros(0, dtype=np.int64)
+
+    elemdic = {k: [] for k in types}
+    for b, gtype in enumerate(mesh["block_type"].tolist()):
+        if gtype not in gmsh_to_unv:
+            continue
+        unv_type, order = gmsh_to_unv[gtype]
+        if unv_type not in types:
+            continue
+        tags = mesh["elem_tags"][eo[b]:eo[b + 1]]
+        conn = mesh["elem_nodes"][no[b]:no[b + 1]].reshape(len(tags), -1)[:, order]
+        if len(x_ids):
+            keep = ~np.isin(tags, x_ids)
+            tags, conn = tags[keep], conn[keep]
+        if len(tags):
+            elemdic[unv_type].append((tags, conn))
+
+    with open(out_inp_path, 'w') as fil:
+        fil.write('*NODE, NSET=NALL\n')
+        nodes = np.column_stack([mesh["node_tags"].astype(float), mesh["coords"]])
+        np.savetxt(fil, nodes, fmt=['%d', '%.17g', '%.17g', '%.17g'], delimiter=',')
+
+        for typ, blocks in elemdic.items():
+            if blocks:
+                map_name = types[typ]
+                fil.write(f'*ELEMENT,TYPE={map_name},ELSET={map_name}\n')
+                themap = np.asarray(connectivity_map(map_name)) - 1
+                for tags, conn in blocks:
+                    conn = conn[:, themap[:conn.shape[1]]]
+                    np.savetxt(fil, np.column_stack([tags, conn]), fmt='%d', delimiter=',')
+
+        for name, ids in nsets:
+            fil.write(f'*NSET,NSET={name}\n')
+            _write_id_lines(fil, ids)
+        for name, ids in elsets:
+            if not name.startswith('X_'):
+                fil.write(f'*ELSET,ELSET={name}\n')
+                _write_id_lines(fil, ids)
 
 # convert_unv_to_inp('assembled_gears.unv', 'assembled_gears_OUT.inp', "N")
@@ -1,17 +1,160 @@
+import io
 import os
-import sys
+import json
+import mmap
+import warnings
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+import numpy as np
+from shape_cache import file_digest, _write_atomic
+
+FEM_CACHE_VERSION = 1
+FEM_ARRAYS = ("node_ids", "coords", "elem_ids", "elem_types", "elem_nnodes", "cntvt", "cntvt_offsets")
 
 class FEM:
+    """
+    UNV 网格容器，节点、单元以 NumPy 数组保存（百万级节点时避免逐个 Python 对象的内存和分配开销）
+    node_ids (n,) int64, coords (n, 3) float64
+    elem_ids / elem_types / elem_nnodes (m,) int64，连接表为扁平的 cntvt 加 cntvt_offsets (m + 1,)
+    nodesets / elemsets 为 Group 列表，Group.items 为 int64 数组
+    nodes / elems 按需构造 Node / Element 对象，供 unv2calculix 等沿用对象接口的代码使用
+    """
     def __init__(self):
-        self.nnodes = 0
-        self.nelems = 0
+        self.node_ids = np.zeros(0, dtype=np.int64)
+        self.coords = np.zeros((0, 3))
+        self.elem_ids = np.zeros(0, dtype=np.int64)
+        self.elem_types = np.zeros(0, dtype=np.int64)
+        self.elem_nnodes = np.zeros(0, dtype=np.int64)
+        self.cntvt = np.zeros(0, dtype=np.int64)
+        self.cntvt_offsets = np.zeros(1, dtype=np.int64)
         self.nnodesets = 0
         self.nelemsets = 0
-        self.nodes = []
-        self.elems = []
         self.nodesets = []
         self.elemsets = []
 
+    @property
+    def nnodes(self):
+        return len(self.node_ids)
+
+    @property
+    def nelems(self):
+        return len(self.elem_ids)
+
+    def add_nodes(self, ids, coords):
+        self.node_ids = np.concatenate([self.node_ids, np.asarray(ids, dtype=np.int64)])
+        self.coords = np.concatenate([self.coords, np.asarray(coords, dtype=float).reshape(-1, 3)])
+
+    def add_elems(self, ids, types, nnodes, cntvt, offsets):
+        """追加一批单元；offsets 为这批单元在 cntvt 中的起止位置 (k + 1,)，从 0 开始"""
+        self.elem_ids = np.concatenate([self.elem_ids, np.asarray(ids, dtype=np.int64)])
+        self.elem_types = np.concatenate([self.elem_types, np.asarray(types, dtype=np.int64)])
+        self.elem_nnodes = np.concatenate([self.elem_nnodes, np.asarray(nnodes, dtype=np.int64)])
+        offsets = np.asarray(offsets, dtype=np.int64)
+        self.cntvt_offsets = np.concatenate([self.cntvt_offsets, offsets[1:] + len(self.cntvt)])
+        self.cntvt = np.concatenate([self.cntvt, np.asarray(cntvt, dtype=np.int64)])
+
+    def elem_cntvt(self, i):
+        return self.cntvt[self.cntvt_offsets[i]:self.cntvt_offsets[i + 1]]
+
+    def extend(self, other):
+        """追加另一个 FEM（如单独解码的一个数据集）的节点、单元和分组"""
+        if other.nnodes:
+            self.add_nodes(other.node_ids, other.coords)
+        if other.nelems:
+            self.add_elems(other.elem_ids, other.elem_types, other.elem_nnodes, other.cntvt, other.cntvt_offsets)
+        self.nodesets.extend(other.nodesets)
+        self.elemsets.extend(other.elemsets)
+        self.nnodesets = len(self.nodesets)
+        self.nelemsets = len(self.elemsets)
+
+    def to_arrays(self):
+        """全部数据 -> 扁平数组字典（分组为 名称/编号/偏移/条目 四个数组），供 np.savez 写出"""
+        data = {name: getattr(self, name) for name in FEM_ARRAYS}
+        for key, groups in (("nodeset", self.nodesets), ("elemset", self.elemsets)):
+            data[key + "_names"] = np.array([g.name for g in groups], dtype=str)
+            data[key + "_ids"] = np.array([g.id for g in groups], dtype=np.int64)
+            data[key + "_offsets"] = np.cumsum([0] + [len(g.items) for g in groups]).astype(np.int64)
+            data[key + "_items"] = np.concatenate([np.zeros(0, dtype=np.int64)] + [g.items for g in groups])
+        return data
+
+    @classmethod
+    def from_arrays(cls, data):
+        fem = cls()
+        for name in FEM_ARRAYS:
+            setattr(fem, name, data[name])
+        for key, group_type in (("nodeset", 7), ("elemset", 8)):
+            offsets, items = data[key + "_offsets"], data[key + "_items"]
+            groups = []
+            for i, (name, gid) in enumerate(zip(data[key + "_names"].tolist(), data[key + "_ids"].tolist())):
+                group = Group(gid, name)
+                group.type = group_type
+                group.items = items[offsets[i]:offsets[i + 1]]
+                group.nitems = len(group.items)
+                groups.append(group)
+            setattr(fem, key + "s", groups)
+        fem.nnodesets = len(fem.nodesets)
+        fem.nelemsets = len(fem.elemsets)
+        return fem
+
+    @property
+    def nodes(self):
+        return NodeView(self)
+
+    @nodes.setter
+    def nodes(self, nodes):
+        self.node_ids = np.array([node.id for node in nodes], dtype=np.int64)
+        self.coords = np.array([node.coords for node in nodes], dtype=float).reshape(-1, 3)
+
+    @property
+    def elems(self):
+        return ElementView(self)
+
+    @elems.setter
+    def elems(self, elems):
+        self.elem_ids = np.zeros(0, dtype=np.int64)
+        self.elem_types = np.zeros(0, dtype=np.int64)
+        self.elem_nnodes = np.zeros(0, dtype=np.int64)
+        self.cntvt = np.zeros(0, dtype=np.int64)
+        self.cntvt_offsets = np.zeros(1, dtype=np.int64)
+        self.add_elems([e.id for e in elems], [e.type for e in elems], [e.nnodes for e in elems],
+                       [n for e in elems for n in e.cntvt], np.cumsum([0] + [len(e.cntvt) for e in elems]))
+
+class NodeView:
+    """FEM 节点数组的只读序列视图，元素为 Node"""
+    def __init__(self, fem):
+        self.fem = fem
+
+    def __len__(self):
+        return self.fem.nnodes
+
+    def __getitem__(self, i):
+        return Node(int(self.fem.node_ids[i]), self.fem.coords[i].tolist())
+
+    def __iter__(self):
+        for nid, xyz in zip(self.fem.node_ids.tolist(), self.fem.coords.tolist()):
+            yield Node(nid, xyz)
+
+class ElementView:
+    """FEM 单元数组的只读序列视图，元素为 Element"""
+    def __init__(self, fem):
+        self.fem = fem
+
+    def __len__(self):
+        return self.fem.nelems
+
+    def __getitem__(self, i):
+        fem = self.fem
+        return Element(int(fem.elem_ids[i]), int(fem.elem_types[i]), 0, 0, int(fem.elem_nnodes[i]),
+                       fem.elem_cntvt(i).tolist())
+
+    def __iter__(self):
+        fem = self.fem
+        offsets = fem.cntvt_offsets.tolist()
+        for i, (eid, typ, nn) in enumerate(zip(fem.elem_ids.tolist(), fem.elem_types.tolist(),
+                                               fem.elem_nnodes.tolist())):
+            yield Element(eid, typ, 0, 0, nn, fem.cntvt[offsets[i]:offsets[i + 1]].tolist())
+
 class Node:
     def __init__(self, id, coords):
         self.id = id
@@ -32,7 +175,7 @@ class Group:
         self.type = 0
         self.name = name.strip()
         self.nitems = 0
-        self.items = []
+        self.items = np.zeros(0, dtype=np.int64)
 
 def Line2Float(line):
     return list(map(float, line.split()))
@@ -42,76 +185,74 @@ def Line2Int(line):
 
 def UNV2411Reader(file, FEM):
     endFlag = '    -1'
+    ids, coords = array('q'), array('d')
     while True:
+        # 先判断结束标记再读第二行，流式解析时不会吞掉下一个数据集的开始标记
         line1 = file.readline()
+        if not line1 or line1.startswith(endFlag):
+            break
         line2 = file.readline()
         if not line2:
             break
-        if line1.startswith(endFlag):
-            break
-        dataline = Line2Int(line1)
-        line2 = line2.replace('D', 'E')
-        coords = Line2Float(line2)
-        FEM.nodes.append(Node(dataline[0], coords))
-        FEM.nnodes += 1
+        ids.append(int(line1.split()[0]))
+        coords.extend(Line2Float(line2.replace('D', 'E')))
+    FEM.add_nodes(np.frombuffer(ids, dtype=np.int64), np.frombuffer(coords, dtype=float))
     return FEM
 
 def UNV2412Reader(file, FEM):
     endFlag = '    -1'
+    ids, types, nnodes, cntvt, offsets = array('q'), array('q'), array('q'), array('q'), array('q', [0])
     while True:
         line1 = file.readline()
+        if not line1 or line1.startswith(endFlag):
+            break
         line2 = file.readline()
         if not line2:
             break
-        if line1.startswith(endFlag):
-            break
         dataline = Line2Int(line1)
         eltype = dataline[1]
-        nnodes = dataline[-1]
+        nn = dataline[-1]
         if eltype < 33:
             line3 = file.readline()
-            cntvt = Line2Int(line3)
+            cntvt.extend(Line2Int(line3))
         else:
-            cntvt = Line2Int(line2)
-            if nnodes > 8:
+            cntvt.extend(Line2Int(line2))
+            if nn > 8:
                 cntvt.extend(Line2Int(file.readline()))
-            if nnodes > 16:
+            if nn > 16:
                 cntvt.extend(Line2Int(file.readline()))
-            if nnodes > 24:
+            if nn > 24:
                 cntvt.extend(Line2Int(file.readline()))
-        FEM.elems.append(Element(dataline[0], eltype, 0, 0, dataline[5], cntvt))
-        FEM.nelems += 1
+        ids.append(dataline[0])
+        types.append(eltype)
+        nnodes.append(dataline[5])
+        offsets.append(len(cntvt))
+    FEM.add_elems(*(np.frombuffer(a, dtype=np.int64) for a in (ids, types, nnodes, cntvt, offsets)))
     return FEM
 
 def UNV2467Reader(file, FEM):
     endFlag = '    -1'
     while True:
         line1 = file.readline()
+        if not line1 or line1.startswith(endFlag):
+            break
         line2 = file.readline()
         if not line2:
             break
-        if line1.startswith(endFlag):
-            break
         dataline = Line2Int(line1)
         groupname = line2.strip()
         id = dataline[0]
         nitems = dataline[7]
         nlines = (nitems + 1) // 2
-        lst = []
-        for _ in range(nlines):
-            dat = Line2Int(file.readline())
-            lst.append(dat[0:3])
-            if len(dat) > 4:
-                lst.append(dat[4:7])
+        # 每行最多两个条目，每个条目 4 个整数：实体类型、编号、节点/单元在类型内的序号、0
+        dat = np.array(' '.join(file.readline() for _ in range(nlines)).split(), dtype=np.int64)
+        items = dat[:nitems * 4].reshape(-1, 4)
         nset = Group(id, groupname)
         elset = Group(id, groupname)
         nset.type = 7
         elset.type = 8
-        for item in lst:
-            if item[0] == 7:
-                nset.items.append(item[1])
-            elif item[0] == 8:
-                elset.items.append(item[1])
+        nset.items = items[items[:, 0] == 7, 1]
+        elset.items = items[items[:, 0] == 8, 1]
         nset.nitems = len(nset.items)
         elset.nitems = len(elset.items)
         if nset.nitems > 0:
@@ -122,36 +263,335 @@ def UNV2467Reader(file, FEM):
         FEM.nelemsets = len(FEM.elemsets)
     return FEM
 
+# === 2411 / 2412 批量解码 ===
+# 节点记录为等宽的 4I10 + 3D25.16 两行：整块映射为 uint8 矩阵，坐标按列做数字运算（17 位尾数的逐个
+# float() 是逐行读取的主要耗时），编号和单元连接表整块交给 np.fromstring；版式不符时退回逐行读取
+_ROWS = 1 << 14         # 2411 每次解码的记录数，临时数组留在缓存内
+_CHUNK = 1 << 20        # 2412 每次解码的字节数
+_SPLIT = 134217729.0    # 2**27 + 1，Dekker 拆分
+_POW10 = {}             # k -> 10**k 的双双精度 (hi, lo)
+
+def _pow10_dd(kmin, kmax):
+    """10**k (kmin <= k <= kmax) 的双双精度表 (hi, lo)，hi + lo 与精确值之差远小于 hi 的末位"""
+    for k in range(kmin, kmax + 1):
+        if k not in _POW10:
+            x = Fraction(10) ** k
+            hi = float(x)
+            _POW10[k] = (hi, float(x - Fraction(hi)))
+    table = np.array([_POW10[k] for k in range(kmin, kmax + 1)])
+    return table[:, 0], table[:, 1]
+
+def _two_prod(a, b):
+    p = a * b
+    t = _SPLIT * a
+    ah = t - (t - a)
+    al = a - ah
+    t = _SPLIT * b
+    bh = t - (t - b)
+    bl = b - bh
+    return p, ((ah * bh - p) + ah * bl + al * bh) + al * bl
+
+def _digits_value(D):
+    """(n, k) 数字矩阵 -> int64 数值；按不超过 9 位一段做浮点矩阵乘（结果小于 2**53，精确）再拼接"""
+    D = D.astype(float)
+    values = np.zeros(len(D), dtype=np.int64)
+    for a in range(0, D.shape[1], 9):
+        part = D[:, a:a + 9]
+        values *= 10 ** part.shape[1]
+        values += (part @ 10.0 ** np.arange(part.shape[1] - 1, -1, -1)).astype(np.int64)
+    return values
+
+def fixed_width_floats(F):
+    """
+    等宽浮点字段（如 D25.16）批量解码，F 为 (n, w) uint8 矩阵；各行数字、小数点和指数符的列位置须一致
+    尾数按整数精确读出，再乘以双双精度的 10 的幂，结果与逐个 float() 一致；版式不一致时返回 None
+    """
+    n, w = F.shape
+    if not n:
+        return np.zeros(0)
+    row0 = F[0]
+    marks = [c for c in range(w) if row0[c] in b'DEde']
+    if len(marks) != 1:
+        return None
+    m = marks[0]
+    digit_cols = [c for c in range(w) if 48 <= row0[c] <= 57]
+    mant = [c for c in digit_cols if c < m]
+    expo = [c for c in digit_cols if c > m]
+    dots = [c for c in range(m) if row0[c] == 46]
+    signs = [c for c in range(w) if c != m and c not in digit_cols and c not in dots]
+    if not mant or len(mant) > 18 or not expo or len(expo) > 3 or len(dots) > 1:
+        return None
+
+    Dm = F[:, mant] - np.uint8(48)
+    De = F[:, expo] - np.uint8(48)
+    S = F[:, signs]
+    marker = F[:, m] | np.uint8(32)
+    if (Dm > 9).any() or (De > 9).any() or not ((marker == 100) | (marker == 101)).all():
+        return None
+    if not ((S == 32) | (S == 43) | (S == 45)).all() or (dots and not (F[:, dots[0]] == 46).all()):
+        return None
+    neg = (S[:, [i for i, c in enumerate(signs) if c < m]] == 45).any(axis=1)
+    neg_exp = (S[:, [i for i, c in enumerate(signs) if c > m]] == 45).any(axis=1)
+
+    M = _digits_value(Dm)
+    k = _digits_value(De)
+    k[neg_exp] *= -1
+    k -= sum(c > dots[0] for c in mant) if dots else 0
+    kmin, kmax = int(k.min()), int(k.max())
+    if kmin < -280 or kmax > 280:
+        return None
+    hi, lo = _pow10_dd(kmin, kmax)
+    ph, pl = hi[k - kmin], lo[k - kmin]
+    mh = M.astype(float)
+    ml = (M - mh.astype(np.int64)).astype(float)
+    p, e = _two_prod(mh, ph)
+    values = p + (e + (mh * pl + ml * ph))
+    values[neg] *= -1
+    return values
+
+def _line_blocks(mm, start, end, size=None):
+    """把 [start, end) 切成约 size（默认 _CHUNK）字节的块，切点在行尾"""
+    size = size or _CHUNK
+    a = start
+    while a < end:
+        b = end if end - a <= size else mm.find(b'\n', a + size) + 1
+        if b <= 0 or b > end:
+            b = end
+        yield mm[a:b]
+        a = b
+
+def _int_tokens(buf):
+    """一块文本中的全部整数（整数解析没有浮点舍入问题，直接用 np.fromstring）；含非整数内容时返回 None"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            return np.fromstring(buf, dtype=np.int64, sep=' ')
+    except (ValueError, DeprecationWarning):
+        return None
+
+def _text_block(mm, start, end):
+    return io.StringIO(mm[start:end].decode('utf-8', errors='ignore'))
+
+def decode_2411(mm, start, end):
+    """节点块 -> (ids, coords)；记录不是等宽版式时返回 None"""
+    if end <= start:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 3))
+    l1 = mm.find(b'\n', start) + 1 - start
+    l2 = mm.find(b'\n', start + l1) + 1 - start - l1
+    L = l1 + l2
+    if l1 < 11 or l2 < 76 or (end - start) % L:
+        return None
+    R = np.frombuffer(mm, dtype=np.uint8, count=end - start, offset=start).reshape(-1, L)
+    if not ((R[:, l1 - 1] == 10).all() and (R[:, L - 1] == 10).all()):
+        return None
+    ids, coords = [], []
+    for a in range(0, len(R), _ROWS):
+        r = R[a:a + _ROWS]
+        head = _int_tokens(np.ascontiguousarray(r[:, :l1]).tobytes())
+        c = fixed_width_floats(np.ascontiguousarray(r[:, l1:l1 + 75]).reshape(-1, 25))
+        if head is None or len(head) != 4 * len(r) or c is None:
+            return None
+        ids.append(head[::4].copy())
+        coords.append(c.reshape(-1, 3))
+    return np.concatenate(ids), np.concatenate(coords)
+
+def decode_2412(mm, start, end):
+    """
+    单元块 -> (ids, types, nnodes, cntvt, offsets)；无法解析时返回 None
+    全部整数一次读出后按记录步长切分：gmsh 按类型连续写出单元，同类型的一段记录一次 reshape
+    （beam 类单元 type < 33 在连接表前多一行 3 个整数）
+    """
+    parts = []
+    for buf in _line_blocks(mm, start, end):
+        values = _int_tokens(buf)
+        if values is None:
+            return None
+        parts.append(values)
+    tok = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+    del parts
+
+    ids, types, nnodes, cntvt = [], [], [], []
+    pos, n = 0, len(tok)
+    while pos < n:
+        if pos + 6 > n:
+            return None
+        eltype, nn = int(tok[pos + 1]), int(tok[pos + 5])
+        head = 9 if eltype < 33 else 6
+        stride = head + nn
+        if nn <= 0 or pos + stride > n:
+            return None
+        # 同类型记录的连续段：逐步加倍检查窗口，遇到第一条类型或节点数不同的记录为止
+        run, window = 0, 8
+        while True:
+            p = pos + run * stride
+            k = min(window, (n - p) // stride)
+            if k == 0:
+                break
+            rec = tok[p:p + k * stride].reshape(k, stride)
+            ok = (rec[:, 1] == eltype) & (rec[:, 5] == nn)
+            good = k if ok.all() else int(np.argmin(ok))
+            run += good
+            if good < k:
+                break
+            window *= 2
+        rec = tok[pos:pos + run * stride].reshape(run, stride)
+        ids.append(rec[:, 0])
+        types.append(rec[:, 1])
+        nnodes.append(rec[:, 5])
+        cntvt.append(rec[:, head:].ravel())
+        pos += run * stride
+    if not ids:
+        return (np.zeros(0, dtype=np.int64),) * 4 + (np.zeros(1, dtype=np.int64),)
+    nnodes = np.concatenate(nnodes)
+    offsets = np.concatenate([[0], np.cumsum(nnodes)])
+    return np.concatenate(ids), np.concatenate(types), nnodes, np.concatenate(cntvt), offsets
+
+def UNV2411Decoder(mm, start, end, FEM):
+    nodes = decode_2411(mm, start, end)
+    if nodes is None:
+        return UNV2411Reader(_text_block(mm, start, end), FEM)
+    FEM.add_nodes(*nodes)
+    return FEM
+
+def UNV2412Decoder(mm, start, end, FEM):
+    elems = decode_2412(mm, start, end)
+    if elems is None:
+        return UNV2412Reader(_text_block(mm, start, end), FEM)
+    FEM.add_elems(*elems)
+    return FEM
+
+def UNV2467Decoder(mm, start, end, FEM):
+    return UNV2467Reader(_text_block(mm, start, end), FEM)
+
+def find_flag(mm, pos, flag=b'    -1'):
+    """从行首 pos 起查找下一个以 flag 开头的行，返回其行首位置，找不到时返回 -1"""
+    if mm[pos:pos + len(flag)] == flag:
+        return pos
+    i = mm.find(b'\n' + flag, pos)
+    return i + 1 if i >= 0 else -1
+
+def iter_sections(mm):
+    """依次给出每个数据集的 (编号, 数据起始字节, 结束标记行起始字节)，数据内容不做分词"""
+    pos = 0
+    while True:
+        start = find_flag(mm, pos)
+        if start < 0:
+            return
+        id_start = mm.find(b'\n', start) + 1
+        if id_start <= 0:
+            return
+        id_end = mm.find(b'\n', id_start)
+        id_end = len(mm) if id_end < 0 else id_end
+        idline = mm[id_start:id_end]
+        if not idline.strip():
+            return
+        body = min(id_end + 1, len(mm))
+        end = find_flag(mm, body)
+        end = len(mm) if end < 0 else end
+        yield int(idline.split()[0]), body, end
+        nl = mm.find(b'\n', end)
+        if nl < 0:
+            return
+        pos = nl + 1
+
+DATASET_DECODERS = {2411: UNV2411Decoder, 2412: UNV2412Decoder, 2467: UNV2467Decoder, 2477: UNV2467Decoder}
+
+def decode_section(filename, sectionId, start, end):
+    """进程池中解码一个数据集：子进程自行映射文件，只读取 [start, end) 字节，返回只含该数据集内容的 FEM"""
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return DATASET_DECODERS[sectionId](mm, start, end, FEM())
+
+# === 解析结果缓存 ===
+def fem_cache_path(filename):
+    """UNV 旁的解析缓存：assembled_gears.unv -> assembled_gears.unv.fem.npz"""
+    return filename + ".fem.npz"
+
+def load_fem_cache(filename):
+    """
+    读取 UNV 的解析缓存；缓存不存在、版本或文件大小不符、或修改时间变化且内容哈希也不同时返回 None
+    修改时间变了但内容未变（如复制、touch）时仍命中，并按新的修改时间重写缓存键
+    """
+    path = fem_cache_path(filename)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            key = json.loads(str(data["key"]))
+            stat = os.stat(filename)
+            if key.get("version") != FEM_CACHE_VERSION or key.get("size") != stat.st_size:
+                return None
+            if key.get("mtime_ns") != stat.st_mtime_ns:
+                if key.get("sha1") != file_digest(filename):
+                    return None
+                fem = FEM.from_arrays(data)
+                save_fem_cache(filename, fem, key["sha1"])
+                return fem
+            return FEM.from_arrays(data)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ UNV 解析缓存无法读取，重新解析: {e}")
+        return None
+
+def save_fem_cache(filename, fem, sha1=None):
+    """按 (大小, 修改时间, sha1) 写出解析缓存；目录不可写时只给出提示"""
+    stat = os.stat(filename)
+    key = {"version": FEM_CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+           "sha1": sha1 or file_digest(filename)}
+    try:
+        _write_atomic(fem_cache_path(filename), lambda p: np.savez(p, key=json.dumps(key), **fem.to_arrays()))
+    except OSError as e:
+        print(f"⚠️ UNV 解析缓存写出失败: {e}")
+
 class UNVParser:
-    def __init__(self, filename):
+    """
+    UNV 解析器；cache=True 时解析结果以 .fem.npz 缓存在 UNV 旁，UNV 内容不变时直接读取缓存
+    缓存默认关闭：流水线每次都会重新生成 UNV，缓存不会命中，只会多算一遍 sha1 并多写一份 npz
+    """
+    def __init__(self, filename, cache=False):
         self.filename = filename
+        self.cache = cache
         self.FEM = FEM()
-        self.startFlag = '    -1'
-        self.endFlag = '    -1'
         self.datasetsIds = [2411, 2412, 2467, 2477]
-        self.datasetsHandlers = [UNV2411Reader, UNV2412Reader, UNV2467Reader, UNV2467Reader]
+        self.datasetsDecoders = [DATASET_DECODERS[i] for i in self.datasetsIds]
         self.sections = []
 
-    def scanfile(self):
-        while True:
-            line = self.file.readline()
-            if not line:
-                break
-            if line.startswith(self.startFlag):
-                id = int(self.file.readline())
-                offset = self.file.tell()
-                self.sections.append([id, offset])
-                while not self.file.readline().startswith(self.endFlag):
-                    pass
-        self.file.seek(0)
-
-    def parse(self):
-        with open(self.filename, 'r', encoding='utf-8', errors='ignore') as f:
-            self.file = f
-            self.scanfile()
-            for sectionId, offset in self.sections:
-                if sectionId in self.datasetsIds:
-                    self.file.seek(offset)
-                    func = self.datasetsHandlers[self.datasetsIds.index(sectionId)]
-                    self.FEM = func(self.file, self.FEM)
+    def parse(self, parallel=False, workers=None):
+        """
+        单遍解析：文件映射到内存，依次定位各数据集，2411/2412 整块批量解码，2467/2477 逐行解码，
+        其余数据集只查找结束标记直接跳过
+        parallel=True 时先定位各数据集的字节范围，节点、单元、分组各数据集在进程池中同时解码，
+        再按文件中的顺序拼装，耗时取决于最大的数据集；workers 为进程数，默认取数据集数和 CPU 核数的较小值
+        """
+        if self.cache:
+            fem = load_fem_cache(self.filename)
+            if fem is not None:
+                self.FEM = fem
+                return self.FEM
+        if os.path.getsize(self.filename) == 0:
+            return self.FEM
+        with open(self.filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if parallel:
+                self.sections = [[sectionId, start, end] for sectionId, start, end in iter_sections(mm)
+                                 if sectionId in self.datasetsIds]
+            else:
+                for sectionId, start, end in iter_sections(mm):
+                    if sectionId in self.datasetsIds:
+                        func = self.datasetsDecoders[self.datasetsIds.index(sectionId)]
+                        self.FEM = func(mm, start, end, self.FEM)
+        if parallel:
+            self.decode_parallel(workers)
+        if self.cache:
+            save_fem_cache(self.filename, self.FEM)
         return self.FEM
+
+    def decode_parallel(self, workers=None):
+        """在进程池中解码 self.sections 中的各数据集，按顺序并入 self.FEM"""
+        workers = workers or min(len(self.sections), os.cpu_count() or 1)
+        if len(self.sections) < 2 or workers < 2:
+            # 单核或只有一个数据集时不值得启动进程池
+            parts = [decode_section(self.filename, *section) for section in self.sections]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(decode_section, self.filename, *section) for section in self.sections]
+                parts = [future.result() for future in futures]
+        for part in parts:
+            self.FEM.extend(part)